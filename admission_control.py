@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Admission Control
+- Token-bucket rate limits per client IP, per route and per feed token,
+  answered with 429 + Retry-After before any work is done
+- Concurrency caps with a bounded wait queue for expensive endpoints
+  (TTS); a full queue or a wait that times out is answered with 503 +
+  Retry-After instead of piling up requests until they time out
+- In-flight cap per worker process: once more requests are running than
+  MAX_IN_FLIGHT, new ones are shed with 503 immediately
+- Bucket and slot state lives in a small SQLite database
+  (RATE_LIMIT_BACKEND=sqlite, the default) so all gunicorn workers on a
+  host share it; RATE_LIMIT_BACKEND=memory keeps it per process and
+  RATE_LIMIT_BACKEND=off disables everything
+- Rates are written "<count>/<second|minute|hour>", e.g. "30/minute";
+  the bucket holds <count> tokens and refills evenly over the period
+"""
+
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'sqlite').lower()
+RATE_LIMIT_DB = os.environ.get('RATE_LIMIT_DB',
+                               os.path.join(tempfile.gettempdir(), 'manta-jarvis-admission.sqlite'))
+RATE_LIMIT_IP = os.environ.get('RATE_LIMIT_IP', '600/minute')
+RATE_LIMIT_ROUTE = os.environ.get('RATE_LIMIT_ROUTE', '120/minute')
+RATE_LIMIT_FEED = os.environ.get('RATE_LIMIT_FEED', '30/minute')
+MAX_IN_FLIGHT = int(os.environ.get('MAX_IN_FLIGHT', 0))  # per process; 0 = no cap
+# Proxies in front of the app that append to X-Forwarded-For (1 on Render)
+PROXY_HOPS = int(os.environ.get('PROXY_HOPS', 0))
+
+_PERIODS = {'second': 1, 'sec': 1, 's': 1, 'minute': 60, 'min': 60, 'm': 60, 'hour': 3600, 'h': 3600}
+
+
+class Rejected(Exception):
+    """A request turned away before it ran"""
+
+    status = 503
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class RateLimited(Rejected):
+    status = 429
+
+
+class Overloaded(Rejected):
+    status = 503
+
+
+Rate = namedtuple('Rate', 'capacity per_second')
+
+
+def parse_rate(spec):
+    """Rate for '30/minute' style strings; None for '', 'off' or '0/...'"""
+    if not spec or spec.strip().lower() in ('off', 'none'):
+        return None
+    count, _, period = spec.strip().partition('/')
+    seconds = _PERIODS.get(period.strip().lower() or 'second')
+    if seconds is None:
+        raise ValueError(f'Unknown rate period in {spec!r}')
+    count = float(count)
+    if count <= 0:
+        return None
+    return Rate(count, count / seconds)
+
+# ============================================================================
+# State Stores
+# ============================================================================
+
+class MemoryStore:
+    """Bucket and slot state for a single process"""
+
+    def __init__(self):
+        self._buckets = {}   # key -> (tokens, updated)
+        self._slots = {}     # name -> {holder: expires}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, now):
+        """Take one token; returns seconds to wait if the bucket is empty, else 0"""
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate.capacity, now))
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                return (1 - tokens) / rate.per_second
+            self._buckets[key] = (tokens - 1, now)
+            return 0
+
+    def try_acquire(self, name, holder, limit, lease, now):
+        with self._lock:
+            slots = self._slots.setdefault(name, {})
+            for h in [h for h, expires in slots.items() if expires < now]:
+                del slots[h]
+            if len(slots) >= limit:
+                return False
+            slots[holder] = now + lease
+            return True
+
+    def release(self, name, holder):
+        with self._lock:
+            self._slots.get(name, {}).pop(holder, None)
+
+    def count(self, name, now):
+        with self._lock:
+            return sum(1 for expires in self._slots.get(name, {}).values() if expires >= now)
+
+
+class SQLiteStore:
+    """Bucket and slot state shared by every process that opens the same file"""
+
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path=RATE_LIMIT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._calls = 0
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS buckets '
+                       '(key TEXT PRIMARY KEY, tokens REAL, updated REAL)')
+            db.execute('CREATE TABLE IF NOT EXISTS slots '
+                       '(name TEXT, holder TEXT, expires REAL, PRIMARY KEY (name, holder))')
+
+    def _connect(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')  # losing buckets in a crash is harmless
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        db = self._connect()
+        db.execute('BEGIN IMMEDIATE')
+        return db
+
+    def take(self, key, rate, now):
+        db = self._transaction()
+        try:
+            row = db.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (rate.capacity, now)
+            tokens = min(rate.capacity, tokens + (now - updated) * rate.per_second)
+            wait = 0
+            if tokens < 1:
+                wait = (1 - tokens) / rate.per_second
+            else:
+                tokens -= 1
+            db.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)',
+                       (key, tokens, now))
+            self._calls += 1
+            if self._calls % self.PRUNE_EVERY == 0:
+                # Buckets idle for an hour are full again; forget them
+                db.execute('DELETE FROM buckets WHERE updated < ?', (now - 3600,))
+            db.execute('COMMIT')
+            return wait
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def try_acquire(self, name, holder, limit, lease, now):
+        db = self._transaction()
+        try:
+            db.execute('DELETE FROM slots WHERE name = ? AND expires < ?', (name, now))
+            (held,) = db.execute('SELECT COUNT(*) FROM slots WHERE name = ?', (name,)).fetchone()
+            acquired = held < limit
+            if acquired:
+                db.execute('INSERT OR REPLACE INTO slots (name, holder, expires) VALUES (?, ?, ?)',
+                           (name, holder, now + lease))
+            db.execute('COMMIT')
+            return acquired
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+
+    def release(self, name, holder):
+        self._connect().execute('DELETE FROM slots WHERE name = ? AND holder = ?', (name, holder))
+
+    def count(self, name, now):
+        (held,) = self._connect().execute(
+            'SELECT COUNT(*) FROM slots WHERE name = ? AND expires >= ?', (name, now)).fetchone()
+        return held
+
+
+def create_store(backend=RATE_LIMIT_BACKEND, path=RATE_LIMIT_DB):
+    """State store for the configured backend, or None when disabled"""
+    if backend == 'off':
+        return None
+    if backend == 'memory':
+        return MemoryStore()
+    try:
+        return SQLiteStore(path)
+    except sqlite3.Error as e:
+        logger.warning(f"⚠️ Rate limit database {path} unavailable ({e}); limits are per process")
+        return MemoryStore()
+
+_shared_store = {}
+_shared_store_lock = threading.Lock()
+
+def get_store():
+    """The process-wide store, so every mounted component shares buckets and slots"""
+    with _shared_store_lock:
+        if 'store' not in _shared_store:
+            _shared_store['store'] = create_store()
+        return _shared_store['store']
+
+# ============================================================================
+# Limiters
+# ============================================================================
+
+class RateLimiter:
+    """Token buckets keyed by arbitrary strings"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def check(self, key, rate):
+        """Take a token from `key`'s bucket or raise RateLimited"""
+        if rate is None:
+            return
+        wait = self.store.take(key, rate, time.time())
+        if wait:
+            raise RateLimited('Rate limit exceeded', wait)
+
+
+class ConcurrencyLimiter:
+    """At most `limit` holders of a named slot across all processes.
+
+    Up to `max_queue` callers wait (polling) for a slot for at most
+    `queue_timeout` seconds; anyone beyond that is rejected at once.
+    Slots are leases, so a crashed worker's slot frees itself after
+    `lease` seconds.
+    """
+
+    POLL_INTERVAL = 0.05
+
+    def __init__(self, store, name, limit, max_queue=0, queue_timeout=0, lease=300):
+        self.store = store
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.lease = lease
+
+    def acquire(self):
+        """Return a holder id for a slot, or raise Overloaded"""
+        holder = uuid.uuid4().hex
+        if self.store.try_acquire(self.name, holder, self.limit, self.lease, time.time()):
+            return holder
+        if not self.max_queue:
+            raise Overloaded(f'{self.name} is at capacity', self.queue_timeout or 1)
+
+        # Waiting callers hold a lease in the queue, so the queue bound is shared too
+        waiter = uuid.uuid4().hex
+        queue = f'{self.name}:queue'
+        if not self.store.try_acquire(queue, waiter, self.max_queue, self.queue_timeout + 1, time.time()):
+            raise Overloaded(f'{self.name} queue is full', self.queue_timeout or 1)
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.POLL_INTERVAL)
+                if self.store.try_acquire(self.name, holder, self.limit, self.lease, time.time()):
+                    return holder
+        finally:
+            self.store.release(queue, waiter)
+        raise Overloaded(f'{self.name} is at capacity', self.queue_timeout or 1)
+
+    def release(self, holder):
+        self.store.release(self.name, holder)
+
+    def slot(self):
+        return _Slot(self)
+
+    def stats(self):
+        now = time.time()
+        return {'running': self.store.count(self.name, now),
+                'queued': self.store.count(f'{self.name}:queue', now),
+                'limit': self.limit}
+
+
+class _Slot:
+    __slots__ = ('limiter', 'holder')
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def __enter__(self):
+        self.holder = self.limiter.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.limiter.release(self.holder)
+        return False
+
+# ============================================================================
+# Flask Integration
+# ============================================================================
+
+def client_ip(req):
+    """Client address, looking through PROXY_HOPS trusted proxies"""
+    if PROXY_HOPS and req.access_route:
+        route = req.access_route
+        return route[max(0, len(route) - PROXY_HOPS - 1)]
+    return req.remote_addr or 'unknown'
+
+
+def rejection_response(error):
+    """JSON 429/503 response with Retry-After for a Rejected exception"""
+    from flask import jsonify
+    response = jsonify({'error': str(error), 'retry_after': error.retry_after})
+    response.status_code = error.status
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def init_admission(app, store, route_limits=None, exempt=(), max_in_flight=MAX_IN_FLIGHT):
+    """Attach rate limiting and load shedding to a Flask app.
+
+    Every request takes a token from its client IP's bucket (RATE_LIMIT_IP)
+    and from the IP's bucket for that endpoint (RATE_LIMIT_ROUTE).
+    `route_limits` maps endpoint names to extra [(scope, rate, key_func)]
+    limits, where key_func(request) names the bucket (e.g. the feed token
+    from the URL). Endpoints in `exempt` (long-lived streams) skip the
+    in-flight cap. Returns a RateLimiter (None when disabled).
+    """
+    if store is None:
+        return None
+
+    from flask import g, request
+
+    limiter = RateLimiter(store)
+    ip_rate = parse_rate(RATE_LIMIT_IP)
+    route_rate = parse_rate(RATE_LIMIT_ROUTE)
+    route_limits = route_limits or {}
+    in_flight = [0]
+    in_flight_lock = threading.Lock()
+
+    @app.before_request
+    def _admit_request():
+        if max_in_flight and request.endpoint not in exempt:
+            with in_flight_lock:
+                if in_flight[0] >= max_in_flight:
+                    return rejection_response(Overloaded('Server is busy', 1))
+                in_flight[0] += 1
+                g.admission_counted = True
+        try:
+            ip = client_ip(request)
+            limiter.check(f'ip:{ip}', ip_rate)
+            limiter.check(f'route:{request.endpoint}:{ip}', route_rate)
+            for scope, rate, key_func in route_limits.get(request.endpoint, ()):
+                key = key_func(request)
+                if key:
+                    limiter.check(f'{scope}:{key}', rate)
+        except Rejected as e:
+            logger.warning(f"🚦 {e.status} for {request.endpoint} from {client_ip(request)}: {e}")
+            return rejection_response(e)
+        except sqlite3.Error as e:
+            # Never fail a request because the limiter's state is unavailable
+            logger.error(f"Rate limit check failed: {e}")
+
+    @app.teardown_request
+    def _finish_admitted_request(exc):
+        if g.pop('admission_counted', False):
+            with in_flight_lock:
+                in_flight[0] -= 1
+
+    logger.info(f"🚦 Admission control: {type(store).__name__}, ip {RATE_LIMIT_IP}, "
+                f"route {RATE_LIMIT_ROUTE}, in-flight cap {max_in_flight or 'off'}")
+    return limiter
@@ -92,8 +92,7 @@ async function saveEvent(username, event) {
   await syncEventsToServer(username, userData.events);
   
   if (window.CalendarManager) {
-    window.CalendarManager.renderCalendar();
-    window.CalendarManager.loadEvents();
+    window.CalendarManager.applyChanges({ upserted: [event] });
   }
   return event;
 }
@@ -112,8 +111,7 @@ async function updateEvent(username, eventId, updates) {
   await syncEventsToServer(username, userData.events);
   
   if (window.CalendarManager) {
-    window.CalendarManager.renderCalendar();
-    window.CalendarManager.loadEvents();
+    window.CalendarManager.applyChanges({ upserted: [userData.events[eventIndex]] });
   }
   return true;
 }
@@ -129,8 +127,7 @@ async function deleteEvent(username, eventId) {
   await syncEventsToServer(username, userData.events);
   
   if (window.CalendarManager) {
-    window.CalendarManager.renderCalendar();
-    window.CalendarManager.loadEvents();
+    window.CalendarManager.applyChanges({ deleted: [eventId] });
   }
   return true;
 }
@@ -165,6 +162,120 @@ async function syncEventsToServer(username, events) {
   }
 }
 
+// ============================================================================
+// Live Changes (other tabs and devices)
+// ============================================================================
+let changeStream = null;
+
+// Fields whose difference means an incoming event is a real change
+const EVENT_CONTENT_FIELDS = ['summary', 'start', 'end', 'description', 'location', 'rrule', 'exdate'];
+
+function subscribeToChanges(username) {
+  closeChangeStream();
+  if (!window.EventSource) return;
+  
+  const params = new URLSearchParams({ username_b64: btoa(username) });
+  // EventSource reconnects by itself and resumes from the last event id
+  changeStream = new EventSource(`${BACKEND_URL}/api/changes?${params}`);
+  changeStream.addEventListener('change', (message) => {
+    applyServerChanges(username, JSON.parse(message.data));
+  });
+  changeStream.addEventListener('reset', () => {
+    // Too far behind to resume; local data is still authoritative, so just redraw
+    if (window.CalendarManager) window.CalendarManager.loadEvents();
+  });
+}
+
+function closeChangeStream() {
+  if (changeStream) {
+    changeStream.close();
+    changeStream = null;
+  }
+}
+
+async function applyServerChanges(username, change) {
+  if (username !== currentUser) return;
+  const userData = await loadUserData(username);
+  if (!userData) return;
+  userData.events = userData.events || [];
+  
+  const byId = new Map(userData.events.map(e => [e.id, e]));
+  const upserted = [];
+  const deleted = [];
+  
+  (change.upserted || []).forEach(event => {
+    const existing = byId.get(event.id);
+    // Our own syncs come back through the stream too; skip those
+    if (existing && EVENT_CONTENT_FIELDS.every(f => String(existing[f] ?? '') === String(event[f] ?? ''))) return;
+    byId.set(event.id, { ...existing, ...event });
+    upserted.push(byId.get(event.id));
+  });
+  (change.deleted || []).forEach(eventId => {
+    if (byId.delete(eventId)) deleted.push(eventId);
+  });
+  
+  if (upserted.length === 0 && deleted.length === 0) return;
+  
+  userData.events = Array.from(byId.values());
+  await saveUserData(username, userData);
+  if (window.CalendarManager) {
+    window.CalendarManager.applyChanges({ upserted, deleted });
+  }
+}
+
+async function checkEventConflicts(username, event) {
+  try {
+    const response = await fetch(`${BACKEND_URL}/api/conflicts`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        username_b64: btoa(username),
+        event: event
+      })
+    });
+    
+    if (!response.ok) return [];
+    const result = await response.json();
+    return result.conflicts || [];
+  } catch (error) {
+    console.warn('⚠️ Conflict check not available (this is optional):', error.message);
+    return [];
+  }
+}
+
+async function searchEventsOnServer(username, query) {
+  try {
+    const params = new URLSearchParams({ username_b64: btoa(username), q: query, limit: '10' });
+    const response = await fetch(`${BACKEND_URL}/api/search?${params}`);
+    if (!response.ok) return null;
+    const result = await response.json();
+    return result.results || [];
+  } catch (error) {
+    console.warn('⚠️ Event search not available (this is optional):', error.message);
+    return null;
+  }
+}
+
+async function fetchEventsPage(username, cursor) {
+  try {
+    const params = new URLSearchParams({
+      username_b64: btoa(username),
+      start: new Date().toISOString(),
+      limit: '20'
+    });
+    if (cursor) params.set('cursor', cursor);
+    const response = await fetch(`${BACKEND_URL}/api/events?${params}`);
+    if (!response.ok) return null;
+    const result = await response.json();
+    return { events: result.events || [], next_cursor: result.next_cursor };
+  } catch (error) {
+    console.warn('⚠️ Event listing not available, sorting locally:', error.message);
+    return null;
+  }
+}
+
 async function getUserEvents(username) {
   const userData = await loadUserData(username);
   return userData?.events || [];
@@ -172,6 +283,7 @@ async function getUserEvents(username) {
 
 // Export for use in other scripts
 window.getUserEvents = getUserEvents;
+window.fetchEventsPage = fetchEventsPage;
 window.saveEvent = saveEvent;
 window.updateEvent = updateEvent;
 window.deleteEvent = deleteEvent;
@@ -253,17 +365,22 @@ function loginUser(username) {
   
   if (window.CalendarManager) {
     window.CalendarManager.renderCalendar();
-    window.CalendarManager.loadEvents();
   }
   
-  // Sync existing events to backend on login
-  getUserEvents(username).then(events => {
-    syncEventsToServer(username, events);
-  });
+  // Sync existing events to backend on login, then list them from the
+  // server so the first page reflects this device's data
+  getUserEvents(username)
+    .then(events => syncEventsToServer(username, events))
+    .then(() => {
+      if (window.CalendarManager) window.CalendarManager.loadEvents();
+    });
+  
+  subscribeToChanges(username);
 }
 
 document.getElementById('logoutBtn').addEventListener('click', () => {
   currentUser = null;
+  closeChangeStream();
   document.getElementById('authSection').classList.remove('hidden');
   document.getElementById('userInfoSection').classList.remove('visible');
   document.getElementById('logoutBtn').classList.remove('visible');
@@ -500,6 +617,30 @@ function parseTime(text) {
   return { hours: null, minutes: null, hasTime: false };
 }
 
+// ============================================================================
+// Recurrence Parsing - "every day", "every monday", "weekly", etc.
+// Returns an RRULE string (stored on the event as `rrule`) or null
+// ============================================================================
+function parseRecurrence(text) {
+  const lower = text.toLowerCase();
+  
+  if (/\b(every\s+weekday|weekdays)\b/.test(lower)) return 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR';
+  if (/\b(every\s+day|daily)\b/.test(lower)) return 'FREQ=DAILY';
+  
+  const dayCodes = {
+    'sunday': 'SU', 'monday': 'MO', 'tuesday': 'TU', 'wednesday': 'WE',
+    'thursday': 'TH', 'friday': 'FR', 'saturday': 'SA'
+  };
+  const everyDay = lower.match(/\bevery\s+(sunday|monday|tuesday|wednesday|thursday|friday|saturday)\b/);
+  if (everyDay) return `FREQ=WEEKLY;BYDAY=${dayCodes[everyDay[1]]}`;
+  
+  if (/\b(every\s+week|weekly)\b/.test(lower)) return 'FREQ=WEEKLY';
+  if (/\b(every\s+month|monthly)\b/.test(lower)) return 'FREQ=MONTHLY';
+  if (/\b(every\s+year|yearly|annually)\b/.test(lower)) return 'FREQ=YEARLY';
+  
+  return null;
+}
+
 // ============================================================================
 // STRICT Event Parsing - Only creates events with proper info
 // ============================================================================
@@ -537,7 +678,7 @@ function parseEventCommand(text) {
   
   // Method 3: Extract text between trigger and date/time words
   if (!summary) {
-    const dateTimeKeywords = ['tomorrow', 'today', 'next week', 'at ', 'on ', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'the '];
+    const dateTimeKeywords = ['tomorrow', 'today', 'next week', 'at ', 'on ', 'monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'the ', 'every '];
     
     let titleStart = -1;
     for (const trigger of [...eventTriggers, ...eventWords]) {
@@ -609,11 +750,18 @@ function parseEventCommand(text) {
     end: endTime.toLocaleString()
   });
 
-  return {
+  const eventData = {
     summary: summary,
     start: startTime.toISOString(),
     end: endTime.toISOString()
   };
+  
+  const rrule = parseRecurrence(text);
+  if (rrule) {
+    eventData.rrule = rrule;
+  }
+
+  return eventData;
 }
 
 async function createEvent(eventData) {
@@ -624,14 +772,21 @@ async function createEvent(eventData) {
   }
 
   try {
+    const conflicts = await checkEventConflicts(currentUser, eventData);
     const saved = await saveEvent(currentUser, eventData);
     console.log('Event created and saved:', saved);
     
     const startDate = new Date(eventData.start);
-    const msg = `✅ Event "${eventData.summary}" created for ${startDate.toLocaleDateString()} at ${startDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})}`;
+    const repeats = eventData.rrule ? ' (repeating)' : '';
+    const msg = `✅ Event "${eventData.summary}" created for ${startDate.toLocaleDateString()} at ${startDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})}${repeats}`;
     addMessage(msg, 'ai');
     speak(`Event ${eventData.summary} has been added to your calendar.`);
     
+    if (conflicts.length > 0) {
+      const names = conflicts.map(e => `"${e.summary}"`).join(', ');
+      addMessage(`⚠️ Heads up: this overlaps with ${names}.`, 'ai');
+    }
+    
     // Open calendar sidebar to show the event
     document.getElementById('calendarSidebar').classList.add('open');
   } catch (error) {
@@ -661,13 +816,43 @@ async function fetchWikipediaSummary(title) {
 // ============================================================================
 // Event Management Commands (Edit/Delete)
 // ============================================================================
-async function handleDeleteEvent(text) {
+function extractEventQuery(text) {
+  return text.toLowerCase()
+    .replace(/\b(delete|remove|edit|change|rename|update|event|meeting|appointment|the|my|please)\b/g, ' ')
+    .replace(/[^\w\s]/g, ' ')
+    .replace(/\s+/g, ' ')
+    .trim();
+}
+
+// Narrow the user's events to those named in the command (e.g. "delete the
+// dentist appointment") using the server search index; falls back to all events
+async function findEventsForCommand(text) {
   const events = await getUserEvents(currentUser);
+  const query = extractEventQuery(text);
+  if (!query || events.length === 0) return { events, matched: false };
+  
+  const results = await searchEventsOnServer(currentUser, query);
+  if (!results || results.length === 0) return { events, matched: false };
+  
+  // Only offer events that still exist locally
+  const byId = new Map(events.map(e => [e.id, e]));
+  const matches = results.map(r => byId.get(r.id)).filter(Boolean);
+  return matches.length > 0 ? { events: matches, matched: true } : { events, matched: false };
+}
+
+async function handleDeleteEvent(text) {
+  const { events, matched } = await findEventsForCommand(text);
   if (events.length === 0) {
     addMessage('You have no events to delete.', 'ai');
     speak('You have no events to delete');
     return;
   }
+  
+  if (matched && events.length === 1) {
+    window.pendingAction = { type: 'delete', events };
+    await handlePendingAction('1');
+    return;
+  }
 
   // Show list of events to delete
   let message = '🗑️ Which event would you like to delete? Reply with the number:<br><br>';
@@ -684,12 +869,18 @@ async function handleDeleteEvent(text) {
 }
 
 async function handleEditEvent(text) {
-  const events = await getUserEvents(currentUser);
+  const { events, matched } = await findEventsForCommand(text);
   if (events.length === 0) {
     addMessage('You have no events to edit.', 'ai');
     speak('You have no events to edit');
     return;
   }
+  
+  if (matched && events.length === 1) {
+    window.pendingAction = { type: 'edit', events };
+    await handlePendingAction('1');
+    return;
+  }
 
   // Show list of events to edit
   let message = '✏️ Which event would you like to edit? Reply with the number:<br><br>';
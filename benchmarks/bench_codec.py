@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Event codec benchmark: on-disk size and encode/decode time per format.
+
+Usage: python benchmarks/bench_codec.py [event_count]
+"""
+
+import json
+import sys
+
+from synthetic import make_events, timed
+
+import event_codec
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    doc = {'username_b64': 'dGVzdHVzZXI=', 'events': make_events(count), 'last_updated': '2025-01-01T00:00:00'}
+
+    # Baseline: what save_user_events used to write
+    legacy = json.dumps(doc, indent=2, ensure_ascii=False).encode('utf-8')
+    rows = [(
+        'json indent=2 (legacy)',
+        len(legacy),
+        timed(lambda: json.dumps(doc, indent=2, ensure_ascii=False).encode('utf-8')),
+        timed(lambda: json.loads(legacy)),
+    )]
+
+    for codec in ('json', 'msgpack'):
+        for compression in ('none', 'gzip', 'zstd'):
+            if event_codec.resolve(codec, compression) != (codec, compression):
+                continue
+            blob = event_codec.dumps(doc, codec, compression)
+            assert event_codec.loads(blob) == doc
+            label = f'{codec}+{compression}'
+            if codec == 'json' and event_codec.ORJSON_AVAILABLE:
+                label = label.replace('json', 'orjson', 1)
+            rows.append((
+                label,
+                len(blob),
+                timed(lambda: event_codec.dumps(doc, codec, compression)),
+                timed(lambda: event_codec.loads(blob)),
+            ))
+
+    print(f'{count} events')
+    print(f'{"format":<24}{"bytes":>12}{"ratio":>8}{"encode ms":>12}{"decode ms":>12}')
+    for label, size, enc, dec in rows:
+        print(f'{label:<24}{size:>12,}{size / len(legacy):>8.2f}{enc:>12.2f}{dec:>12.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Interval index benchmark: free/busy, conflict and paged listing latency.
+
+Usage: python benchmarks/bench_freebusy.py [event_count]
+"""
+
+import random
+import sys
+import time
+from datetime import timedelta
+
+from synthetic import make_events, timed
+
+from event_time import parse_event_time
+from interval_index import IntervalIndex
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    events = make_events(count)
+    events.append({'id': 'standup', 'summary': 'Standup', 'start': '2025-01-06T09:00:00.000Z',
+                   'end': '2025-01-06T09:15:00.000Z', 'rrule': 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR'})
+
+    build_ms = timed(lambda: IntervalIndex(events), repeat=3)
+    index = IntervalIndex(events)
+
+    rng = random.Random(7)
+    base = parse_event_time('2025-01-01T00:00:00Z')
+    windows = []
+    for _ in range(10000):
+        start = base + timedelta(minutes=15 * rng.randrange(0, 365 * 96))
+        windows.append((start, start + timedelta(hours=1)))
+
+    t0 = time.perf_counter()
+    for start, end in windows:
+        index.busy(start, end)
+    busy_us = (time.perf_counter() - t0) / len(windows) * 1e6
+
+    t0 = time.perf_counter()
+    for start, end in windows[:2000]:
+        index.conflicts({'start': start.isoformat(), 'end': end.isoformat()})
+    conflict_us = (time.perf_counter() - t0) / 2000 * 1e6
+
+    # "Next 20 upcoming" from a random point, then the page after it
+    t0 = time.perf_counter()
+    for start, _ in windows[:2000]:
+        _, position = index.page(start, start + timedelta(days=400), 20)
+        index.page(start, start + timedelta(days=400), 20, position)
+    page_us = (time.perf_counter() - t0) / 4000 * 1e6
+
+    # One edited event in an otherwise unchanged sync
+    edited = [dict(e) for e in events]
+    edited[count // 2]['start'] = '2025-06-01T10:00:00.000Z'
+    edited[count // 2]['end'] = '2025-06-01T11:00:00.000Z'
+    update_ms = timed(lambda: (index.update(edited), index.update(events)), repeat=3) / 2
+
+    print(f'{count} events + 1 recurring series')
+    print(f'build index          {build_ms:10.1f} ms')
+    print(f'free/busy (1h)       {busy_us:10.1f} us/query')
+    print(f'conflict check       {conflict_us:10.1f} us/query')
+    print(f'page of 20 upcoming  {page_us:10.1f} us/query')
+    print(f'incremental sync     {update_ms:10.1f} ms (one event moved)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Shared calendar feed benchmark: combined feed from cached per-member
+fragments (one member changed) vs re-rendering every member.
+
+Usage: python benchmarks/bench_group_feed.py [members] [events_per_member]
+"""
+
+import sys
+
+from synthetic import make_events, timed
+
+from ics_serializer import generate_ics_calendar, render_fragments
+from shared_calendars import render_group_calendar
+
+
+def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    per_member = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    calendars = [make_events(per_member, seed=m) for m in range(members)]
+    for m, events in enumerate(calendars):
+        for event in events:
+            event['id'] = f"{m}-{event['id']}"
+    fragments = [render_fragments(events) for events in calendars]
+
+    def full():
+        combined = sorted((e for events in calendars for e in events), key=lambda e: e['start'])
+        return generate_ics_calendar(combined, 'Team')
+
+    def cached():
+        # The usual case: one member synced since the last poll
+        parts = [render_fragments(calendars[0])] + fragments[1:]
+        return render_group_calendar('Team', parts)
+
+    full_ms = timed(full, repeat=5)
+    cached_ms = timed(cached, repeat=5)
+    merge_ms = timed(lambda: render_group_calendar('Team', fragments), repeat=5)
+    print(f'{members} members x {per_member} events')
+    print(f'full re-render        {full_ms:8.1f} ms')
+    print(f'one member re-render  {cached_ms:8.1f} ms')
+    print(f'merge cached only     {merge_ms:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+ICS serialization benchmark: ics_serializer vs the `ics` library.
+
+Usage: python benchmarks/bench_ics.py [event_count]
+"""
+
+import sys
+
+from synthetic import make_events, timed
+
+from ics_serializer import generate_ics_calendar
+
+try:
+    from ics import Calendar, Event  # type: ignore
+    ICS_AVAILABLE = True
+except ImportError:
+    ICS_AVAILABLE = False
+
+
+def with_ics_library(events):
+    """What the old calendar_feed route did for every request"""
+    cal = Calendar()
+    for e in events:
+        event = Event()
+        event.name = e['summary']
+        event.begin = e['start']
+        event.end = e['end']
+        event.description = e.get('description', '')
+        event.location = e.get('location', '')
+        cal.events.add(event)
+    return str(cal)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    events = make_events(count)
+
+    native_ms = timed(lambda: generate_ics_calendar(events), repeat=5)
+    native_size = len(generate_ics_calendar(events).encode('utf-8'))
+    print(f'{count} events')
+    print(f'ics_serializer       {native_ms:10.1f} ms  {native_size:>12,} bytes')
+
+    if not ICS_AVAILABLE:
+        print('ics library          not installed (pip install ics to compare)')
+        return
+    library_ms = timed(lambda: with_ics_library(events), repeat=2)
+    library_size = len(with_ics_library(events).encode('utf-8'))
+    print(f'ics library          {library_ms:10.1f} ms  {library_size:>12,} bytes')
+    print(f'speedup              {library_ms / native_ms:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Data directory layout benchmark: per-user file create and lookup latency,
+flat vs hash-sharded, plus the cost of migrating a flat directory.
+
+Usage: python benchmarks/bench_layout.py [user_count] [scratch_dir]
+       (1000000 users needs about 2M free inodes in the scratch filesystem)
+"""
+
+import base64
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Run from the repo root or from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import data_layout
+
+
+def user_names(count):
+    return [base64.b64encode(f'user{i}@example.com'.encode()).decode().replace('/', '_')
+            for i in range(count)]
+
+
+def create_all(data_dir, names, layout):
+    payload = b'{"events": []}'
+    t0 = time.perf_counter()
+    for name in names:
+        path = data_layout.user_path(data_dir, name, '.json', layout)
+        if layout != 'flat':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(payload)
+    return (time.perf_counter() - t0) / len(names) * 1e6
+
+
+def lookup_sample(data_dir, names, layout, samples=20000):
+    rng = random.Random(3)
+    picks = [rng.choice(names) for _ in range(samples)]
+    # Half hits, half misses, like a mix of returning and first-time users
+    misses = [f'missing{i}' for i in range(samples)]
+    t0 = time.perf_counter()
+    for name, missing in zip(picks, misses):
+        os.path.exists(data_layout.user_path(data_dir, name, '.json', layout))
+        os.path.exists(data_layout.user_path(data_dir, missing, '.json', layout))
+    return (time.perf_counter() - t0) / (2 * samples) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    scratch = tempfile.mkdtemp(prefix='layout-bench-', dir=sys.argv[2] if len(sys.argv) > 2 else None)
+    names = user_names(count)
+    try:
+        results = {}
+        for layout in ('flat', 'sharded'):
+            data_dir = os.path.join(scratch, layout)
+            os.makedirs(data_dir)
+            create_us = create_all(data_dir, names, layout)
+            lookup_us = lookup_sample(data_dir, names, layout)
+            t0 = time.perf_counter()
+            listed = data_layout.count_user_files(data_dir)
+            scan_ms = (time.perf_counter() - t0) * 1000
+            results[layout] = (create_us, lookup_us, scan_ms, listed)
+
+        t0 = time.perf_counter()
+        moved = data_layout.migrate_flat_files(os.path.join(scratch, 'flat'), batch_size=5000)
+        migrate_s = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print(f'{count} users, {data_layout.SHARD_LEVELS} shard levels x {data_layout.SHARD_WIDTH} hex digits')
+    print(f'{"layout":10} {"create":>12} {"lookup":>12} {"full scan":>12}')
+    for layout, (create_us, lookup_us, scan_ms, listed) in results.items():
+        print(f'{layout:10} {create_us:9.1f} us {lookup_us:9.1f} us {scan_ms:9.0f} ms  ({listed} files)')
+    print(f'migrate flat -> sharded: {moved} files in {migrate_s:.1f} s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Event cache memory benchmark: bytes per cached event as parsed JSON dicts
+vs compact_events.EventTable, plus conversion cost.
+
+Usage: python benchmarks/bench_memory.py [event_count] [events_per_user]
+       (e.g. 1000000 500 for a million events across 2,000 users)
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from synthetic import make_events, timed
+
+from compact_events import EventTable
+from event_versioning import stamp_events
+
+
+def measure(build):
+    """(result, bytes allocated and still held by it)"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    users = max(1, count // per_user)
+
+    # One stored file per user, stamped the way /api/sync stores them
+    blobs = [json.dumps({'events': stamp_events([], make_events(per_user, seed=u))})
+             for u in range(users)]
+    total = users * per_user
+
+    dicts, dict_bytes = measure(lambda: [json.loads(b)['events'] for b in blobs])
+    tables, table_bytes = measure(lambda: [EventTable.from_dicts(events) for events in dicts])
+
+    sample = dicts[0]
+    assert tables[0].to_dicts() == sample, 'conversion must be lossless'
+    encode_ms = timed(lambda: EventTable.from_dicts(sample))
+    decode_ms = timed(lambda: tables[0].to_dicts())
+
+    print(f'{total} events across {users} users ({per_user} each)')
+    print(f'dicts (json.loads)   {dict_bytes / total:8.0f} bytes/event  {dict_bytes / 2**20:8.1f} MiB')
+    print(f'EventTable           {table_bytes / total:8.0f} bytes/event  {table_bytes / 2**20:8.1f} MiB')
+    print(f'from_dicts           {encode_ms / per_user * 1000:8.2f} us/event')
+    print(f'to_dicts             {decode_ms / per_user * 1000:8.2f} us/event')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Natural-language parsing throughput: nl_parser.parse_lines over a batch
+of chat-style commands, as /api/parse runs them.
+
+Usage: python benchmarks/bench_parse.py [line_count]
+"""
+
+import random
+import sys
+from datetime import datetime, timezone
+
+from synthetic import TITLES, timed
+
+import nl_parser
+
+VERBS = ['schedule', 'add', 'create a meeting called', 'book', 'plan', 'set up an appointment', 'remind me']
+WHEN = ['', 'tomorrow', 'today', 'on tuesday', 'friday', 'next week', 'the 12th', 'every monday', 'daily']
+TIMES = ['', 'at 3pm', 'at 15:00', 'at 9:30 am', 'at 12pm']
+
+
+def make_lines(count, seed=42):
+    rng = random.Random(seed)
+    return [' '.join(f'{rng.choice(VERBS)} {rng.choice(TITLES)} {rng.choice(WHEN)} {rng.choice(TIMES)}'.split())
+            for _ in range(count)]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lines = make_lines(count)
+    now = datetime(2026, 10, 19, 14, 0, tzinfo=timezone.utc)
+
+    utc_ms = timed(lambda: nl_parser.parse_lines(lines, now), repeat=3)
+    tz_ms = timed(lambda: nl_parser.parse_lines(lines, now, 'America/New_York'), repeat=3)
+    parsed = sum(1 for e in nl_parser.parse_lines(lines, now) if e)
+    print(f'{count} lines, {parsed} parsed as events')
+    print(f'UTC                {utc_ms:8.1f} ms  {count / utc_ms * 1000:10.0f} lines/s  {utc_ms / count * 1000:6.1f} us/line')
+    print(f'America/New_York   {tz_ms:8.1f} ms  {count / tz_ms * 1000:10.0f} lines/s  {tz_ms / count * 1000:6.1f} us/line')
+
+
+if __name__ == '__main__':
+    main()
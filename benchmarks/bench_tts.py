@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+TTS CPU inference benchmark: real-time factor, memory and output drift for
+each preset with and without int8 dynamic quantization.
+
+Each configuration runs in its own subprocess so resident memory is
+measured for that model alone. Quality is reported as the log-mel
+spectral distance from the same preset's fp32 output (0 = identical;
+listen to the written WAVs before trusting small differences).
+
+Usage: python benchmarks/bench_tts.py [threads] [presets,...]
+       (e.g. 4 quality,fast on a typical 4-core box)
+"""
+
+import json
+import os
+import subprocess
+import sys
+import time
+
+# Run from the repo root or from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SENTENCES = [
+    'Event Dentist appointment has been added to your calendar.',
+    'You have three events tomorrow, starting with Team Sync at 9:30 AM.',
+    'Which event would you like to delete? Reply with the number.',
+]
+OUT_DIR = os.environ.get('BENCH_TTS_OUT', 'bench_tts_out')
+
+
+def rss_mib():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def log_mel(samples, sample_rate, n_fft=1024, hop=256, n_mels=80):
+    import numpy as np
+    frames = np.lib.stride_tricks.sliding_window_view(samples, n_fft)[::hop] * np.hanning(n_fft)
+    power = np.abs(np.fft.rfft(frames, axis=1)) ** 2
+    mel_points = 700 * (10 ** (np.linspace(0, 2595 * np.log10(1 + sample_rate / 2 / 700), n_mels + 2) / 2595) - 1)
+    bins = np.floor((n_fft + 1) * mel_points / sample_rate).astype(int)
+    fbank = np.zeros((n_mels, n_fft // 2 + 1))
+    for m in range(1, n_mels + 1):
+        lo, mid, hi = bins[m - 1], bins[m], bins[m + 1]
+        fbank[m - 1, lo:mid] = (np.arange(lo, mid) - lo) / max(mid - lo, 1)
+        fbank[m - 1, mid:hi] = (hi - np.arange(mid, hi)) / max(hi - mid, 1)
+    return np.log(np.maximum(power @ fbank.T, 1e-5))
+
+
+def mel_distance(a, b, sample_rate):
+    """Mean absolute log-mel difference over the shorter of the two clips"""
+    import numpy as np
+    ma, mb = log_mel(np.asarray(a), sample_rate), log_mel(np.asarray(b), sample_rate)
+    n = min(len(ma), len(mb))
+    return float(np.mean(np.abs(ma[:n] - mb[:n]))) if n else float('nan')
+
+
+def run_one(preset, quantize, threads):
+    """Measure one configuration in this process and print a JSON line"""
+    import numpy as np
+    import tts_runtime
+    from phrase_bank import wav_bytes
+
+    before = rss_mib()
+    started = time.perf_counter()
+    tts = tts_runtime.load_tts(preset=preset, model='', vocoder='', quantize=quantize, threads=threads)
+    load_s = time.perf_counter() - started
+    rate = tts.synthesizer.output_sample_rate
+
+    with tts_runtime.inference():
+        tts.tts(text='Warm up.')
+    synth_s = audio_s = 0.0
+    os.makedirs(OUT_DIR, exist_ok=True)
+    for i, sentence in enumerate(SENTENCES):
+        t = time.perf_counter()
+        with tts_runtime.inference():
+            wav = np.asarray(tts.tts(text=sentence), dtype=np.float32)
+        synth_s += time.perf_counter() - t
+        audio_s += len(wav) / rate
+        np.save(os.path.join(OUT_DIR, f'{preset}-{quantize}-{i}.npy'), wav)
+        with open(os.path.join(OUT_DIR, f'{preset}-{quantize}-{i}.wav'), 'wb') as f:
+            f.write(wav_bytes(wav, rate))
+    print(json.dumps({'preset': preset, 'quantize': quantize, 'rate': rate, 'load_s': load_s,
+                      'rtf': synth_s / audio_s, 'rss_mib': rss_mib() - before}))
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--one':
+        run_one(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    import numpy as np
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    presets = sys.argv[2].split(',') if len(sys.argv) > 2 else ['quality', 'balanced', 'fast', 'fastest']
+
+    print(f'{threads} threads, {len(SENTENCES)} sentences, WAVs in {OUT_DIR}/')
+    print(f"{'preset':10} {'quant':5} {'load s':>7} {'RTF':>6} {'RSS MiB':>8} {'mel dist':>9}")
+    for preset in presets:
+        for quantize in ('off', 'int8'):
+            result = subprocess.run([sys.executable, __file__, '--one', preset, quantize, str(threads)],
+                                    capture_output=True, text=True)
+            lines = [l for l in result.stdout.splitlines() if l.startswith('{')]
+            if result.returncode or not lines:
+                print(f'{preset:10} {quantize:5} failed: {result.stderr.strip().splitlines()[-1:]}')
+                continue
+            r = json.loads(lines[-1])
+            distance = 0.0
+            if quantize != 'off':
+                distance = float(np.mean([
+                    mel_distance(np.load(os.path.join(OUT_DIR, f'{preset}-off-{i}.npy')),
+                                 np.load(os.path.join(OUT_DIR, f'{preset}-{quantize}-{i}.npy')), r['rate'])
+                    for i in range(len(SENTENCES))]))
+            print(f"{preset:10} {quantize:5} {r['load_s']:7.1f} {r['rtf']:6.3f} {r['rss_mib']:8.0f} {distance:9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Synthetic calendar data shared by the benchmark scripts.
+"""
+
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+# Benchmarks run from the repo root or from this directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+TITLES = [
+    'Team Sync', 'Dentist appointment', 'Workout', 'Deep Work Sprint',
+    'Lunch with Sam', 'Project review', 'Call with café vendor', 'Standup',
+    'Piano lesson', 'Grocery run', 'Flight to Boston', 'Yoga class',
+]
+LOCATIONS = ['', '', '', 'Needham, MA', 'Zoom', 'Office 4B', 'Home']
+
+
+def make_events(count, seed=42, start=None):
+    """Build `count` event dicts in the shape the frontend syncs"""
+    rng = random.Random(seed)
+    base = start or datetime(2025, 1, 1, 8, 0, 0)
+    events = []
+    for i in range(count):
+        begin = base + timedelta(minutes=30 * rng.randrange(0, 365 * 24))
+        end = begin + timedelta(minutes=rng.choice([30, 45, 60, 90, 120]))
+        title = rng.choice(TITLES)
+        events.append({
+            'summary': title,
+            'start': begin.isoformat() + '.000Z',
+            'end': end.isoformat() + '.000Z',
+            'id': str(1700000000000 + i),
+            'created': (begin - timedelta(days=3)).isoformat() + '.000Z',
+            'description': f'Notes for {title.lower()} #{i}' if rng.random() < 0.4 else '',
+            'location': rng.choice(LOCATIONS),
+        })
+    return events
+
+
+def timed(fn, repeat=5):
+    """Best wall-clock time of `repeat` runs, in milliseconds"""
+    import time
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Cache Invalidation
+- Broadcasts "this user's data changed" to every worker and instance, so
+  in-memory caches can live until told otherwise instead of stat()ing the
+  data file on each request
+- Every bus keeps a per-user generation counter; caches key entries by
+  bus.version(user) and a bump makes them stale everywhere
+- Backends: local (one process, or several buses wired to one LocalChannel
+  as a test stand-in), file (append-only log watched by every worker on a
+  host; inotify when inotify_simple is installed, polling otherwise) and
+  redis (pub/sub across hosts, when the redis package is installed)
+"""
+
+import json
+import logging
+import os
+import threading
+import uuid
+
+try:
+    import inotify_simple  # type: ignore
+    INOTIFY_AVAILABLE = True
+except ImportError:
+    INOTIFY_AVAILABLE = False
+
+try:
+    import redis  # type: ignore
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# CACHE_INVALIDATION: stat | local | file | redis
+BACKEND = os.environ.get('CACHE_INVALIDATION', 'file').lower()
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+REDIS_CHANNEL = os.environ.get('CACHE_INVALIDATION_CHANNEL', 'manta-jarvis:invalidate')
+LOG_NAME = '.invalidation.log'
+POLL_INTERVAL = 0.2
+MAX_LOG_BYTES = 1 << 20
+
+# ============================================================================
+# In-Process Bus
+# ============================================================================
+
+class LocalBus:
+    """Per-user generation counters plus listeners, within one process.
+
+    publish() bumps the local counter immediately; subclasses also send the
+    key to other processes, whose buses bump theirs on receipt.
+    """
+
+    name = 'local'
+
+    def __init__(self, channel=None):
+        self.origin = uuid.uuid4().hex
+        self._versions = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._channel = channel
+        if channel is not None:
+            channel.join(self)
+        self.published = 0
+        self.received = 0
+
+    def version(self, key):
+        """Current generation for a key (0 until the first change is seen)"""
+        return self._versions.get(key, 0)
+
+    def subscribe(self, callback):
+        """Call `callback(key)` after every change, local or remote"""
+        with self._lock:
+            self._listeners.append(callback)
+
+    def publish(self, key):
+        """Announce that `key` changed, here and to every other subscriber"""
+        self.published += 1
+        self._deliver(key)
+        try:
+            self._send(key)
+        except Exception as e:
+            logger.error(f"Cache invalidation publish failed ({self.name}): {e}")
+
+    def _send(self, key):
+        if self._channel is not None:
+            self._channel.broadcast(self, key)
+
+    def _receive(self, key, origin):
+        if origin == self.origin:
+            return
+        self.received += 1
+        self._deliver(key)
+
+    def _deliver(self, key):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(key)
+            except Exception as e:
+                logger.error(f"Cache invalidation listener failed: {e}")
+
+    def close(self):
+        if self._channel is not None:
+            self._channel.leave(self)
+
+    def describe(self):
+        return self.name
+
+
+class LocalChannel:
+    """Connects LocalBus instances in one process, standing in for a real
+    transport when simulating several workers"""
+
+    def __init__(self):
+        self._buses = []
+        self._lock = threading.Lock()
+
+    def join(self, bus):
+        with self._lock:
+            self._buses.append(bus)
+
+    def leave(self, bus):
+        with self._lock:
+            if bus in self._buses:
+                self._buses.remove(bus)
+
+    def broadcast(self, sender, key):
+        with self._lock:
+            buses = list(self._buses)
+        for bus in buses:
+            bus._receive(key, sender.origin)
+
+# ============================================================================
+# Single Host: Watched Append-Only Log
+# ============================================================================
+
+class FileWatchBus(LocalBus):
+    """Invalidation over an append-only log file shared by a host's workers.
+
+    Each publish appends one JSON line with O_APPEND, which is atomic for
+    lines this short. Every bus tails the log from where it joined, so a
+    worker only hears about changes made after it started (its caches are
+    empty before that). The log is rotated past MAX_LOG_BYTES; readers
+    finish the old file through their open handle, then reopen the path.
+    """
+
+    name = 'file'
+
+    def __init__(self, path, poll_interval=POLL_INTERVAL, max_bytes=MAX_LOG_BYTES):
+        super().__init__()
+        self.path = path
+        self.poll_interval = poll_interval
+        self.max_bytes = max_bytes
+        self._closed = threading.Event()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = self._open(at_end=True)
+        self._thread = threading.Thread(target=self._watch, name='cache-invalidation', daemon=True)
+        self._thread.start()
+
+    def _open(self, at_end):
+        fd = os.open(self.path, os.O_RDONLY | os.O_CREAT, 0o644)
+        f = os.fdopen(fd, 'rb')
+        if at_end:
+            f.seek(0, os.SEEK_END)
+        return f
+
+    def _send(self, key):
+        line = json.dumps({'key': key, 'origin': self.origin}).encode('utf-8') + b'\n'
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        try:
+            if os.path.getsize(self.path) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except FileNotFoundError:
+            pass
+
+    def _rotated(self):
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return False
+
+    def _drain(self):
+        for line in self._file:
+            if not line.endswith(b'\n'):
+                # A write in progress; pick the whole line up next time
+                self._file.seek(-len(line), os.SEEK_CUR)
+                break
+            try:
+                message = json.loads(line)
+                self._receive(message['key'], message.get('origin'))
+            except (ValueError, KeyError):
+                continue
+
+    def _watch(self):
+        watcher = None
+        if INOTIFY_AVAILABLE:
+            try:
+                watcher = inotify_simple.INotify()
+                flags = inotify_simple.flags
+                watcher.add_watch(os.path.dirname(os.path.abspath(self.path)),
+                                  flags.MODIFY | flags.CREATE | flags.MOVED_TO)
+            except OSError:
+                watcher = None
+
+        while not self._closed.is_set():
+            try:
+                self._drain()
+                if self._rotated():
+                    self._file.close()
+                    self._file = self._open(at_end=False)
+                    continue
+            except Exception as e:
+                logger.error(f"Cache invalidation watcher error: {e}")
+            if watcher is not None:
+                watcher.read(timeout=int(self.poll_interval * 1000))
+            else:
+                self._closed.wait(self.poll_interval)
+
+    def close(self):
+        self._closed.set()
+
+    def describe(self):
+        return f"file ({'inotify' if INOTIFY_AVAILABLE else 'polling'}: {self.path})"
+
+# ============================================================================
+# Multiple Hosts: Redis Pub/Sub
+# ============================================================================
+
+class RedisBus(LocalBus):
+    """Invalidation over a Redis pub/sub channel, for several instances"""
+
+    name = 'redis'
+
+    def __init__(self, url=REDIS_URL, channel=REDIS_CHANNEL):
+        super().__init__()
+        self.url = url
+        self.channel_name = channel
+        self._client = redis.Redis.from_url(url)
+        self._closed = threading.Event()
+        self._thread = threading.Thread(target=self._listen, name='cache-invalidation', daemon=True)
+        self._thread.start()
+
+    def _send(self, key):
+        self._client.publish(self.channel_name, json.dumps({'key': key, 'origin': self.origin}))
+
+    def _listen(self):
+        while not self._closed.is_set():
+            try:
+                pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel_name)
+                for message in pubsub.listen():
+                    if self._closed.is_set():
+                        return
+                    try:
+                        data = json.loads(message['data'])
+                        self._receive(data['key'], data.get('origin'))
+                    except (ValueError, KeyError, TypeError):
+                        continue
+            except Exception as e:
+                logger.error(f"Cache invalidation subscriber lost Redis ({e}); reconnecting")
+                self._closed.wait(1.0)
+
+    def close(self):
+        self._closed.set()
+
+    def describe(self):
+        return f'redis ({self.url}, channel {self.channel_name})'
+
+# ============================================================================
+# Factory
+# ============================================================================
+
+def create_bus(backend=None, data_dir='.'):
+    """Build the configured bus, or None for 'stat' (validate caches by file stat)"""
+    backend = (backend or BACKEND).lower()
+    if backend == 'stat':
+        return None
+    if backend == 'local':
+        return LocalBus()
+    if backend == 'redis':
+        if REDIS_AVAILABLE:
+            return RedisBus()
+        logger.warning("CACHE_INVALIDATION=redis but the redis package is not installed; using file")
+    elif backend != 'file':
+        logger.warning(f"Unknown CACHE_INVALIDATION '{backend}'; using file")
+    return FileWatchBus(os.path.join(data_dir, LOG_NAME))
@@ -5,6 +5,14 @@
 window.CalendarManager = (function() {
   let currentDate = new Date();
 
+  // Upcoming events as rendered (sorted by start) and their list items,
+  // so changes can be patched in without rebuilding the whole list
+  let renderedEvents = [];
+  const renderedItems = new Map();
+  // Set while the list shows server pages and more remain to be fetched
+  let nextCursor = null;
+  let moreButton = null;
+
   function renderCalendar() {
     const grid = document.getElementById('calendarGrid');
     if (!grid) return;
@@ -62,53 +70,167 @@ window.CalendarManager = (function() {
       return;
     }
     
-    const events = await window.getUserEvents(currentUser);
-    console.log('Loading events for user:', currentUser, 'Events:', events);
-    
     const eventList = document.getElementById('eventList');
     if (!eventList) return;
     
+    // Ask the server for the first page, already filtered and sorted;
+    // fall back to sorting the local copy when it is unavailable or empty
+    const page = window.fetchEventsPage ? await window.fetchEventsPage(currentUser) : null;
+    let upcomingEvents;
+    let events = null;
+    if (page && page.events.length > 0) {
+      upcomingEvents = page.events;
+      console.log('Loading events for user:', currentUser, 'Page:', upcomingEvents.length);
+    } else {
+      events = await window.getUserEvents(currentUser);
+      console.log('Loading events for user:', currentUser, 'Events:', events);
+      const now = new Date();
+      upcomingEvents = (events || [])
+        .filter(e => isUpcoming(e, now))
+        .sort(compareByStart);
+    }
+    
     eventList.innerHTML = '';
+    renderedEvents = [];
+    renderedItems.clear();
+    nextCursor = null;
+    moreButton = null;
 
-    if (!events || events.length === 0) {
-      eventList.innerHTML = '<div style="padding: 20px; text-align: center; color: #888;">No events yet. Create one by saying "create event workout tomorrow at 6am"</div>';
+    if (upcomingEvents.length === 0) {
+      eventList.innerHTML = (events && events.length > 0)
+        ? '<div style="padding: 20px; text-align: center; color: #888;">No upcoming events. All your events are in the past.</div>'
+        : '<div style="padding: 20px; text-align: center; color: #888;">No events yet. Create one by saying "create event workout tomorrow at 6am"</div>';
       return;
     }
 
-    const now = new Date();
-    const upcomingEvents = events
-      .filter(e => new Date(e.start) >= now)
-      .sort((a, b) => new Date(a.start) - new Date(b.start));
+    appendEvents(upcomingEvents);
+    if (page && page.events.length > 0) {
+      setNextCursor(page.next_cursor);
+    }
+    
+    console.log('✅ Loaded', upcomingEvents.length, 'upcoming events');
+  }
 
-    if (upcomingEvents.length === 0) {
-      eventList.innerHTML = '<div style="padding: 20px; text-align: center; color: #888;">No upcoming events. All your events are in the past.</div>';
+  async function loadMoreEvents() {
+    const currentUser = window.getCurrentUser ? window.getCurrentUser() : null;
+    if (!currentUser || !nextCursor) return;
+    
+    const page = await window.fetchEventsPage(currentUser, nextCursor);
+    if (!page) return;
+    appendEvents(page.events);
+    setNextCursor(page.next_cursor);
+  }
+
+  function appendEvents(events) {
+    const eventList = document.getElementById('eventList');
+    events.forEach(event => {
+      const eventEl = createEventItem(event);
+      renderedEvents.push(event);
+      renderedItems.set(itemKey(event), eventEl);
+      eventList.insertBefore(eventEl, moreButton);
+    });
+  }
+
+  function setNextCursor(cursor) {
+    nextCursor = cursor || null;
+    if (nextCursor && !moreButton) {
+      moreButton = document.createElement('button');
+      moreButton.className = 'btn-more';
+      moreButton.textContent = 'Show more';
+      moreButton.addEventListener('click', loadMoreEvents);
+      document.getElementById('eventList').appendChild(moreButton);
+    } else if (!nextCursor && moreButton) {
+      moreButton.remove();
+      moreButton = null;
+    }
+  }
+
+  // Server pages list each occurrence of a recurring event separately
+  function itemKey(event) {
+    return `${event.id}|${event.recurrence_id || ''}`;
+  }
+
+  function isUpcoming(event, now) {
+    return new Date(event.start) >= now || Boolean(event.rrule);
+  }
+
+  function compareByStart(a, b) {
+    return new Date(a.start) - new Date(b.start);
+  }
+
+  function createEventItem(event) {
+    const eventEl = document.createElement('div');
+    eventEl.className = 'event-item';
+    
+    const startDate = new Date(event.start);
+    const endDate = new Date(event.end);
+    
+    eventEl.innerHTML = `
+      <div class="event-title">${event.rrule ? '🔁 ' : ''}${event.summary}</div>
+      <div class="event-time">
+        📅 ${startDate.toLocaleDateString('en-US', { weekday: 'short', month: 'short', day: 'numeric' })}<br>
+        ⏰ ${startDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})} - 
+        ${endDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})}
+      </div>
+      <div class="event-actions">
+        <button class="btn-edit" onclick="window.CalendarManager.editEvent('${event.id}')">Edit</button>
+        <button class="btn-delete" onclick="window.CalendarManager.deleteEventById('${event.id}')">Delete</button>
+      </div>
+    `;
+    return eventEl;
+  }
+
+  function removeRendered(eventId) {
+    renderedEvents
+      .filter(e => e.id === eventId)
+      .forEach(e => {
+        renderedItems.get(itemKey(e)).remove();
+        renderedItems.delete(itemKey(e));
+      });
+    renderedEvents = renderedEvents.filter(e => e.id !== eventId);
+  }
+
+  // Patch the upcoming list with { upserted: [events], deleted: [ids] }
+  // instead of reloading and re-sorting every event
+  function applyChanges({ upserted = [], deleted = [] } = {}) {
+    const eventList = document.getElementById('eventList');
+    if (!eventList) return;
+    
+    // An empty list shows a placeholder message, and only the server can
+    // expand a recurring series into pages; rebuild in those cases
+    if (renderedEvents.length === 0 || (nextCursor && upserted.some(e => e.rrule))) {
+      loadEvents();
       return;
     }
 
-    upcomingEvents.forEach(event => {
-      const eventEl = document.createElement('div');
-      eventEl.className = 'event-item';
-      
-      const startDate = new Date(event.start);
-      const endDate = new Date(event.end);
+    deleted.forEach(removeRendered);
+
+    const now = new Date();
+    upserted.forEach(event => {
+      removeRendered(event.id);
+      if (!isUpcoming(event, now)) return;
       
-      eventEl.innerHTML = `
-        <div class="event-title">${event.summary}</div>
-        <div class="event-time">
-          📅 ${startDate.toLocaleDateString('en-US', { weekday: 'short', month: 'short', day: 'numeric' })}<br>
-          ⏰ ${startDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})} - 
-          ${endDate.toLocaleTimeString([], {hour: '2-digit', minute: '2-digit'})}
-        </div>
-        <div class="event-actions">
-          <button class="btn-edit" onclick="window.CalendarManager.editEvent('${event.id}')">Edit</button>
-          <button class="btn-delete" onclick="window.CalendarManager.deleteEventById('${event.id}')">Delete</button>
-        </div>
-      `;
+      // Binary search for the insertion point in start order
+      let lo = 0;
+      let hi = renderedEvents.length;
+      while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (compareByStart(renderedEvents[mid], event) <= 0) lo = mid + 1;
+        else hi = mid;
+      }
+      // Past the last loaded item of a paged list: a later page will show it
+      if (lo === renderedEvents.length && nextCursor) return;
       
-      eventList.appendChild(eventEl);
+      const eventEl = createEventItem(event);
+      const next = renderedEvents[lo];
+      eventList.insertBefore(eventEl, next ? renderedItems.get(itemKey(next)) : moreButton);
+      renderedEvents.splice(lo, 0, event);
+      renderedItems.set(itemKey(event), eventEl);
     });
-    
-    console.log('✅ Loaded', upcomingEvents.length, 'upcoming events');
+
+    if (renderedEvents.length === 0) {
+      loadEvents();
+    }
   }
 
   async function editEvent(eventId) {
@@ -122,7 +244,7 @@ window.CalendarManager = (function() {
     const newTitle = prompt('Edit event title:', event.summary);
     if (newTitle && newTitle !== event.summary) {
       await window.updateEvent(currentUser, eventId, { summary: newTitle });
-      // updateEvent already calls renderCalendar and loadEvents
+      // updateEvent already patches the event list
     }
   }
 
@@ -132,7 +254,7 @@ window.CalendarManager = (function() {
     
     if (confirm('Are you sure you want to delete this event?')) {
       await window.deleteEvent(currentUser, eventId);
-      // deleteEvent already calls renderCalendar and loadEvents
+      // deleteEvent already patches the event list
     }
   }
 
@@ -163,6 +285,8 @@ window.CalendarManager = (function() {
     init,
     renderCalendar,
     loadEvents,
+    applyChanges,
+    loadMoreEvents,
     editEvent,
     deleteEventById
   };
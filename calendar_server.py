@@ -1,159 +1,263 @@
 #!/usr/bin/env python3
 """
 MANTA-JARVIS Unified Calendar Server v2.0
-- Single Flask backend serving everything
-- Per-user .ics calendar feeds for Google Calendar subscription
-- Event sync from frontend
-- Conversational greeting layer
-- Production-ready with environment variable support
+- Two server components (see server.py): "calendar" (event sync, queries,
+  change stream, import, parsing, groups under /api) and "feeds" (per-user
+  and group .ics feeds for Google Calendar subscription)
+- Storage is the shared event_storage layer; rendered feeds, fragments and
+  indexes are cached per data version for every component in the process
+- `gunicorn calendar_server:app` still serves both components on their own
 """
 
-from flask import Flask, Response, request, jsonify
-from flask_cors import CORS
-from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, redirect, stream_with_context, url_for
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 import json
 import os
 import base64
 import logging
+import threading
+import time
+import uuid
 from urllib.parse import quote
 
+import admission_control
+import event_codec
+import event_storage
+import http_compression
+import ics_import
+import nl_parser
+import recurrence
+import server
+import shared_calendars
+from change_feed import ChangeFeed
+from event_storage import (DATA_DIR, archive, count_users, get_user_data_version, invalidation_bus,
+                           load_user_events, store_user_events, user_file_stem)
+from ics_serializer import generate_ics_calendar, render_fragments
+from interval_index import IntervalIndex, format_periods
+from search_index import SearchIndex
+from event_time import format_event_time, parse_event_time
+from request_profiling import phase
+
 # ============================================================================
 # Configuration & Logging
 # ============================================================================
-app = Flask(__name__)
-CORS(app)
+sync_bp = Blueprint('calendar', __name__)
+feeds_bp = Blueprint('feeds', __name__)
 
 # Environment variables
-PORT = int(os.environ.get("PORT", 5000))
-DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
-DATA_DIR = os.environ.get("DATA_DIR", "calendar_data")
-os.makedirs(DATA_DIR, exist_ok=True)
-
-# Logging setup
-logging.basicConfig(
-    level=logging.INFO if not DEBUG else logging.DEBUG,
-    format='[%(levelname)s] %(asctime)s - %(message)s'
-)
+PORT = server.PORT
+DEBUG = server.DEBUG
+MAX_OCCURRENCE_WINDOW_DAYS = int(os.environ.get("MAX_OCCURRENCE_WINDOW_DAYS", 400))
+MAX_SYNC_CONFLICT_CHECKS = 20
+MAX_SEARCH_RESULTS = 50
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 200
+MAX_PARSE_LINES = int(os.environ.get("MAX_PARSE_LINES", 10000))
+# Change stream: heartbeat interval and how long one SSE response may stay
+# open before the client is asked to reconnect (bounds pinned workers)
+STREAM_HEARTBEAT_SECONDS = 25
+STREAM_MAX_SECONDS = int(os.environ.get("STREAM_MAX_SECONDS", 300))
+# Each open stream or long-poll holds a worker thread; above this many per
+# process, new ones are turned away so sync, feeds and TTS keep threads
+MAX_STREAMS = int(os.environ.get("MAX_STREAMS", 16))
+STREAM_BUSY_RETRY_SECONDS = 30
+# Rendered feeds kept per process (least recently requested are dropped)
+FEED_CACHE_SIZE = int(os.environ.get("FEED_CACHE_SIZE", 512))
+# Users' VEVENT fragments and combined group feeds kept per process
+FRAGMENT_CACHE_SIZE = int(os.environ.get("FRAGMENT_CACHE_SIZE", 1024))
+GROUP_FEED_CACHE_SIZE = int(os.environ.get("GROUP_FEED_CACHE_SIZE", 256))
+# Users whose free/busy and search indexes are kept per process (per index type)
+INDEX_CACHE_SIZE = int(os.environ.get("INDEX_CACHE_SIZE", 512))
+
 logger = logging.getLogger(__name__)
 
+groups = shared_calendars.GroupStore(DATA_DIR)
+
 # ============================================================================
-# Helper Functions
+# Change Stream
 # ============================================================================
+# Deltas for users with a connected /api/changes client
+change_feed = ChangeFeed()
 
-def get_user_file_path(username_b64):
-    """Get the file path for a user's event data"""
-    try:
-        safe_name = username_b64.replace('/', '_').replace('\\', '_')
-        return os.path.join(DATA_DIR, f'{safe_name}.json')
-    except Exception as e:
-        logger.error(f"Error getting user file path: {e}")
+@event_storage.on_store
+def publish_changes(username_b64, events):
+    """Record what changed for a user's connected clients, if there are any"""
+    if not change_feed.is_tracked(username_b64):
         return None
+    is_retired = None
+    if archive.enabled:
+        archived = archive.load_manifest(user_file_stem(username_b64))['events']
+        # Events moved to the archive are not deletions
+        is_retired = archived.__contains__
+    return change_feed.update(username_b64, events, is_retired)
 
-def load_user_events(username_b64):
-    """Load events for a user from JSON file"""
-    path = get_user_file_path(username_b64)
-    if not path or not os.path.exists(path):
-        logger.debug(f"No events file found for: {username_b64}")
-        return []
-    
-    try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-            events = data.get('events', [])
-            logger.info(f"✅ Loaded {len(events)} events for user")
-            return events
-    except Exception as e:
-        logger.error(f"Error loading events: {e}")
-        return []
-
-def save_user_events(username_b64, events):
-    """Save events for a user to JSON file"""
-    path = get_user_file_path(username_b64)
-    if not path:
-        return False
-    
-    try:
-        data = {
-            'username_b64': username_b64,
-            'events': events,
-            'last_updated': datetime.utcnow().isoformat()
-        }
-        
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-        
-        logger.info(f"💾 Saved {len(events)} events for user")
+def _on_remote_change(username_b64):
+    # Another worker stored this user's data; diff it for our own clients
+    if change_feed.is_tracked(username_b64):
+        publish_changes(username_b64, load_user_events(username_b64))
+
+if invalidation_bus:
+    invalidation_bus.subscribe(_on_remote_change)
+
+_open_streams = [0]
+_open_streams_lock = threading.Lock()
+
+def acquire_stream_slot():
+    """Count one more open stream; False if MAX_STREAMS are already open"""
+    with _open_streams_lock:
+        if MAX_STREAMS and _open_streams[0] >= MAX_STREAMS:
+            return False
+        _open_streams[0] += 1
         return True
-    except Exception as e:
-        logger.error(f"Error saving events: {e}")
-        return False
 
-def format_datetime_ics(iso_str):
-    """Convert ISO 8601 datetime to iCalendar format (YYYYMMDDTHHMMSSZ)"""
-    try:
-        dt_str = iso_str.replace('Z', '+00:00')
-        dt = datetime.fromisoformat(dt_str)
-        return dt.strftime('%Y%m%dT%H%M%SZ')
-    except Exception as e:
-        logger.warning(f"Date format error for '{iso_str}': {e}")
-        return datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-
-def generate_ics_calendar(events):
-    """Generate iCalendar (.ics) format from events list"""
-    lines = [
-        'BEGIN:VCALENDAR',
-        'VERSION:2.0',
-        'PRODID:-//MANTA-JARVIS//Calendar//EN',
-        'CALSCALE:GREGORIAN',
-        'METHOD:PUBLISH',
-        'X-WR-CALNAME:MANTA-JARVIS',
-        'X-WR-TIMEZONE:UTC',
-        'X-WR-CALDESC:Your personal MANTA-JARVIS calendar'
-    ]
+def release_stream_slot():
+    with _open_streams_lock:
+        _open_streams[0] -= 1
+
+def format_sse(event, data, event_id=None):
+    """One Server-Sent Events message"""
+    lines = [f'id: {event_id}'] if event_id else []
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return '\n'.join(lines) + '\n\n'
+
+# ============================================================================
+# Rendered Feed Cache
+# ============================================================================
+# Per-user caches below are LRUs: OrderedDicts trimmed to a size on insert
+_cache_lock = threading.Lock()
+
+def cache_get(cache, key):
+    with _cache_lock:
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+        return entry
+
+def cache_put(cache, key, entry, size):
+    with _cache_lock:
+        cache[key] = entry
+        cache.move_to_end(key)
+        while len(cache) > size:
+            cache.popitem(last=False)
+
+# username_b64 -> (data version, CompressedVariants of the rendered ICS, event count)
+_feed_cache = OrderedDict()
+
+def get_rendered_feed(username_b64):
+    """Return (CompressedVariants, event_count) for a user's ICS feed.
+
+    The ICS text and each compressed encoding are built once per data
+    version and reused until the user's events change.
+    """
+    version = get_user_data_version(username_b64)
+    cached = cache_get(_feed_cache, username_b64)
+    if cached and version is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    events = load_user_events(username_b64)
+    with phase('render'):
+        variants = http_compression.CompressedVariants(generate_ics_calendar(events))
+    if version is not None:
+        cache_put(_feed_cache, username_b64, (version, variants, len(events)), FEED_CACHE_SIZE)
+    return variants, len(events)
+
+# username_b64 -> (data version, start-sorted VEVENT fragments)
+_fragment_cache = OrderedDict()
+# group id -> ((name, members, member versions), CompressedVariants, event count)
+_group_feed_cache = OrderedDict()
+
+def get_user_fragments(username_b64, version):
+    """A user's events rendered as start-sorted VEVENT fragments (cached per version)"""
+    cached = cache_get(_fragment_cache, username_b64)
+    if cached and version is not None and cached[0] == version:
+        return cached[1]
+    fragments = render_fragments(load_user_events(username_b64))
+    if version is not None:
+        cache_put(_fragment_cache, username_b64, (version, fragments), FRAGMENT_CACHE_SIZE)
+    return fragments
+
+def get_group_feed(group):
+    """Return (CompressedVariants, event_count) for a group's combined feed.
+
+    Only members whose data changed are re-rendered; the rest of the feed
+    is a merge of cached fragments.
+    """
+    members = tuple(group['members'])
+    versions = tuple(get_user_data_version(m) for m in members)
+    key = (group['name'], members, versions)
+    cached = cache_get(_group_feed_cache, group['id'])
+    if cached and None not in versions and cached[0] == key:
+        return cached[1], cached[2]
     
-    for event in events:
-        try:
-            event_id = event.get('id', str(hash(event.get('summary', ''))))
-            summary = event.get('summary', 'Untitled Event')
-            start = event.get('start')
-            end = event.get('end')
-            description = event.get('description', '')
-            location = event.get('location', '')
-            created = event.get('created', datetime.utcnow().isoformat())
-            
-            if not start:
-                logger.warning(f"Skipping event without start time: {summary}")
-                continue
-            
-            dtstart = format_datetime_ics(start)
-            dtend = format_datetime_ics(end if end else start)
-            dtstamp = format_datetime_ics(created)
-            
-            lines.extend([
-                'BEGIN:VEVENT',
-                f'UID:{event_id}@manta-jarvis.local',
-                f'DTSTAMP:{dtstamp}',
-                f'DTSTART:{dtstart}',
-                f'DTEND:{dtend}',
-                f'SUMMARY:{summary}',
-                'STATUS:CONFIRMED',
-                'SEQUENCE:0'
-            ])
-            
-            if description:
-                lines.append(f'DESCRIPTION:{description}')
-            if location:
-                lines.append(f'LOCATION:{location}')
-            
-            lines.append('END:VEVENT')
-            logger.debug(f"✅ Added event to calendar: {summary}")
-            
-        except Exception as e:
-            logger.error(f"Error processing event: {e}")
-            continue
+    with phase('render'):
+        parts = [get_user_fragments(m, v) for m, v in zip(members, versions)]
+        text, count = shared_calendars.render_group_calendar(group['name'], parts)
+        variants = http_compression.CompressedVariants(text)
+    cache_put(_group_feed_cache, group['id'], (key, variants, count), GROUP_FEED_CACHE_SIZE)
+    return variants, count
+
+# ============================================================================
+# Per-User Indexes (free/busy, conflicts, search)
+# ============================================================================
+# index class -> LRU of {username_b64: (data version, index)}
+_user_indexes = {IntervalIndex: OrderedDict(), SearchIndex: OrderedDict()}
+
+def get_user_index(index_cls, username_b64):
+    """Return a user's index of the given type, refreshing it if the data changed"""
+    registry = _user_indexes[index_cls]
+    version = get_user_data_version(username_b64)
+    cached = cache_get(registry, username_b64)
+    if cached and cached[0] == version:
+        return cached[1]
     
-    lines.append('END:VCALENDAR')
-    return '\r\n'.join(lines) + '\r\n'
+    events = load_user_events(username_b64)
+    with phase('index'):
+        if cached:
+            index = cached[1]
+            index.update(events)
+        else:
+            index = index_cls(events)
+    cache_put(registry, username_b64, (version, index), INDEX_CACHE_SIZE)
+    return index
+
+def refresh_user_indexes(username_b64, events):
+    """Apply a sync to a user's already-built indexes.
+
+    Returns {index class: result of index.update()} for the indexes touched.
+    """
+    version = get_user_data_version(username_b64)
+    results = {}
+    for index_cls, registry in _user_indexes.items():
+        cached = cache_get(registry, username_b64)
+        if cached:
+            results[index_cls] = cached[1].update(events)
+            cache_put(registry, username_b64, (version, cached[1]), INDEX_CACHE_SIZE)
+    return results
+
+def parse_window(args, default_span):
+    """Read start/end query parameters; returns (start, end, error message)"""
+    window_start = parse_event_time(args.get('start')) or datetime.now(timezone.utc)
+    window_end = parse_event_time(args.get('end')) or window_start + default_span
+    
+    if window_end <= window_start:
+        return None, None, 'end must be after start'
+    if window_end - window_start > timedelta(days=MAX_OCCURRENCE_WINDOW_DAYS):
+        return None, None, f'window must not exceed {MAX_OCCURRENCE_WINDOW_DAYS} days'
+    return window_start, window_end, None
+
+def encode_cursor(position):
+    """Opaque pagination cursor for a (start_epoch, key) position"""
+    return base64.urlsafe_b64encode(json.dumps(list(position)).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """(start_epoch, key) from a cursor, or None if it is malformed"""
+    try:
+        start, key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return int(start), str(key)
+    except (ValueError, TypeError):
+        return None
 
 def get_base_url():
     """Get the base URL for calendar feed URLs"""
@@ -165,7 +269,7 @@ def get_base_url():
 # API Endpoints
 # ============================================================================
 
-@app.route('/api/sync', methods=['POST'])
+@sync_bp.route('/api/sync', methods=['POST'])
 def sync_events():
     """
     Sync events from frontend to backend storage
@@ -185,17 +289,28 @@ def sync_events():
             logger.warning("Sync request missing username_b64")
             return jsonify({'error': 'username_b64 required'}), 400
         
-        success = save_user_events(username_b64, events)
+        events = store_user_events(username_b64, events)
         
-        if success:
+        if events is not None:
             base_url = get_base_url()
             calendar_url = f'{base_url}/calendar/{username_b64}.ics'
             logger.info(f"✅ Synced {len(events)} events for {username_b64}")
             
+            # Report overlaps for the few events this sync added or moved
+            conflicts = {}
+            changed = refresh_user_indexes(username_b64, events).get(IntervalIndex) or []
+            if 0 < len(changed) <= MAX_SYNC_CONFLICT_CHECKS:
+                index = get_user_index(IntervalIndex, username_b64)
+                for key in changed:
+                    found = index.conflicts(index.get(key))
+                    if found:
+                        conflicts[key] = [e.get('id') for e in found]
+            
             return jsonify({
                 'status': 'success',
                 'events_count': len(events),
                 'calendar_url': calendar_url,
+                'conflicts': conflicts,
                 'message': 'Events synced successfully'
             }), 200
         else:
@@ -205,7 +320,7 @@ def sync_events():
         logger.error(f"Sync error: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/calendar/<username_b64>.ics', methods=['GET'])
+@feeds_bp.route('/calendar/<username_b64>.ics', methods=['GET'])
 def serve_calendar(username_b64):
     """
     Serve iCalendar feed for Google Calendar subscription
@@ -214,36 +329,523 @@ def serve_calendar(username_b64):
     """
     try:
         logger.info(f"📡 Calendar feed requested for: {username_b64}")
+        # Feed URLs from the old TTS server carry the raw email
+        if '@' in username_b64:
+            username_b64 = event_storage.username_for_email(username_b64)
         
-        events = load_user_events(username_b64)
+        variants, event_count = get_rendered_feed(username_b64)
+        return feed_response(variants, event_count)
         
-        if not events:
-            logger.debug(f"⚠️ No events found, returning empty calendar")
-            empty_cal = generate_ics_calendar([])
-            response = Response(empty_cal, mimetype='text/calendar')
-            response.headers['Content-Disposition'] = 'inline; filename="calendar.ics"'
-            response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-            return response
+    except Exception as e:
+        logger.error(f"Calendar feed error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@feeds_bp.route('/calendar/group/<group_id>.ics', methods=['GET'])
+def serve_group_calendar(group_id):
+    """
+    Serve one combined iCalendar feed for a shared calendar group
+    
+    URL: /calendar/group/<group_id>.ics
+    """
+    try:
+        group = groups.get(group_id)
+        if group is None:
+            return jsonify({'error': 'Group not found'}), 404
+        logger.info(f"📡 Group feed requested for: {group['name']}")
         
-        ics_content = generate_ics_calendar(events)
+        variants, event_count = get_group_feed(group)
+        return feed_response(variants, event_count, 'manta-jarvis-shared.ics')
         
-        logger.info(f"📅 Serving calendar with {len(events)} events")
+    except Exception as e:
+        logger.error(f"Group feed error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@feeds_bp.route('/calendar.ics', methods=['GET'])
+def serve_legacy_calendar():
+    """
+    The old app.py feed URL, kept so existing subscriptions keep working
+    
+    URL: /calendar.ics[?username_b64=...]
+    With a user it redirects (301) to /calendar/<username_b64>.ics;
+    without one it serves the sample calendar the old route returned.
+    """
+    try:
+        username_b64 = request.args.get('username_b64')
+        if username_b64:
+            return redirect(url_for('feeds.serve_calendar', username_b64=username_b64), code=301)
         
-        response = Response(ics_content, mimetype='text/calendar')
-        response.headers['Content-Disposition'] = 'inline; filename="manta-jarvis.ics"'
-        response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
-        response.headers['Expires'] = '0'
+        now = datetime.now(timezone.utc)
+        samples = [
+            {'id': 'sample-1', 'summary': 'Deep Work Sprint', 'description': 'Focus block for calendar backend',
+             'location': 'Needham, MA', 'start': format_event_time(now + timedelta(days=1, hours=14)),
+             'end': format_event_time(now + timedelta(days=1, hours=16))},
+            {'id': 'sample-2', 'summary': 'Team Sync', 'description': 'Status + blockers',
+             'start': format_event_time(now + timedelta(days=2, hours=15)),
+             'end': format_event_time(now + timedelta(days=2, hours=16))},
+        ]
+        variants = http_compression.CompressedVariants(generate_ics_calendar(samples))
+        return feed_response(variants, len(samples), 'calendar.ics')
         
+    except Exception as e:
+        logger.error(f"Sample calendar error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def feed_response(variants, event_count, filename='manta-jarvis.ics'):
+    """Conditional, content-negotiated response for a rendered ICS feed"""
+    # Unchanged feed: let polling clients skip the download entirely
+    if request.if_none_match.contains_weak(variants.etag):
+        response = Response(status=304)
+        response.set_etag(variants.etag, weak=True)
+        response.vary.add('Accept-Encoding')
+        response.headers['Cache-Control'] = 'no-cache, must-revalidate'
         return response
+    
+    with phase('compress'):
+        payload, encoding = variants.for_request(request)
+    
+    if not event_count:
+        logger.debug(f"⚠️ No events found, returning empty calendar")
+        filename = 'calendar.ics'
+    else:
+        logger.info(f"📅 Serving calendar with {event_count} events ({encoding or 'identity'})")
+    
+    response = Response(payload, mimetype='text/calendar')
+    http_compression.apply_encoding(response, encoding)
+    response.headers['Content-Disposition'] = f'inline; filename="{filename}"'
+    response.set_etag(variants.etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache, must-revalidate'
+    response.headers['Pragma'] = 'no-cache'
+    response.headers['Expires'] = '0'
+    
+    return response
+
+@sync_bp.route('/api/groups', methods=['POST'])
+def create_group():
+    """
+    Create a shared calendar group
+    
+    Request body:
+    {
+        "name": "Family",
+        "members": ["username_b64", ...]
+    }
+    """
+    try:
+        data = request.get_json() or {}
+        group = groups.create(data.get('name'), data.get('members'))
+        return jsonify({'status': 'success', **group_payload(group)}), 201
+    except shared_calendars.GroupError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Group create error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sync_bp.route('/api/groups/<group_id>', methods=['GET', 'PUT', 'DELETE'])
+def manage_group(group_id):
+    """
+    Read, update ({"name", "members"}) or delete a shared calendar group
+    """
+    try:
+        if request.method == 'DELETE':
+            if not groups.delete(group_id):
+                return jsonify({'error': 'Group not found'}), 404
+            with _cache_lock:
+                _group_feed_cache.pop(group_id, None)
+            return jsonify({'status': 'success'}), 200
         
+        if request.method == 'PUT':
+            data = request.get_json() or {}
+            group = groups.update(group_id, data.get('name'), data.get('members'))
+        else:
+            group = groups.get(group_id)
+        if group is None:
+            return jsonify({'error': 'Group not found'}), 404
+        return jsonify({'status': 'success', **group_payload(group)}), 200
+    except shared_calendars.GroupError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
-        logger.error(f"Calendar feed error: {e}")
+        logger.error(f"Group error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def group_payload(group):
+    return {
+        'group_id': group['id'],
+        'name': group['name'],
+        'members': group['members'],
+        'calendar_url': f"{get_base_url()}/calendar/group/{group['id']}.ics",
+    }
+
+@sync_bp.route('/api/events', methods=['GET'])
+def list_events():
+    """
+    Page through events in start order, recurring events expanded
+    
+    Query: ?username_b64=...&start=<ISO 8601>&end=<ISO 8601>&limit=20&cursor=...
+    Lists events starting in [start, end); start defaults to now and end
+    to start + MAX_OCCURRENCE_WINDOW_DAYS. Pass next_cursor from the
+    previous page (with the same start/end) to get the next one.
+    """
+    try:
+        username_b64 = request.args.get('username_b64')
+        if not username_b64:
+            return jsonify({'error': 'username_b64 required'}), 400
+        
+        window_start, window_end, error = parse_window(
+            request.args, timedelta(days=MAX_OCCURRENCE_WINDOW_DAYS))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        try:
+            limit = min(max(int(request.args.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        after = None
+        if request.args.get('cursor'):
+            after = decode_cursor(request.args['cursor'])
+            if after is None:
+                return jsonify({'error': 'invalid cursor'}), 400
+        
+        index = get_user_index(IntervalIndex, username_b64)
+        items, position = index.page(window_start, window_end, limit, after)
+        
+        return jsonify({
+            'status': 'success',
+            'start': window_start.isoformat(),
+            'end': window_end.isoformat(),
+            'count': len(items),
+            'events': [event for _, _, event in items],
+            'next_cursor': encode_cursor(position) if position else None
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Event listing error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sync_bp.route('/api/occurrences', methods=['GET'])
+def get_occurrences():
+    """
+    List event occurrences in a time window, expanding recurring events
+    
+    Query: ?username_b64=...&start=<ISO 8601>&end=<ISO 8601>&include_archive=true
+    start defaults to now, end defaults to start + 1 day. Archived (past)
+    events are only read when include_archive is set.
+    """
+    try:
+        username_b64 = request.args.get('username_b64')
+        if not username_b64:
+            return jsonify({'error': 'username_b64 required'}), 400
+        
+        window_start, window_end, error = parse_window(request.args, timedelta(days=1))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        events = load_user_events(username_b64)
+        if request.args.get('include_archive', '').lower() == 'true':
+            events = events + archive.query(user_file_stem(username_b64), window_start, window_end)
+        occurrences = recurrence.expand_events(events, window_start, window_end)
+        
+        return jsonify({
+            'status': 'success',
+            'start': window_start.isoformat(),
+            'end': window_end.isoformat(),
+            'count': len(occurrences),
+            'occurrences': occurrences
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Occurrence query error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sync_bp.route('/api/freebusy', methods=['GET'])
+def get_freebusy():
+    """
+    Answer "am I free?" for a time window from the user's interval index
+    
+    Query: ?username_b64=...&start=<ISO 8601>&end=<ISO 8601>[&events=1]
+    start defaults to now, end defaults to start + 1 hour.
+    """
+    try:
+        username_b64 = request.args.get('username_b64')
+        if not username_b64:
+            return jsonify({'error': 'username_b64 required'}), 400
+        
+        window_start, window_end, error = parse_window(request.args, timedelta(hours=1))
+        if error:
+            return jsonify({'error': error}), 400
+        
+        index = get_user_index(IntervalIndex, username_b64)
+        busy = index.busy(window_start, window_end)
+        
+        result = {
+            'status': 'success',
+            'start': window_start.isoformat(),
+            'end': window_end.isoformat(),
+            'free': not busy,
+            'busy': format_periods(busy)
+        }
+        if request.args.get('events') in ('1', 'true'):
+            result['events'] = [e for _, _, e in index.overlapping(window_start, window_end)]
+        
+        return jsonify(result), 200
+        
+    except Exception as e:
+        logger.error(f"Free/busy query error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sync_bp.route('/api/conflicts', methods=['POST'])
+def check_conflicts():
+    """
+    Check a candidate event for overlaps before creating it
+    
+    Request body:
+    {
+        "username_b64": "base64_encoded_username",
+        "event": {"start": "...", "end": "...", "rrule": "..."}
+    }
+    """
+    try:
+        data = request.get_json()
+        username_b64 = data.get('username_b64')
+        event = data.get('event')
+        
+        if not username_b64:
+            return jsonify({'error': 'username_b64 required'}), 400
+        if not isinstance(event, dict) or not event.get('start'):
+            return jsonify({'error': 'event with start required'}), 400
+        
+        conflicts = get_user_index(IntervalIndex, username_b64).conflicts(event)
+        
+        return jsonify({
+            'status': 'success',
+            'has_conflict': bool(conflicts),
+            'conflicts': conflicts
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Conflict check error: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/get-calendar-url', methods=['POST'])
+@sync_bp.route('/api/search', methods=['GET'])
+def search_events():
+    """
+    Full-text search over event summary, description and location
+    
+    Query: ?username_b64=...&q=dentist&limit=10
+    Supports prefix matches ("dent") and small typos ("dentst").
+    """
+    try:
+        username_b64 = request.args.get('username_b64')
+        query = (request.args.get('q') or '').strip()
+        
+        if not username_b64:
+            return jsonify({'error': 'username_b64 required'}), 400
+        if not query:
+            return jsonify({'error': 'q required'}), 400
+        
+        try:
+            limit = max(1, min(int(request.args.get('limit', 10)), MAX_SEARCH_RESULTS))
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        
+        matches = get_user_index(SearchIndex, username_b64).search(query, limit=limit)
+        
+        return jsonify({
+            'status': 'success',
+            'query': query,
+            'count': len(matches),
+            'results': [dict(event, score=score) for score, event in matches]
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Search error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sync_bp.route('/api/changes', methods=['GET'])
+def stream_changes():
+    """
+    Stream a user's event changes as Server-Sent Events
+    
+    Query: ?username_b64=...[&since=<version>][&wait=<seconds>]
+    Each "change" message carries {version, upserted: [events], deleted: [ids]}.
+    A "reset" message means the client's version could not be resumed and
+    it should reload everything. Reconnects resume from Last-Event-ID.
+    With wait=, answers once as JSON (long-poll) instead of streaming.
+    Above MAX_STREAMS open streams per process, a stream is closed at once
+    with a long retry delay (EventSource reconnects later; a 503 would make
+    it give up) and a long-poll gets 503.
+    """
+    username_b64 = request.args.get('username_b64')
+    if not username_b64:
+        return jsonify({'error': 'username_b64 required'}), 400
+    since = request.headers.get('Last-Event-ID') or request.args.get('since')
+    
+    def load():
+        return load_user_events(username_b64)
+    
+    if request.args.get('wait') is not None:
+        try:
+            wait = min(max(float(request.args.get('wait')), 0.0), STREAM_HEARTBEAT_SECONDS)
+        except ValueError:
+            return jsonify({'error': 'wait must be a number of seconds'}), 400
+        if not acquire_stream_slot():
+            return admission_control.rejection_response(
+                admission_control.Overloaded('Too many open change streams', STREAM_BUSY_RETRY_SECONDS))
+        try:
+            current = change_feed.subscribe(username_b64, load)
+            try:
+                changes, latest = change_feed.wait(username_b64, since, wait) if since else ([], current)
+            finally:
+                change_feed.unsubscribe(username_b64)
+        finally:
+            release_stream_slot()
+        return jsonify({
+            'status': 'success',
+            'version': latest,
+            'reset': changes is None,
+            'changes': [{'version': v, 'upserted': up, 'deleted': dl} for v, up, dl in changes or ()]
+        }), 200
+    
+    def stream():
+        current = change_feed.subscribe(username_b64, load)
+        try:
+            yield 'retry: 3000\n\n'
+            cursor = since
+            if not cursor:
+                cursor = current
+                yield format_sse('hello', {'version': current}, current)
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+            while time.monotonic() < deadline:
+                changes, latest = change_feed.wait(username_b64, cursor, STREAM_HEARTBEAT_SECONDS)
+                if changes is None:
+                    if latest is None:
+                        return
+                    cursor = latest
+                    yield format_sse('reset', {'version': latest}, latest)
+                elif not changes:
+                    yield ': keepalive\n\n'
+                else:
+                    for version, upserted, deleted in changes:
+                        cursor = version
+                        yield format_sse('change', {'version': version, 'upserted': upserted, 'deleted': deleted}, version)
+        finally:
+            change_feed.unsubscribe(username_b64)
+    
+    headers = {
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    }
+    if not acquire_stream_slot():
+        logger.warning(f"🚦 {MAX_STREAMS} change streams open, asking client to retry later")
+        return Response(f'retry: {STREAM_BUSY_RETRY_SECONDS * 1000}\n\n', mimetype='text/event-stream',
+                        headers=headers)
+    
+    response = Response(stream(), mimetype='text/event-stream', headers=headers)
+    # Runs when the server closes the response, even if the stream never started
+    response.call_on_close(release_stream_slot)
+    return response
+
+@sync_bp.route('/api/import', methods=['POST'])
+def import_calendar():
+    """
+    Import an uploaded .ics file into a user's events
+    
+    Query: ?username_b64=...
+    Body: multipart form with a "file" field, or the raw text/calendar data.
+    The file is parsed as it is read and merged by UID, then stored once;
+    the response is newline-delimited JSON with one progress object per
+    IMPORT_BATCH_SIZE events, the last one carrying "done": true (or
+    "status": "error").
+    """
+    username_b64 = request.args.get('username_b64')
+    if not username_b64:
+        return jsonify({'error': 'username_b64 required'}), 400
+    upload = request.files.get('file')
+    source = upload.stream if upload is not None else request.stream
+    
+    def store(events):
+        if store_user_events(username_b64, events) is None:
+            raise IOError('Failed to save events')
+    
+    def stream():
+        try:
+            for progress in ics_import.merge_import(source, load_user_events(username_b64), store):
+                if progress['done']:
+                    logger.info(f"📥 Imported {progress['parsed']} events for {username_b64} "
+                                f"({progress['added']} new, {progress['updated']} updated)")
+                    progress['status'] = 'success'
+                yield json.dumps(progress) + '\n'
+        except Exception as e:
+            logger.error(f"Import error: {e}")
+            yield json.dumps({'status': 'error', 'error': str(e), 'done': True}) + '\n'
+    
+    return Response(stream_with_context(stream()), mimetype='application/x-ndjson', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+@sync_bp.route('/api/parse', methods=['POST'])
+def parse_commands():
+    """
+    Turn natural-language lines ("dentist tuesday at 3pm") into events
+    
+    Request body:
+    {
+        "lines": ["...", ...]   (or "text": one command per line),
+        "tz": "America/New_York",       (optional, default UTC)
+        "now": "2026-01-01T12:00:00Z",  (optional reference time)
+        "username_b64": "...", "save": true   (optional: add them to the user's events)
+    }
+    Parses exactly like the chat box (nl_parser mirrors app.js); lines that
+    are not event commands come back as null.
+    """
+    try:
+        data = request.get_json() or {}
+        lines = data.get('lines')
+        if lines is None:
+            lines = (data.get('text') or '').splitlines()
+        if not isinstance(lines, list) or not all(isinstance(l, str) for l in lines):
+            return jsonify({'error': 'lines must be a list of strings'}), 400
+        if len(lines) > MAX_PARSE_LINES:
+            return jsonify({'error': f'at most {MAX_PARSE_LINES} lines per request'}), 400
+        
+        now = parse_event_time(data.get('now')) if data.get('now') else None
+        try:
+            events = nl_parser.parse_lines(lines, now, data.get('tz'))
+        except (KeyError, ValueError) as e:
+            return jsonify({'error': f'unknown time zone: {e}'}), 400
+        parsed = [e for e in events if e]
+        
+        saved = 0
+        if data.get('save') and parsed:
+            username_b64 = data.get('username_b64')
+            if not username_b64:
+                return jsonify({'error': 'username_b64 required to save'}), 400
+            # Millisecond ids like saveEvent() in app.js, with a batch suffix so
+            # they can never equal an id the browser hands out (or another batch)
+            stamp = datetime.now(timezone.utc)
+            batch = f'{int(stamp.timestamp() * 1000)}-{uuid.uuid4().hex[:8]}'
+            for i, event in enumerate(parsed):
+                event['id'] = f'{batch}-{i}'
+                event['created'] = format_event_time(stamp)
+            if store_user_events(username_b64, load_user_events(username_b64) + parsed) is None:
+                return jsonify({'error': 'Failed to save events'}), 500
+            saved = len(parsed)
+            logger.info(f"✅ Parsed and saved {saved} events for {username_b64}")
+        
+        return jsonify({
+            'status': 'success',
+            'events': events,
+            'parsed': len(parsed),
+            'failed': len(events) - len(parsed),
+            'saved': saved
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Parse error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@sync_bp.route('/api/get-calendar-url', methods=['POST'])
 def get_calendar_url():
     """
     Get the calendar URL for a user (called after login)
@@ -269,10 +871,9 @@ def get_calendar_url():
         logger.error(f"Error generating calendar URL: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/')
 def index():
     """Home page with status and instructions"""
-    users = len([f for f in os.listdir(DATA_DIR) if f.endswith('.json')]) if os.path.exists(DATA_DIR) else 0
+    users = count_users()
     
     return f'''
     <html>
@@ -328,6 +929,7 @@ def index():
                     ✅ Server is running on port {PORT}<br>
                     👥 Active users: {users}<br>
                     📁 Data directory: {os.path.abspath(DATA_DIR)}<br>
+                    🗜️ Event codec: {event_codec.describe()}<br>
                     🔧 Debug mode: {'ON' if DEBUG else 'OFF'}
                 </div>
                 
@@ -343,11 +945,66 @@ def index():
                     <small>Get unique calendar URL after login</small>
                 </div>
                 
+                <div class="endpoint">
+                    <strong>GET</strong> /api/events?username_b64=&amp;limit=20[&amp;cursor=]<br>
+                    <small>Upcoming events in start order, one page at a time</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>GET</strong> /api/occurrences?username_b64=&amp;start=&amp;end=[&amp;include_archive=true]<br>
+                    <small>Events in a time window, with recurring events expanded</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>GET</strong> /api/freebusy?username_b64=&amp;start=&amp;end=<br>
+                    <small>Busy periods and a free/busy answer for a time window</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>POST</strong> /api/conflicts<br>
+                    <small>Overlap check for a new event</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>GET</strong> /api/changes?username_b64=[&amp;since=][&amp;wait=]<br>
+                    <small>Server-Sent Events stream of event changes (long-poll with wait=)</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>POST</strong> /api/parse<br>
+                    <small>Batch natural-language parsing ("dentist tuesday at 3pm" per line)</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>POST</strong> /api/import?username_b64=<br>
+                    <small>Import an .ics file (merged by UID, progress as NDJSON)</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>GET</strong> /api/search?username_b64=&amp;q=<br>
+                    <small>Find events by title, description or location</small>
+                </div>
+                
                 <div class="endpoint">
                     <strong>GET</strong> /calendar/&lt;username_b64&gt;.ics<br>
                     <small>iCalendar feed for Google Calendar subscription</small>
                 </div>
                 
+                <div class="endpoint">
+                    <strong>GET</strong> /calendar.ics[?username_b64=]<br>
+                    <small>Old feed URL: redirects to the user's feed, or serves sample events</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>POST</strong> /api/groups &nbsp; <strong>GET/PUT/DELETE</strong> /api/groups/&lt;group_id&gt;<br>
+                    <small>Shared calendar groups (name + member username_b64 list)</small>
+                </div>
+                
+                <div class="endpoint">
+                    <strong>GET</strong> /calendar/group/&lt;group_id&gt;.ics<br>
+                    <small>One combined feed for all members of a group</small>
+                </div>
+                
                 <h2>🚀 How to Use</h2>
                 <ol>
                     <li>Open <code>index.html</code> in your browser</li>
@@ -361,8 +1018,8 @@ def index():
                 
                 <h2>🔗 Deployment</h2>
                 <ul>
-                    <li><strong>Render.com:</strong> Start command: <code>gunicorn calendar_server:app</code></li>
-                    <li><strong>Environment variables:</strong> PORT, DEBUG, DATA_DIR</li>
+                    <li><strong>Render.com:</strong> Start command: <code>gunicorn --worker-class gthread --threads 64 'server:create_app()'</code> (threads keep idle change streams cheap; SERVER_COMPONENTS picks what one process serves)</li>
+                    <li><strong>Environment variables:</strong> PORT, DEBUG, DATA_DIR, DATA_LAYOUT, EVENT_CODEC, EVENT_COMPRESSION, SYNC_COALESCE_SECONDS, CACHE_INVALIDATION, REDIS_URL, ARCHIVE_AFTER_DAYS, ARCHIVE_COMPRESSION, SERVER_TIMING, PROFILE_SAMPLE_RATE, PROFILE_TOKEN, PROFILER, PROFILE_DIR, STREAM_MAX_SECONDS, IMPORT_BATCH_SIZE, MAX_GROUP_MEMBERS, RATE_LIMIT_BACKEND, RATE_LIMIT_IP, RATE_LIMIT_ROUTE, RATE_LIMIT_FEED, MAX_IN_FLIGHT, PROXY_HOPS, MAX_PARSE_LINES, SERVER_COMPONENTS, LEGACY_EVENTS_DIR, MAX_STREAMS, FEED_CACHE_SIZE, FRAGMENT_CACHE_SIZE, GROUP_FEED_CACHE_SIZE, INDEX_CACHE_SIZE</li>
                     <li><strong>Requirements:</strong> Flask, Flask-CORS, gunicorn, Werkzeug</li>
                 </ul>
             </div>
@@ -370,32 +1027,40 @@ def index():
     </html>
     '''
 
-@app.route('/health')
 def health():
-    """Health check endpoint"""
-    users = len([f for f in os.listdir(DATA_DIR) if f.endswith('.json')]) if os.path.exists(DATA_DIR) else 0
-    return jsonify({
-        'status': 'ok',
+    """Calendar part of /health"""
+    return {
         'server': 'MANTA-JARVIS Calendar Server v2.0',
-        'users': users,
+        'users': count_users(),
+        'streams': change_feed.stats()['subscribers'],
+        'open_streams': _open_streams[0],
+        'max_streams': MAX_STREAMS,
         'port': PORT
-    })
+    }
+
+# ============================================================================
+# Components
+# ============================================================================
+# Feed URLs are public, so each feed token also gets its own bucket
+_feed_rate = admission_control.parse_rate(admission_control.RATE_LIMIT_FEED)
+
+server.register(server.Component('calendar', sync_bp, exempt={'stream_changes'},
+                                 health=health, index=index))
+server.register(server.Component('feeds', feeds_bp, route_limits={
+    'serve_calendar': [('feed', _feed_rate, lambda req: req.view_args.get('username_b64'))],
+    'serve_group_calendar': [('group', _feed_rate, lambda req: req.view_args.get('group_id'))],
+}))
+
+def __getattr__(name):
+    # `gunicorn calendar_server:app`: both calendar components, built on first use
+    if name == 'app':
+        globals()['app'] = server.create_app(['calendar', 'feeds'])
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ============================================================================
 # Application Startup
 # ============================================================================
 
 if __name__ == '__main__':
-    logger.info('=' * 70)
-    logger.info('🗓️  MANTA-JARVIS UNIFIED CALENDAR SERVER v2.0')
-    logger.info('=' * 70)
-    logger.info(f'📁 Data directory: {os.path.abspath(DATA_DIR)}')
-    logger.info(f'🌐 Server URL: http://localhost:{PORT}')
-    logger.info(f'📅 Calendar feeds: http://localhost:{PORT}/calendar/<username>.ics')
-    logger.info(f'🔧 Debug mode: {DEBUG}')
-    logger.info('=' * 70)
-    logger.info('✨ Server ready! Open index.html in your browser.')
-    logger.info('Press Ctrl+C to stop')
-    logger.info('=' * 70)
-    
-    app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
+    server.run(['calendar', 'feeds'])
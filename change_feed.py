@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Change Feed
+- Per-user stream of deltas (upserted events, deleted ids) with a version
+  token, for Server-Sent Events and long-poll clients
+- Deltas are computed by diffing each new event list against a snapshot of
+  content fingerprints, so they work the same for local syncs and for
+  changes announced by other workers over the invalidation bus
+- Only users with a connected client are tracked; their log lingers
+  briefly after the last disconnect so a reconnecting client can resume
+- Versions are "<epoch>:<seq>"; a token from another process or an
+  expired one gets a reset, after which the client reloads in full
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+
+from event_versioning import fingerprint, match_key
+
+HISTORY = 256          # deltas kept per user for resuming clients
+LINGER_SECONDS = 120   # how long a log outlives its last subscriber
+
+
+def event_id(event):
+    """Identifier the frontend uses for an event"""
+    return event.get('id') or event.get('uid')
+
+
+class _UserLog:
+    __slots__ = ('seq', 'changes', 'snapshot', 'subscribers', 'idle_since', 'cond')
+
+    def __init__(self, events, lock, history):
+        self.cond = threading.Condition(lock)  # per user, so a change wakes only its own waiters
+        self.seq = 0
+        self.changes = deque(maxlen=history)   # (seq, upserted, deleted)
+        self.snapshot = {match_key(e): (fingerprint(e), event_id(e)) for e in events}
+        self.subscribers = 0
+        self.idle_since = None
+
+
+class ChangeFeed:
+    """Per-user change logs that clients can wait on"""
+
+    def __init__(self, history=HISTORY, linger=LINGER_SECONDS):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.history = history
+        self.linger = linger
+        self._logs = {}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Subscriptions
+    # ------------------------------------------------------------------
+
+    def subscribe(self, key, load_events):
+        """Start tracking a user; `load_events()` seeds the snapshot on first use.
+
+        Returns the current version token.
+        """
+        with self._lock:
+            log = self._logs.get(key)
+        if log is None:
+            events = load_events()
+            with self._lock:
+                log = self._logs.setdefault(key, _UserLog(events, self._lock, self.history))
+        with self._lock:
+            log.subscribers += 1
+            log.idle_since = None
+            return self._token(log.seq)
+
+    def unsubscribe(self, key):
+        with self._lock:
+            log = self._logs.get(key)
+            if log is not None:
+                log.subscribers -= 1
+                if log.subscribers <= 0:
+                    log.idle_since = time.monotonic()
+            self._prune()
+
+    def is_tracked(self, key):
+        return key in self._logs
+
+    def _prune(self):
+        now = time.monotonic()
+        expired = [k for k, log in self._logs.items()
+                   if log.subscribers <= 0 and log.idle_since is not None and now - log.idle_since > self.linger]
+        for k in expired:
+            del self._logs[k]
+
+    # ------------------------------------------------------------------
+    # Publishing
+    # ------------------------------------------------------------------
+
+    def update(self, key, events, is_retired=None):
+        """Diff a user's new event list against the snapshot and record the delta.
+
+        `is_retired(match_key)` marks removed events that were moved rather
+        than deleted (e.g. archived); those are not reported as deletions.
+        Returns the new version token, or None if nothing changed or the
+        user is not tracked.
+        """
+        if key not in self._logs:
+            return None
+        fingerprints = [(match_key(e), (fingerprint(e), event_id(e)), e) for e in events]
+        with self._lock:
+            log = self._logs.get(key)
+            if log is None:
+                return None
+            current = {}
+            upserted = []
+            for mkey, entry, event in fingerprints:
+                current[mkey] = entry
+                if log.snapshot.get(mkey) != entry:
+                    upserted.append(event)
+            deleted = [eid for mkey, (_, eid) in log.snapshot.items()
+                       if mkey not in current and not (is_retired and is_retired(mkey))]
+            log.snapshot = current
+            if not upserted and not deleted:
+                return None
+            log.seq += 1
+            log.changes.append((log.seq, upserted, deleted))
+            log.cond.notify_all()
+            return self._token(log.seq)
+
+    # ------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------
+
+    def _token(self, seq):
+        return f'{self.epoch}:{seq}'
+
+    def _parse(self, token):
+        epoch, _, seq = (token or '').partition(':')
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def changes_since(self, key, token):
+        """([(token, upserted, deleted), ...], latest token), or (None, latest) if
+        the client must reload because its token cannot be resumed"""
+        with self._lock:
+            return self._changes_locked(key, token)
+
+    def _changes_locked(self, key, token):
+        log = self._logs.get(key)
+        if log is None:
+            return None, None
+        latest = self._token(log.seq)
+        since = self._parse(token)
+        if since is None or since > log.seq:
+            return None, latest
+        if since == log.seq:
+            return [], latest
+        if not log.changes or log.changes[0][0] > since + 1:
+            return None, latest  # fell out of the history window
+        return [(self._token(seq), up, dl) for seq, up, dl in log.changes if seq > since], latest
+
+    def wait(self, key, token, timeout):
+        """Block until there are changes after `token` (or a reset), or timeout"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            while True:
+                changes, latest = self._changes_locked(key, token)
+                if changes is None or changes:
+                    return changes, latest
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return changes, latest
+                self._logs[key].cond.wait(remaining)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tracked_users': len(self._logs),
+                'subscribers': sum(max(log.subscribers, 0) for log in self._logs.values()),
+            }
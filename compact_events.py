@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Compact Events
+- Columnar in-memory form of one user's event list, for keeping many
+  calendars resident: packed epoch-millisecond arrays instead of
+  timestamp strings, repeated strings (summary, location, rrule) stored
+  once per table, descriptions kept as UTF-8 bytes and decoded on access
+- Lossless: to_dicts() returns exactly the dicts from_dicts() was given.
+  Values the columns cannot represent verbatim (other timestamp formats,
+  unknown fields, explicit nulls) are kept per row in a side dict
+"""
+
+import re
+from array import array
+from datetime import date
+from functools import lru_cache
+
+_MISSING = -(2 ** 63)
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Timestamps as the frontend writes them (toISOString), with or without millis
+_ISO_MS_RE = re.compile(r'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{3})?Z\Z')
+
+TIME_FIELDS = ('start', 'end', 'created', 'last_modified')
+STRING_FIELDS = ('summary', 'location', 'rrule')
+COLUMN_FIELDS = ('id', 'uid', 'sequence', 'description') + TIME_FIELDS + STRING_FIELDS
+
+
+@lru_cache(maxsize=1 << 16)
+def _day_number(text):
+    """Days since 1970-01-01 for 'YYYY-MM-DD', or None if it is not a real date"""
+    try:
+        return date.fromisoformat(text).toordinal() - _EPOCH_ORDINAL
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1 << 16)
+def _day_prefix(day):
+    return date.fromordinal(day + _EPOCH_ORDINAL).isoformat() + 'T'
+
+
+def _encode_time(value):
+    """(epoch ms, has_millis) for a canonical UTC timestamp string, else None"""
+    if type(value) is not str or not _ISO_MS_RE.match(value):
+        return None
+    day = _day_number(value[:10])
+    hour, minute, second = int(value[11:13]), int(value[14:16]), int(value[17:19])
+    if day is None or hour > 23 or minute > 59 or second > 59:
+        return None
+    with_millis = len(value) == 24
+    ms = ((day * 24 + hour) * 60 + minute) * 60_000 + second * 1000
+    if with_millis:
+        ms += int(value[20:23])
+    return ms, with_millis
+
+
+def _decode_time(ms, with_millis):
+    day, rest = divmod(ms, 86_400_000)
+    hour, rest = divmod(rest, 3_600_000)
+    minute, rest = divmod(rest, 60_000)
+    second, millis = divmod(rest, 1000)
+    if with_millis:
+        return f'{_day_prefix(day)}{hour:02d}:{minute:02d}:{second:02d}.{millis:03d}Z'
+    return f'{_day_prefix(day)}{hour:02d}:{minute:02d}:{second:02d}Z'
+
+
+class EventTable:
+    """One user's events stored column-wise; row i is the i-th event"""
+
+    def __init__(self):
+        self._strings = [None]          # interned values; index 0 means absent
+        self._string_index = {}
+        self.ids = []
+        self._sequence = array('i')
+        self._times = {f: array('q') for f in TIME_FIELDS}
+        self._flags = array('B')        # bit per time field (value had millis), then uid == id
+        self._refs = {f: array('I') for f in STRING_FIELDS}
+        self._descriptions = []         # UTF-8 bytes, or None when absent
+        self._extras = {}               # row -> {field: value} kept verbatim
+
+    @classmethod
+    def from_dicts(cls, events):
+        table = cls()
+        for event in events:
+            table.append(event)
+        return table
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _intern(self, value):
+        index = self._string_index.get(value)
+        if index is None:
+            index = len(self._strings)
+            self._strings.append(value)
+            self._string_index[value] = index
+        return index
+
+    # ------------------------------------------------------------------
+    # Encoding
+    # ------------------------------------------------------------------
+
+    def append(self, event):
+        """Add one event dict as a new row"""
+        row = len(self.ids)
+        extras = {}
+
+        event_id = event.get('id')
+        if 'id' in event and type(event_id) is not str:
+            extras['id'] = event_id
+            event_id = None
+        self.ids.append(event_id)
+
+        # A uid equal to the id is the common case (stable_uid) and costs
+        # one flag bit; any other uid is kept verbatim
+        uid = event.get('uid')
+        uid_same = 'uid' in event and event_id is not None and uid == event_id
+        if 'uid' in event and not uid_same:
+            extras['uid'] = uid
+
+        sequence = event.get('sequence')
+        if 'sequence' in event and type(sequence) is int and 0 <= sequence < 2 ** 31:
+            self._sequence.append(sequence)
+        else:
+            self._sequence.append(-1)
+            if 'sequence' in event:
+                extras['sequence'] = sequence
+
+        flags = 0
+        for bit, field in enumerate(TIME_FIELDS):
+            encoded = _encode_time(event[field]) if field in event else None
+            if encoded is None:
+                self._times[field].append(_MISSING)
+                if field in event:
+                    extras[field] = event[field]
+            else:
+                self._times[field].append(encoded[0])
+                if encoded[1]:
+                    flags |= 1 << bit
+        if uid_same:
+            flags |= 1 << len(TIME_FIELDS)
+        self._flags.append(flags)
+
+        for field in STRING_FIELDS:
+            value = event.get(field)
+            if field in event and type(value) is str:
+                self._refs[field].append(self._intern(value))
+            else:
+                self._refs[field].append(0)
+                if field in event:
+                    extras[field] = value
+
+        description = event.get('description')
+        if 'description' in event and type(description) is str:
+            self._descriptions.append(description.encode('utf-8'))
+        else:
+            self._descriptions.append(None)
+            if 'description' in event:
+                extras['description'] = description
+
+        for field, value in event.items():
+            if field not in COLUMN_FIELDS:
+                extras[field] = value
+        if extras:
+            self._extras[row] = extras
+
+    # ------------------------------------------------------------------
+    # Decoding
+    # ------------------------------------------------------------------
+
+    def start_ms(self, row):
+        """Start of a row in epoch milliseconds, or None"""
+        value = self._times['start'][row]
+        return None if value == _MISSING else value
+
+    def description(self, row):
+        """Decoded description of a row (None if absent)"""
+        raw = self._descriptions[row]
+        if raw is None:
+            return self._extras.get(row, {}).get('description')
+        return raw.decode('utf-8')
+
+    def to_dict(self, row):
+        """The original event dict for a row"""
+        event = {}
+        extras = self._extras.get(row, {})
+        flags = self._flags[row]
+
+        if self.ids[row] is not None:
+            event['id'] = self.ids[row]
+        if flags & (1 << len(TIME_FIELDS)):
+            event['uid'] = self.ids[row]
+        if self._sequence[row] >= 0:
+            event['sequence'] = self._sequence[row]
+        for bit, field in enumerate(TIME_FIELDS):
+            value = self._times[field][row]
+            if value != _MISSING:
+                event[field] = _decode_time(value, flags & (1 << bit))
+        for field in STRING_FIELDS:
+            index = self._refs[field][row]
+            if index:
+                event[field] = self._strings[index]
+        if self._descriptions[row] is not None:
+            event['description'] = self._descriptions[row].decode('utf-8')
+        if extras:
+            event.update(extras)
+        return event
+
+    def to_dicts(self):
+        return [self.to_dict(row) for row in range(len(self.ids))]
+
+    def __iter__(self):
+        return (self.to_dict(row) for row in range(len(self.ids)))
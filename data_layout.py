@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Data Directory Layout
+- Hash-sharded per-user files: DATA_DIR/<ab>/<cd>/<name>.json, where abcd
+  are the first hex digits of sha1(name); 65,536 leaf directories keep
+  each directory small at millions of users
+- The old flat layout (DATA_DIR/<name>.json) stays readable during the move
+- Online migration: every save lands in the sharded path and removes the
+  flat copy; migrate_flat_files() moves the rest in the background or from
+  the command line
+
+Usage: python data_layout.py migrate [data_dir]
+"""
+
+import hashlib
+import itertools
+import logging
+import os
+import sys
+import threading
+import time
+
+import event_codec
+
+logger = logging.getLogger(__name__)
+
+# DATA_LAYOUT: sharded | flat
+LAYOUT = os.environ.get('DATA_LAYOUT', 'sharded').lower()
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+def shard_parts(name):
+    """Shard subdirectory names for a file stem, e.g. ('3f', 'a2')"""
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+    return tuple(digest[i * SHARD_WIDTH:(i + 1) * SHARD_WIDTH] for i in range(SHARD_LEVELS))
+
+
+def sharded_path(data_dir, name, extension):
+    return os.path.join(data_dir, *shard_parts(name), name + extension)
+
+
+def flat_path(data_dir, name, extension):
+    return os.path.join(data_dir, name + extension)
+
+
+def user_path(data_dir, name, extension, layout=None):
+    """Where a user's file is written under the configured layout"""
+    if (layout or LAYOUT) == 'flat':
+        return flat_path(data_dir, name, extension)
+    return sharded_path(data_dir, name, extension)
+
+
+def candidate_paths(data_dir, name, extensions):
+    """Every path a user's file may live at, preferred layout first"""
+    layouts = ('flat', 'sharded') if LAYOUT == 'flat' else ('sharded', 'flat')
+    for layout in layouts:
+        for extension in extensions:
+            yield user_path(data_dir, name, extension, layout)
+
+
+def iter_user_files(data_dir):
+    """Yield paths of all event files in both layouts"""
+    if not os.path.isdir(data_dir):
+        return
+    stack = [(data_dir, 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            entries = os.scandir(directory)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if depth < SHARD_LEVELS and len(entry.name) == SHARD_WIDTH:
+                        stack.append((entry.path, depth + 1))
+                elif event_codec.is_event_file(entry.name):
+                    yield entry.path
+
+
+def count_user_files(data_dir):
+    return sum(1 for _ in iter_user_files(data_dir))
+
+
+def iter_flat_files(data_dir):
+    """Yield (path, stem, extension) for event files still in the flat layout"""
+    if not os.path.isdir(data_dir):
+        return
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and event_codec.is_event_file(entry.name):
+                stem = event_codec.strip_extension(entry.name)
+                yield entry.path, stem, entry.name[len(stem):]
+
+
+def has_flat_files(data_dir):
+    return next(iter_flat_files(data_dir), None) is not None
+
+
+def migrate_file(data_dir, path, stem, extension):
+    """Move one flat file into its shard; a sharded copy, if any, is newer and wins.
+
+    The flat file is hard-linked into place, which fails if the target
+    exists, so a save landing at any point during the move is never
+    overwritten by the older flat copy.
+    """
+    target = sharded_path(data_dir, stem, extension)
+    try:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.link(path, target)
+            moved = True
+        except FileExistsError:
+            moved = False
+        os.remove(path)
+        return moved
+    except FileNotFoundError:
+        # Another worker moved it first, or a save already removed the flat copy
+        return False
+
+
+def migrate_flat_files(data_dir, batch_size=1000, pause=0.0):
+    """Move all flat-layout files into the sharded layout; returns files moved.
+
+    Sleeps `pause` seconds between batches so a live server keeps its I/O.
+    """
+    moved = 0
+    while True:
+        # Rescan per batch rather than holding a million-entry listing in memory
+        batch = list(itertools.islice(iter_flat_files(data_dir), batch_size))
+        if not batch:
+            return moved
+        for path, stem, extension in batch:
+            if migrate_file(data_dir, path, stem, extension):
+                moved += 1
+        if pause:
+            time.sleep(pause)
+
+
+def start_background_migration(data_dir, batch_size=1000, pause=0.05):
+    """Migrate flat files on a daemon thread if the sharded layout is active"""
+    if LAYOUT == 'flat' or not has_flat_files(data_dir):
+        return None
+
+    def run():
+        moved = migrate_flat_files(data_dir, batch_size, pause)
+        logger.info(f"📦 Moved {moved} user files into the sharded layout")
+
+    thread = threading.Thread(target=run, name='data-layout-migration', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print(__doc__.strip())
+        sys.exit(1)
+    target_dir = sys.argv[2] if len(sys.argv) > 2 else os.environ.get('DATA_DIR', 'calendar_data')
+    print(f'Moved {migrate_flat_files(target_dir)} files into the sharded layout under {target_dir}/')
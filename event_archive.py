@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Event Archive
+- Hot/cold tiering: events that ended more than ARCHIVE_AFTER_DAYS ago
+  move out of the user's hot file into compressed per-year segments
+- A small per-user manifest (event key -> content fingerprint) lets a sync
+  drop archived events the client re-sends unchanged without opening any
+  segment, so the hot file stays small even though clients send everything
+- Archived events stay queryable through explicit range queries, which
+  only open the segments that can overlap the range
+- An archived event missing from a sync was deleted on the client, and is
+  removed from its segment and the manifest
+
+Usage: python event_archive.py compact [data_dir]   (run with the server stopped)
+"""
+
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import data_layout
+import event_codec
+import recurrence
+from event_time import event_bounds
+from event_versioning import fingerprint, match_key
+
+try:
+    import fcntl
+except ImportError:  # Windows: archive writes are only serialized within a process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Events that ended this many days ago are archived (0 disables tiering)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', 365))
+# Segments are written once and read rarely, so favour ratio over speed
+ARCHIVE_COMPRESSION = os.environ.get('ARCHIVE_COMPRESSION', 'zstd').lower()
+
+SEGMENT_EXTENSION = '.{year}.archive'
+MANIFEST_EXTENSION = '.archive-index'
+LOCK_EXTENSION = '.archive-lock'
+MANIFEST_CACHE_SIZE = 1024
+
+
+def archive_year(event):
+    """Segment year of an event: the year its last occurrence ends, or None
+    for open-ended series and events without a start"""
+    end = recurrence.series_end(event)
+    return end.year if end else None
+
+
+def split_events(events, cutoff):
+    """Split events into (hot, cold); cold ones ended before `cutoff`"""
+    hot, cold = [], []
+    for event in events:
+        try:
+            end = recurrence.series_end(event)
+        except recurrence.RecurrenceError:
+            end = None
+        (cold if end is not None and end < cutoff else hot).append(event)
+    return hot, cold
+
+
+def write_file(path, payload):
+    """Atomically replace `path` with `payload` via a temp file of its own.
+
+    Every writer gets a unique temp name, so two writers to the same target
+    never share one; the temp file is removed if anything fails.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.',
+                                    prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class EventArchive:
+    """Compressed per-user, per-year segments of past events under a data directory"""
+
+    def __init__(self, data_dir, after_days=ARCHIVE_AFTER_DAYS, compression=ARCHIVE_COMPRESSION):
+        self.data_dir = data_dir
+        self.after_days = after_days
+        self.compression = compression
+        self._manifests = OrderedDict()  # stem -> (stat token, manifest)
+        self._lock = threading.RLock()
+
+    @property
+    def enabled(self):
+        return self.after_days > 0
+
+    def cutoff(self, now=None):
+        """Events ending before this instant belong in the archive"""
+        return (now or datetime.now(timezone.utc)) - timedelta(days=self.after_days)
+
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+
+    def _find(self, stem, extension):
+        for path in data_layout.candidate_paths(self.data_dir, stem, (extension,)):
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _write(self, stem, extension, data, compression):
+        path = data_layout.user_path(self.data_dir, stem, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write_file(path, event_codec.dumps(data, compression=compression))
+        # A copy left in the other layout would shadow nothing but waste space
+        for stale in data_layout.candidate_paths(self.data_dir, stem, (extension,)):
+            if stale != path and os.path.exists(stale):
+                os.remove(stale)
+        return path
+
+    @contextlib.contextmanager
+    def locked(self, stem):
+        """Exclusive hold on a user's archive across threads and worker processes.
+
+        An flock on a per-user lock file: every holder opens the file itself,
+        so threads of one process exclude each other as well.
+        """
+        if fcntl is None:
+            with self._lock:
+                yield
+            return
+        path = data_layout.user_path(self.data_dir, stem, LOCK_EXTENSION)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)  # releases the lock
+
+    def load_manifest(self, stem):
+        """{'events': {key: fingerprint}, 'years': {year: count}}; empty if nothing is archived"""
+        path = self._find(stem, MANIFEST_EXTENSION)
+        if path is None:
+            return {'events': {}, 'years': {}}
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return {'events': {}, 'years': {}}
+        token = (path, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._manifests.get(stem)
+            if cached and cached[0] == token:
+                self._manifests.move_to_end(stem)
+                return cached[1]
+
+        with open(path, 'rb') as f:
+            manifest = event_codec.loads(f.read())
+
+        with self._lock:
+            self._manifests[stem] = (token, manifest)
+            self._manifests.move_to_end(stem)
+            while len(self._manifests) > MANIFEST_CACHE_SIZE:
+                self._manifests.popitem(last=False)
+        return manifest
+
+    def load_segment(self, stem, year):
+        path = self._find(stem, SEGMENT_EXTENSION.format(year=year))
+        if path is None:
+            return []
+        with open(path, 'rb') as f:
+            return event_codec.loads(f.read()).get('events', [])
+
+    # ------------------------------------------------------------------
+    # Tiering
+    # ------------------------------------------------------------------
+
+    def drop_archived(self, stem, events):
+        """Remove events that are already archived with identical content"""
+        archived = self.load_manifest(stem)['events']
+        if not archived:
+            return events
+        return [e for e in events if archived.get(match_key(e)) != fingerprint(e)]
+
+    def drop_deleted(self, stem, events):
+        """Remove archived events the client no longer sends; returns how many.
+
+        Clients send their whole history on every sync (the same list that
+        replaces the hot file), so an archived event missing from it was
+        deleted. An empty sync removes nothing, so a client that has not
+        loaded its events yet cannot wipe the archive. The manifest says
+        whether anything is missing, so the common case opens no segment.
+        """
+        archived = self.load_manifest(stem)['events']
+        if not archived or not events:
+            return 0
+        present = {match_key(e) for e in events}
+        if all(key in present for key in archived):
+            return 0
+
+        removed = 0
+        with self.locked(stem):
+            manifest = self.load_manifest(stem)
+            keys = {k: v for k, v in manifest['events'].items() if k in present}
+            years = {int(y): n for y, n in manifest['years'].items()}
+            for year in sorted(years):
+                segment = self.load_segment(stem, year)
+                kept = [e for e in segment if match_key(e) in present]
+                if len(kept) == len(segment):
+                    continue
+                removed += len(segment) - len(kept)
+                extension = SEGMENT_EXTENSION.format(year=year)
+                if kept:
+                    self._write(stem, extension, {'year': year, 'events': kept}, self.compression)
+                    years[year] = len(kept)
+                else:
+                    for path in data_layout.candidate_paths(self.data_dir, stem, (extension,)):
+                        if os.path.exists(path):
+                            os.remove(path)
+                    del years[year]
+            if removed or len(keys) != len(manifest['events']):
+                self._write(stem, MANIFEST_EXTENSION,
+                            {'events': keys, 'years': {str(y): n for y, n in sorted(years.items())}}, 'none')
+        if removed:
+            logger.info(f"🗑️ Removed {removed} deleted events from the archive")
+        return removed
+
+    def archive(self, stem, cold_events):
+        """Merge cold events into their year segments; returns how many were written.
+
+        Segments are written before the manifest and the caller rewrites
+        the hot file last, so a crash part way leaves events duplicated in
+        both tiers (and fixed by the next sync), never lost. The whole
+        read-merge-write runs under locked(stem), so workers archiving the
+        same user at once both land in the segment.
+        """
+        by_year = {}
+        for event in cold_events:
+            year = archive_year(event)
+            if year is not None:
+                by_year.setdefault(year, []).append(event)
+        if not by_year:
+            return 0
+
+        with self.locked(stem):
+            manifest = self.load_manifest(stem)
+            keys = dict(manifest['events'])
+            years = {int(y): n for y, n in manifest['years'].items()}
+            for year, events in by_year.items():
+                merged = {match_key(e): e for e in self.load_segment(stem, year)}
+                for event in events:
+                    merged[match_key(event)] = event
+                    keys[match_key(event)] = fingerprint(event)
+                segment = sorted(merged.values(), key=lambda e: str(e.get('start') or ''))
+                self._write(stem, SEGMENT_EXTENSION.format(year=year),
+                            {'year': year, 'events': segment}, self.compression)
+                years[year] = len(segment)
+            self._write(stem, MANIFEST_EXTENSION,
+                        {'events': keys, 'years': {str(y): n for y, n in sorted(years.items())}}, 'none')
+        logger.info(f"🧊 Archived {sum(len(v) for v in by_year.values())} past events into {len(by_year)} segment(s)")
+        return sum(len(v) for v in by_year.values())
+
+    def query(self, stem, window_start, window_end):
+        """Archived events overlapping [window_start, window_end), sorted by start"""
+        years = [int(y) for y in self.load_manifest(stem)['years']]
+        # Segments hold events by the year they end, so anything ending
+        # before the window's year cannot overlap it
+        found = []
+        for year in sorted(y for y in years if y >= window_start.year):
+            for event in self.load_segment(stem, year):
+                start, _ = event_bounds(event)
+                end = recurrence.series_end(event)
+                if start is not None and end is not None and recurrence.overlaps(start, end, window_start, window_end):
+                    found.append(event)
+        found.sort(key=lambda e: event_bounds(e)[0])
+        return found
+
+
+def compact_data_dir(data_dir, after_days=ARCHIVE_AFTER_DAYS):
+    """Offline compaction of every hot file under a data directory; returns events archived"""
+    archive = EventArchive(data_dir, after_days)
+    cutoff = archive.cutoff()
+    total = 0
+    for path in data_layout.iter_user_files(data_dir):
+        with open(path, 'rb') as f:
+            data = event_codec.loads(f.read())
+        hot, cold = split_events(data.get('events', []), cutoff)
+        if not cold:
+            continue
+        name = os.path.basename(path)
+        stem = event_codec.strip_extension(name)
+        total += archive.archive(stem, cold)
+        # Rewrite in the file's own format; the extension says which
+        codec, _, compression = name[len(stem) + 1:].partition('.')
+        compression = {'gz': 'gzip', 'zst': 'zstd'}.get(compression, 'none')
+        data['events'] = hot
+        write_file(path, event_codec.dumps(data, codec, compression))
+    return total
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'compact':
+        print(__doc__.strip())
+        sys.exit(1)
+    target_dir = sys.argv[2] if len(sys.argv) > 2 else os.environ.get('DATA_DIR', 'calendar_data')
+    print(f'Archived {compact_data_dir(target_dir)} past events under {target_dir}/')
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Event Codecs
+- Pluggable serialization for per-user event files
+- JSON via orjson when installed, compact stdlib json otherwise
+- Optional MessagePack body with optional gzip/zstd compression
+- Formats are sniffed on read, so files written by older versions still load
+"""
+
+import gzip
+import json
+import os
+
+try:
+    import orjson  # type: ignore
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack  # type: ignore
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard  # type: ignore
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# ============================================================================
+# Configuration
+# ============================================================================
+# EVENT_CODEC: json | msgpack
+# EVENT_COMPRESSION: none | gzip | zstd
+CODEC = os.environ.get('EVENT_CODEC', 'json').lower()
+COMPRESSION = os.environ.get('EVENT_COMPRESSION', 'none').lower()
+
+GZIP_MAGIC = b'\x1f\x8b'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+CODEC_EXTENSIONS = {'json': '.json', 'msgpack': '.msgpack'}
+COMPRESSION_EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+# Every extension an event file may carry, most common first
+KNOWN_EXTENSIONS = tuple(
+    codec_ext + comp_ext
+    for codec_ext in CODEC_EXTENSIONS.values()
+    for comp_ext in COMPRESSION_EXTENSIONS.values()
+)
+
+# ============================================================================
+# JSON
+# ============================================================================
+
+def json_dumps(obj):
+    """Serialize to compact UTF-8 JSON bytes"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+def json_loads(raw):
+    """Parse JSON from bytes or str"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+# ============================================================================
+# Codec Selection
+# ============================================================================
+
+def resolve(codec=None, compression=None):
+    """Return the (codec, compression) pair that will actually be used.
+
+    Falls back to json / no compression when the optional library for the
+    requested format is not installed.
+    """
+    codec = (codec or CODEC).lower()
+    compression = (compression or COMPRESSION).lower()
+
+    if codec not in CODEC_EXTENSIONS or (codec == 'msgpack' and not MSGPACK_AVAILABLE):
+        codec = 'json'
+    if compression not in COMPRESSION_EXTENSIONS or (compression == 'zstd' and not ZSTD_AVAILABLE):
+        compression = 'gzip' if compression == 'zstd' else 'none'
+    return codec, compression
+
+def file_extension(codec=None, compression=None):
+    """File extension for the given (or configured) codec"""
+    codec, compression = resolve(codec, compression)
+    return CODEC_EXTENSIONS[codec] + COMPRESSION_EXTENSIONS[compression]
+
+def is_event_file(filename):
+    """True if filename carries one of the known event file extensions"""
+    return filename.endswith(KNOWN_EXTENSIONS)
+
+def strip_extension(filename):
+    """Remove a known event file extension, longest match first"""
+    for ext in sorted(KNOWN_EXTENSIONS, key=len, reverse=True):
+        if filename.endswith(ext):
+            return filename[:-len(ext)]
+    return filename
+
+# ============================================================================
+# Encode / Decode
+# ============================================================================
+
+def dumps(data, codec=None, compression=None):
+    """Encode a document to bytes using the given (or configured) codec"""
+    codec, compression = resolve(codec, compression)
+
+    if codec == 'msgpack':
+        raw = msgpack.packb(data, use_bin_type=True)
+    else:
+        raw = json_dumps(data)
+
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compress(raw)
+    if compression == 'gzip':
+        return gzip.compress(raw, compresslevel=6, mtime=0)
+    return raw
+
+def loads(raw):
+    """Decode bytes written by any codec, including legacy indented JSON"""
+    if raw.startswith(ZSTD_MAGIC):
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError('zstd-compressed event file but zstandard is not installed')
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    elif raw.startswith(GZIP_MAGIC):
+        raw = gzip.decompress(raw)
+
+    head = raw.lstrip()[:1]
+    if head in (b'{', b'[') or raw.startswith(b'\xef\xbb\xbf'):
+        return json_loads(raw.decode('utf-8-sig'))
+
+    if not MSGPACK_AVAILABLE:
+        raise RuntimeError('MessagePack event file but msgpack is not installed')
+    return msgpack.unpackb(raw, raw=False)
+
+def describe():
+    """Human-readable description of the active codec"""
+    codec, compression = resolve()
+    backend = 'orjson' if codec == 'json' and ORJSON_AVAILABLE else codec
+    return backend if compression == 'none' else f'{backend}+{compression}'
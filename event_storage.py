@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Event Storage
+- The one storage layer for per-user event lists, used by every server
+  component (calendar sync, feeds, TTS) in the process: sharded files in
+  DATA_DIR, the configured codec, coalesced writes, hot/cold archive
+- One events cache and one invalidation bus per process, so a component
+  mounted next to others reuses their warm entries instead of re-reading
+- get_user_data_version() is the cache key for everything derived from a
+  user's events (feeds, fragments, indexes)
+- Listeners registered with on_store() see every stored list (the change
+  stream uses this)
+- One-shot import of the older stores (app.py's user_events/ directory and
+  the TTS server's user_events.json shards) into DATA_DIR
+
+Usage: python event_storage.py import-legacy
+"""
+
+import base64
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+import cache_invalidation
+import data_layout
+import event_archive
+import event_codec
+from event_versioning import stamp_events
+from request_profiling import phase
+from shared_event_store import SharedEventStore
+from write_buffer import WriteBuffer
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.environ.get("DATA_DIR", "calendar_data")
+os.makedirs(DATA_DIR, exist_ok=True)
+# Seconds to coalesce bursts of /api/sync writes per user (0 = write through)
+SYNC_COALESCE_SECONDS = float(os.environ.get("SYNC_COALESCE_SECONDS", 0.5))
+# Parsed event lists kept in memory while an invalidation bus is active
+EVENTS_CACHE_SIZE = int(os.environ.get("EVENTS_CACHE_SIZE", 1024))
+# Directory of the old app.py server ({username_b64, events} JSON per user)
+LEGACY_EVENTS_DIR = os.environ.get("LEGACY_EVENTS_DIR", "user_events")
+# Held by the one process importing the legacy stores; a lock not touched
+# for LEGACY_IMPORT_LOCK_STALE seconds was left by a crash and is taken over
+LEGACY_IMPORT_LOCK = os.path.join(DATA_DIR, '.legacy-import.lock')
+LEGACY_IMPORT_LOCK_STALE = 600
+
+# Move any users still in the flat layout into shards without blocking startup
+data_layout.start_background_migration(DATA_DIR)
+
+# Tells every worker (and, with redis, every instance) when a user's data
+# changes; None means caches fall back to checking the file on each request
+invalidation_bus = cache_invalidation.create_bus(data_dir=DATA_DIR)
+
+# Cold tier for events that ended more than ARCHIVE_AFTER_DAYS ago
+archive = event_archive.EventArchive(DATA_DIR)
+
+# ============================================================================
+# Paths
+# ============================================================================
+
+def user_file_stem(username_b64):
+    """Filesystem-safe file name (without extension) for a user"""
+    return username_b64.replace('/', '_').replace('\\', '_')
+
+def get_user_file_path(username_b64, extension=None):
+    """Get the file path for a user's event data under the configured layout"""
+    try:
+        return data_layout.user_path(DATA_DIR, user_file_stem(username_b64),
+                                     extension or event_codec.file_extension())
+    except Exception as e:
+        logger.error(f"Error getting user file path: {e}")
+        return None
+
+def find_user_file(username_b64):
+    """Find an existing event file for a user, in any supported format and layout"""
+    preferred = event_codec.file_extension()
+    extensions = (preferred,) + event_codec.KNOWN_EXTENSIONS
+    for path in data_layout.candidate_paths(DATA_DIR, user_file_stem(username_b64), extensions):
+        if os.path.exists(path):
+            return path
+    return None
+
+def username_for_email(email):
+    """The username_b64 the frontend uses for a user who signed up with this email"""
+    return base64.b64encode(email.encode('utf-8')).decode('ascii')
+
+# Walking a sharded tree is not free, so /health reuses a recent count
+USER_COUNT_TTL = 60
+_user_count = {'value': 0, 'at': 0.0}
+
+def count_users():
+    """Count users with stored event data (cached for USER_COUNT_TTL seconds)"""
+    now = time.monotonic()
+    if not _user_count['at'] or now - _user_count['at'] > USER_COUNT_TTL:
+        _user_count['value'] = data_layout.count_user_files(DATA_DIR)
+        _user_count['at'] = now
+    return _user_count['value']
+
+# ============================================================================
+# Reading and Writing
+# ============================================================================
+# username_b64 -> (bus generation, events); only used with an invalidation bus
+_events_cache = OrderedDict()
+
+def load_user_events(username_b64):
+    """Load events for a user, preferring writes still in the buffer"""
+    pending = write_buffer.get(username_b64)
+    if pending is not None:
+        return pending
+
+    # Read the generation before the file, so a change that lands while
+    # loading leaves this entry stale rather than hiding the change
+    version = invalidation_bus.version(username_b64) if invalidation_bus else None
+    if version is not None:
+        cached = _events_cache.get(username_b64)
+        if cached and cached[0] == version:
+            _events_cache.move_to_end(username_b64)
+            return cached[1]
+
+    path = find_user_file(username_b64)
+    if not path:
+        logger.debug(f"No events file found for: {username_b64}")
+        return []
+
+    try:
+        with phase('storage'), open(path, 'rb') as f:
+            data = event_codec.loads(f.read())
+            events = data.get('events', [])
+            logger.info(f"✅ Loaded {len(events)} events for user")
+    except Exception as e:
+        logger.error(f"Error loading events: {e}")
+        return []
+
+    if version is not None:
+        _events_cache[username_b64] = (version, events)
+        _events_cache.move_to_end(username_b64)
+        while len(_events_cache) > EVENTS_CACHE_SIZE:
+            _events_cache.popitem(last=False)
+    return events
+
+def save_user_events(username_b64, events):
+    """Save events for a user using the configured codec"""
+    path = get_user_file_path(username_b64)
+    if not path:
+        return False
+
+    try:
+        data = {
+            'username_b64': username_b64,
+            'events': events,
+            'last_updated': datetime.utcnow().isoformat()
+        }
+
+        # Write to a temp file and rename so readers never see a partial file;
+        # fsync both so an acknowledged flush survives a crash
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(event_codec.dumps(data))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        fsync_directory(os.path.dirname(path))
+
+        # Drop copies left behind in other formats or in the flat layout so
+        # reads stay unambiguous; saving a user is what migrates them
+        stem = user_file_stem(username_b64)
+        for stale in data_layout.candidate_paths(DATA_DIR, stem, event_codec.KNOWN_EXTENSIONS):
+            if stale != path and os.path.exists(stale):
+                os.remove(stale)
+
+        if invalidation_bus:
+            invalidation_bus.publish(username_b64)
+
+        logger.info(f"💾 Saved {len(events)} events for user")
+        return True
+    except Exception as e:
+        logger.error(f"Error saving events: {e}")
+        return False
+
+def fsync_directory(path):
+    """Persist a rename by syncing its directory (no-op where unsupported)"""
+    try:
+        fd = os.open(path or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+# Called as listener(username_b64, events) after every stored list
+_store_listeners = []
+
+def on_store(listener):
+    """Register a callback for every event list accepted by store_user_events"""
+    _store_listeners.append(listener)
+    return listener
+
+def store_user_events(username_b64, events):
+    """Accept a user's new event list; bursts are coalesced into one write.
+
+    Events are stamped with stable UIDs, SEQUENCE and LAST-MODIFIED against
+    the previously stored list, so feed clients only see real changes.
+    Past events are moved to the archive; ones already archived unchanged
+    are dropped, since clients re-send their whole history on every sync,
+    and archived ones the client no longer sends are deleted from it.
+    Returns the stored (hot) list, or None if it could not be stored.
+    """
+    if archive.enabled:
+        with phase('archive'):
+            archive.drop_deleted(user_file_stem(username_b64), events)
+            events = archive.drop_archived(user_file_stem(username_b64), events)
+    stamped = stamp_events(load_user_events(username_b64), events)
+    if archive.enabled:
+        with phase('archive'):
+            stamped, cold = event_archive.split_events(stamped, archive.cutoff())
+            if cold:
+                archive.archive(user_file_stem(username_b64), cold)
+    if not write_buffer.put(username_b64, stamped):
+        return None
+    for listener in _store_listeners:
+        listener(username_b64, stamped)
+    return stamped
+
+# Latest synced state per user, written out at most once per coalescing window
+write_buffer = WriteBuffer(save_user_events, SYNC_COALESCE_SECONDS, name='event-writes')
+
+def get_user_data_version(username_b64):
+    """Cheap token that changes whenever a user's stored events change"""
+    pending = write_buffer.pending_version(username_b64)
+    if pending is not None:
+        return ('pending', pending)
+    if invalidation_bus:
+        return ('bus', invalidation_bus.version(username_b64))
+
+    path = find_user_file(username_b64)
+    if not path:
+        return None
+    try:
+        st = os.stat(path)
+        return (path, st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+# ============================================================================
+# Legacy Stores
+# ============================================================================
+
+def _import_user(username_b64, events):
+    # Never overwrite a user who already has data in the shared store
+    if not events or find_user_file(username_b64) or write_buffer.has_pending(username_b64):
+        return False
+    return store_user_events(username_b64, events) is not None
+
+def _acquire_import_lock():
+    """Create the import lock file; False if another process holds it"""
+    for _ in range(2):
+        try:
+            fd = os.open(LEGACY_IMPORT_LOCK, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            try:
+                age = time.time() - os.path.getmtime(LEGACY_IMPORT_LOCK)
+            except FileNotFoundError:
+                continue  # released meanwhile
+            if age < LEGACY_IMPORT_LOCK_STALE:
+                return False
+            logger.warning(f"Taking over a stale legacy import lock ({age:.0f}s old)")
+            try:
+                os.remove(LEGACY_IMPORT_LOCK)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+def _touch_import_lock():
+    try:
+        os.utime(LEGACY_IMPORT_LOCK)
+    except OSError:
+        pass
+
+def _release_import_lock():
+    try:
+        os.remove(LEGACY_IMPORT_LOCK)
+    except FileNotFoundError:
+        pass
+
+def _retire_file(path):
+    # Another process may have imported and renamed it already
+    try:
+        os.replace(path, path + '.migrated')
+    except FileNotFoundError:
+        pass
+
+def import_legacy_stores(events_dir=LEGACY_EVENTS_DIR, shared_store=None):
+    """Copy users from the older per-server stores into DATA_DIR.
+
+    app.py kept {username_b64, events} files in `events_dir`; the TTS
+    server kept events per email (with "title" for the summary) in
+    user_events.json / its shards. Users already present in DATA_DIR are
+    left alone. Imported sources are renamed to <name>.migrated, so this
+    runs once. Only one process imports at a time (LEGACY_IMPORT_LOCK);
+    the others return 0 straight away. Returns the number of users imported.
+    """
+    if not _acquire_import_lock():
+        logger.info("📦 Legacy import already running in another process")
+        return 0
+    try:
+        imported = 0
+        if os.path.isdir(events_dir):
+            for name in sorted(os.listdir(events_dir)):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(events_dir, name)
+                try:
+                    with open(path, 'rb') as f:
+                        data = event_codec.loads(f.read())
+                except FileNotFoundError:
+                    continue
+                except Exception as e:
+                    logger.error(f"Skipping legacy events file {name}: {e}")
+                    continue
+                username_b64 = data.get('username_b64') or name[:-len('.json')]
+                if _import_user(username_b64, data.get('events', [])):
+                    imported += 1
+                _retire_file(path)
+                _touch_import_lock()
+
+        shared_store = shared_store or SharedEventStore()
+        shared_store.migrate()
+        for email in shared_store.users():
+            events = [dict(e, summary=e.get('summary') or e.get('title')) for e in shared_store.get(email)]
+            if _import_user(username_for_email(email), events):
+                imported += 1
+            shared_store.retire(email)
+            _touch_import_lock()
+        # Written out before the lock goes, so the next holder sees these users
+        write_buffer.flush()
+        return imported
+    finally:
+        _release_import_lock()
+
+def start_legacy_import():
+    """Import the older stores on a daemon thread, if there is anything to import"""
+    shared_store = SharedEventStore()
+    if not os.path.isdir(LEGACY_EVENTS_DIR) and not shared_store.has_data():
+        return None
+
+    def run():
+        imported = import_legacy_stores(shared_store=shared_store)
+        if imported:
+            logger.info(f"📦 Imported {imported} users from the legacy event stores")
+
+    thread = threading.Thread(target=run, name='legacy-import', daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'import-legacy':
+        print(__doc__.strip())
+        sys.exit(1)
+    print(f'Imported {import_legacy_stores()} users into {DATA_DIR}/')
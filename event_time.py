@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Event Time Helpers
+- Parse the ISO 8601 strings the frontend stores (e.g. 2026-02-16T15:00:00.000Z)
+- All datetimes are normalized to timezone-aware UTC
+"""
+
+from datetime import datetime, timezone, timedelta
+
+UTC = timezone.utc
+EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def parse_event_time(value):
+    """Parse an ISO 8601 or iCalendar timestamp into an aware UTC datetime.
+
+    Naive values are treated as UTC, matching how the frontend serializes
+    with Date.toISOString(). Returns None for empty or unparseable input.
+    """
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).strip()
+        try:
+            if len(text) >= 15 and text[8] == 'T' and text[:8].isdigit():
+                # iCalendar basic format: YYYYMMDDTHHMMSS[Z]
+                dt = datetime.strptime(text[:15], '%Y%m%dT%H%M%S')
+            elif len(text) == 8 and text.isdigit():
+                dt = datetime.strptime(text, '%Y%m%d')
+            else:
+                dt = datetime.fromisoformat(text.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=UTC)
+    return dt.astimezone(UTC)
+
+
+def format_event_time(dt):
+    """Format a datetime the way the frontend does (toISOString style)"""
+    dt = parse_event_time(dt)
+    return dt.strftime('%Y-%m-%dT%H:%M:%S.') + f'{dt.microsecond // 1000:03d}Z'
+
+
+def to_epoch(value):
+    """Seconds since the Unix epoch for a timestamp string or datetime, or None"""
+    dt = parse_event_time(value)
+    if dt is None:
+        return None
+    return (dt - EPOCH) // timedelta(seconds=1)
+
+
+def from_epoch(seconds):
+    """Aware UTC datetime for an epoch timestamp"""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def event_bounds(event):
+    """(start, end) aware datetimes of an event dict; end defaults to start"""
+    start = parse_event_time(event.get('start'))
+    if start is None:
+        return None, None
+    end = parse_event_time(event.get('end')) or start
+    if end < start:
+        end = start
+    return start, end
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Event Versioning
+- Deterministic UIDs so a feed event keeps its identity across polls
+  and processes (no uuid4(), no randomized hash())
+- SEQUENCE and LAST-MODIFIED that only move when an event really changes
+- Applied at sync time against the previously stored events
+"""
+
+import hashlib
+from datetime import datetime, timezone
+
+from event_time import format_event_time
+
+# Fields whose change makes a new revision of an event
+VERSIONED_FIELDS = ('summary', 'start', 'end', 'description', 'location', 'rrule', 'exdate')
+
+# Fields the server maintains; never taken from the client
+SERVER_FIELDS = ('sequence', 'last_modified')
+
+
+def stable_uid(event):
+    """Deterministic UID for an event (its id, or a content hash without one)"""
+    if event.get('uid'):
+        return str(event['uid'])
+    if event.get('id'):
+        return str(event['id'])
+    seed = '|'.join(str(event.get(f) or '') for f in ('summary', 'start', 'created'))
+    return hashlib.sha1(seed.encode('utf-8')).hexdigest()
+
+
+def match_key(event):
+    """Key used to pair an incoming event with its stored predecessor"""
+    if event.get('id'):
+        return f"id:{event['id']}"
+    return f"uid:{stable_uid(event)}"
+
+
+def _revision(event):
+    return tuple(str(event.get(f) or '') for f in VERSIONED_FIELDS)
+
+
+def fingerprint(event):
+    """Short content hash of an event's versioned fields"""
+    return hashlib.sha1('\x1f'.join(_revision(event)).encode('utf-8')).hexdigest()[:16]
+
+
+def stamp_events(previous, incoming, now=None):
+    """Return `incoming` with uid / sequence / last_modified filled in.
+
+    Unchanged events keep their stored values. Changed events get
+    SEQUENCE + 1 and LAST-MODIFIED = now. New events start at SEQUENCE 0.
+    """
+    now = format_event_time(now or datetime.now(timezone.utc))
+    stored = {match_key(e): e for e in previous or ()}
+
+    stamped = []
+    for event in incoming:
+        event = {k: v for k, v in event.items() if k not in SERVER_FIELDS}
+        before = stored.get(match_key(event))
+        if before is None:
+            event['uid'] = stable_uid(event)
+            event['sequence'] = 0
+            event['last_modified'] = event.get('created') or now
+        else:
+            event['uid'] = before.get('uid') or stable_uid(event)
+            if _revision(before) == _revision(event):
+                event['sequence'] = before.get('sequence', 0)
+                event['last_modified'] = before.get('last_modified') or event.get('created') or now
+            else:
+                event['sequence'] = before.get('sequence', 0) + 1
+                event['last_modified'] = now
+        stamped.append(event)
+    return stamped
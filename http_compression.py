@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS HTTP Compression
+- Accept-Encoding negotiation (brotli when installed, gzip otherwise)
+- Precompressed response variants cached next to the plain body
+- after_request hook that compresses larger JSON API responses
+"""
+
+import gzip
+import hashlib
+import threading
+
+try:
+    import brotli  # type: ignore
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Server preference order when the client accepts several encodings equally
+SUPPORTED_ENCODINGS = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+
+# Bodies smaller than this are not worth the encoding overhead
+MIN_COMPRESS_SIZE = 512
+
+# ============================================================================
+# Negotiation
+# ============================================================================
+
+def parse_accept_encoding(header):
+    """Parse an Accept-Encoding header into {coding: qvalue}"""
+    accepted = {}
+    for part in (header or '').split(','):
+        fields = part.strip().split(';')
+        coding = fields[0].strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in fields[1:]:
+            name, _, value = param.strip().partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding] = q
+    return accepted
+
+def negotiate(header):
+    """Pick the best supported content coding for a request, or None"""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for coding in SUPPORTED_ENCODINGS:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+def compress(data, encoding):
+    """Compress bytes with the given content coding"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    if encoding == 'gzip':
+        return gzip.compress(data, compresslevel=6, mtime=0)
+    return data
+
+# ============================================================================
+# Precompressed Variants
+# ============================================================================
+
+class CompressedVariants:
+    """A response body plus its lazily built, cached compressed encodings.
+
+    Each encoding is computed at most once per instance, so keeping one
+    instance per rendered feed means compression happens once per data
+    change instead of once per request.
+    """
+
+    def __init__(self, body):
+        self.body = body if isinstance(body, bytes) else body.encode('utf-8')
+        self._encoded = {}
+        self._etag = None
+        self._lock = threading.Lock()
+
+    @property
+    def etag(self):
+        """Content hash of the plain body, usable as a weak ETag for every encoding"""
+        if self._etag is None:
+            self._etag = hashlib.sha1(self.body).hexdigest()
+        return self._etag
+
+    def get(self, encoding):
+        """Return (payload, encoding) for the negotiated encoding"""
+        if not encoding or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, None
+        payload = self._encoded.get(encoding)
+        if payload is None:
+            with self._lock:
+                payload = self._encoded.get(encoding)
+                if payload is None:
+                    payload = compress(self.body, encoding)
+                    self._encoded[encoding] = payload
+        return payload, encoding
+
+    def for_request(self, req):
+        """Return (payload, encoding) negotiated against a Flask request"""
+        return self.get(negotiate(req.headers.get('Accept-Encoding')))
+
+def apply_encoding(response, encoding):
+    """Set the headers that go with an encoded (or negotiable) body"""
+    response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+# ============================================================================
+# Flask Integration
+# ============================================================================
+
+def init_compression(app, mimetypes=('application/json',), min_size=MIN_COMPRESS_SIZE):
+    """Compress eligible responses of a Flask app on the fly.
+
+    Responses that already carry a Content-Encoding (such as precompressed
+    feeds) and streamed responses are left alone.
+    """
+    from flask import request
+
+    @app.after_request
+    def _compress_response(response):
+        if (response.direct_passthrough
+                or response.is_streamed
+                or response.status_code < 200 or response.status_code >= 300
+                or response.mimetype not in mimetypes
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.headers.get('Accept-Encoding'))
+        body = response.get_data()
+        if not encoding or len(body) < min_size:
+            return response
+
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        return response
+
+    return app
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS iCalendar Import
+- Incremental RFC 5545 reader: unfolds continuation lines from a byte
+  stream and yields one VEVENT at a time as a frontend-style event dict,
+  so a large export never has to be held in memory
+- DATE / DATE-TIME values in UTC, floating or TZID local time; DTEND or
+  DURATION; RRULE and EXDATE carried over for the recurrence engine, with
+  DTSTART's TZID kept as "tzid" so the series follows local time over DST
+- Modified instances (RECURRENCE-ID) become standalone events and their
+  original start is excluded from the series
+- merge_import() folds the stream into a user's existing events by UID,
+  yielding progress every IMPORT_BATCH_SIZE events and handing the merged
+  list to a store callback once, at the end
+"""
+
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+
+from event_time import format_event_time
+from event_versioning import VERSIONED_FIELDS, fingerprint, stable_uid
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+logger = logging.getLogger(__name__)
+
+# Imported events between two progress reports
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', 2000))
+
+_DURATION_RE = re.compile(
+    r'([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$')
+
+_UNESCAPES = {'n': '\n', 'N': '\n', '\\': '\\', ';': ';', ',': ','}
+_UNESCAPE_RE = re.compile(r'\\(.)')
+
+# ============================================================================
+# Lines
+# ============================================================================
+
+def unfold_lines(stream, chunk_size=1 << 16):
+    """Yield logical content lines from a binary stream of iCalendar data"""
+    pending = None
+    buffer = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        buffer += chunk
+        *lines, buffer = buffer.split(b'\n')
+        for raw in lines:
+            line = raw.rstrip(b'\r').decode('utf-8', errors='replace')
+            if line[:1] in (' ', '\t'):
+                if pending is not None:
+                    pending += line[1:]
+                continue
+            if pending:
+                yield pending
+            pending = line
+    if buffer:
+        line = buffer.rstrip(b'\r').decode('utf-8', errors='replace')
+        if line[:1] in (' ', '\t') and pending is not None:
+            pending += line[1:]
+        else:
+            if pending:
+                yield pending
+            pending = line
+    if pending:
+        yield pending
+
+
+def parse_content_line(line):
+    """Split 'NAME;PARAM=x:value' into (NAME, {PARAM: x}, value)"""
+    # The value starts at the first colon outside a quoted parameter value
+    quoted = False
+    for i, ch in enumerate(line):
+        if ch == '"':
+            quoted = not quoted
+        elif ch == ':' and not quoted:
+            head, value = line[:i], line[i + 1:]
+            break
+    else:
+        return None, {}, ''
+    name, *params = head.split(';')
+    parsed = {}
+    for param in params:
+        key, _, val = param.partition('=')
+        parsed[key.upper()] = val.strip('"')
+    return name.upper(), parsed, value
+
+
+def unescape_text(value):
+    return _UNESCAPE_RE.sub(lambda m: _UNESCAPES.get(m.group(1), m.group(1)), value)
+
+# ============================================================================
+# Values
+# ============================================================================
+
+def parse_ics_time(value, params):
+    """(aware UTC datetime, is_date) for a DATE or DATE-TIME value, or (None, False)"""
+    value = value.strip()
+    try:
+        if params.get('VALUE') == 'DATE' or (len(value) == 8 and value.isdigit()):
+            return datetime.strptime(value[:8], '%Y%m%d').replace(tzinfo=timezone.utc), True
+        if value.endswith('Z'):
+            return datetime.strptime(value, '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc), False
+        local = datetime.strptime(value, '%Y%m%dT%H%M%S')
+    except ValueError:
+        return None, False
+
+    tzid = params.get('TZID')
+    if tzid and ZoneInfo is not None:
+        try:
+            return local.replace(tzinfo=ZoneInfo(tzid)).astimezone(timezone.utc), False
+        except Exception:
+            logger.debug(f"Unknown TZID '{tzid}', treating as UTC")
+    # Floating time (or an unknown zone): treated as UTC like the rest of the app
+    return local.replace(tzinfo=timezone.utc), False
+
+
+def known_tzid(params):
+    """The TZID parameter if it names a zone this server can expand in, else None"""
+    tzid = params.get('TZID')
+    if not tzid or ZoneInfo is None:
+        return None
+    try:
+        ZoneInfo(tzid)
+    except Exception:
+        return None
+    return tzid
+
+
+def parse_duration(value):
+    """timedelta for an RFC 5545 DURATION value, or None"""
+    m = _DURATION_RE.match(value.strip())
+    if not m:
+        return None
+    sign, weeks, days, hours, minutes, seconds = m.groups()
+    delta = timedelta(weeks=int(weeks or 0), days=int(days or 0), hours=int(hours or 0),
+                      minutes=int(minutes or 0), seconds=int(seconds or 0))
+    return -delta if sign == '-' else delta
+
+# ============================================================================
+# Events
+# ============================================================================
+
+def _build_event(props):
+    """Turn the properties of one VEVENT into an event dict, or None"""
+    if 'DTSTART' not in props:
+        return None
+    start, is_date = parse_ics_time(*props['DTSTART'][0])
+    if start is None:
+        return None
+
+    end = None
+    if 'DTEND' in props:
+        end, _ = parse_ics_time(*props['DTEND'][0])
+    elif 'DURATION' in props:
+        duration = parse_duration(props['DURATION'][0][0])
+        end = start + duration if duration is not None else None
+    if end is None or end < start:
+        end = start + timedelta(days=1) if is_date else start
+
+    def text(name):
+        return unescape_text(props[name][0][0]) if name in props else None
+
+    uid = text('UID')
+    event = {
+        'summary': text('SUMMARY') or 'Untitled Event',
+        'start': format_event_time(start),
+        'end': format_event_time(end),
+    }
+    for field, name in (('description', 'DESCRIPTION'), ('location', 'LOCATION')):
+        value = text(name)
+        if value:
+            event[field] = value
+    if 'CREATED' in props:
+        created, _ = parse_ics_time(*props['CREATED'][0])
+        if created:
+            event['created'] = format_event_time(created)
+
+    if 'RECURRENCE-ID' in props:
+        # A moved or edited instance: a standalone event of its own
+        original, _ = parse_ics_time(*props['RECURRENCE-ID'][0])
+        if uid and original:
+            event['recurrence_of'] = uid
+            event['original_start'] = format_event_time(original)
+            uid = f"{uid}/{event['original_start']}"
+    elif 'RRULE' in props:
+        event['rrule'] = props['RRULE'][0][0].strip()
+        tzid = known_tzid(props['DTSTART'][0][1])
+        if tzid and not is_date:
+            event['tzid'] = tzid
+        exdates = []
+        for value, params in props.get('EXDATE', ()):
+            for part in value.split(','):
+                when, _ = parse_ics_time(part, params)
+                if when:
+                    exdates.append(format_event_time(when))
+        if exdates:
+            event['exdate'] = exdates
+
+    if uid:
+        event['id'] = uid
+        event['uid'] = uid
+    return event
+
+
+def iter_vevents(stream):
+    """Yield event dicts for each top-level VEVENT in a binary iCalendar stream.
+
+    Nested components (VALARM) are skipped. Events without a usable
+    DTSTART are yielded as None so callers can count them.
+    """
+    depth = 0          # nesting inside the current VEVENT
+    props = None
+    for line in unfold_lines(stream):
+        name, params, value = parse_content_line(line)
+        if name is None:
+            continue
+        if name == 'BEGIN':
+            if props is None:
+                if value.upper() == 'VEVENT':
+                    props, depth = {}, 0
+            else:
+                depth += 1
+            continue
+        if name == 'END':
+            if props is not None:
+                if depth:
+                    depth -= 1
+                elif value.upper() == 'VEVENT':
+                    yield _build_event(props)
+                    props = None
+            continue
+        if props is not None and not depth:
+            props.setdefault(name, []).append((value, params))
+
+# ============================================================================
+# Merging
+# ============================================================================
+
+class _CountingReader:
+    """Wraps a binary stream and counts the bytes read from it"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        chunk = self._stream.read(size)
+        self.bytes_read += len(chunk)
+        return chunk
+
+
+def _exdate_list(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [part.strip() for part in value.split(',') if part.strip()]
+    return list(value)
+
+
+def _apply_overrides(merged, overrides):
+    """Exclude moved instances from series that are already merged"""
+    for uid in [uid for uid in overrides if uid in merged]:
+        starts = overrides.pop(uid)
+        master = merged[uid]
+        if not master.get('rrule'):
+            continue
+        exdates = _exdate_list(master.get('exdate'))
+        missing = [s for s in starts if s not in exdates]
+        if missing:
+            merged[uid] = {**master, 'exdate': exdates + missing}
+
+
+def merge_import(stream, existing, store, batch_size=None):
+    """Import the VEVENTs of a binary iCalendar stream into `existing`.
+
+    Events are de-duplicated by UID: one already stored is updated in
+    place (keeping its id), and a UID repeated within the file keeps its
+    last copy. Yields a progress dict after every `batch_size` imported
+    events. `store(events)` receives the full merged list once, after the
+    whole stream is parsed, before the last progress dict (done=True).
+    Storing per batch would rewrite the user's whole list each time.
+    """
+    batch_size = batch_size or IMPORT_BATCH_SIZE
+    reader = _CountingReader(stream)
+    merged = {stable_uid(e): e for e in existing}
+    seen = set()
+    overrides = {}
+    counts = {'parsed': 0, 'added': 0, 'updated': 0, 'unchanged': 0, 'duplicates': 0, 'skipped': 0}
+
+    def progress(done):
+        if done:
+            _apply_overrides(merged, overrides)
+            store(list(merged.values()))
+        return {**counts, 'bytes_read': reader.bytes_read, 'total_events': len(merged), 'done': done}
+
+    pending = 0
+    for event in iter_vevents(reader):
+        counts['parsed'] += 1
+        if event is None:
+            counts['skipped'] += 1
+            continue
+        key = stable_uid(event)
+        before = merged.get(key)
+        if key in seen:
+            counts['duplicates'] += 1
+        elif before is None:
+            counts['added'] += 1
+        elif fingerprint(before) == fingerprint(event):
+            counts['unchanged'] += 1
+        else:
+            counts['updated'] += 1
+        if before is not None:
+            # Keep the stored identity and any fields iCalendar does not
+            # carry, so clients see an update rather than a new event
+            kept = {k: v for k, v in before.items() if k not in VERSIONED_FIELDS}
+            event = {**kept, **event, 'id': before.get('id') or event.get('id'), 'uid': key}
+        merged[key] = event
+        seen.add(key)
+        if event.get('recurrence_of'):
+            overrides.setdefault(event['recurrence_of'], []).append(event['original_start'])
+
+        pending += 1
+        if pending >= batch_size:
+            pending = 0
+            yield progress(False)
+
+    yield progress(True)
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS iCalendar Serializer
+- One RFC 5545 writer shared by every feed: calendar_server (per-user
+  feeds and group fragments), serve_ics and shared_calendars
+- Single pass over the event dicts, appending to one list that is joined once
+- TEXT escaping (backslash, semicolon, comma, newline) and 75-octet line
+  folding that never splits a UTF-8 sequence
+- Events with a "tzid" are published in local time (DTSTART;TZID=...),
+  with a VTIMEZONE per zone derived from the system tz database, so
+  clients expand the series across DST the way the server does
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+import recurrence
+from event_time import parse_event_time
+from event_versioning import stable_uid
+
+logger = logging.getLogger(__name__)
+
+CRLF = '\r\n'
+MAX_LINE_OCTETS = 75
+
+PRODID = '-//MANTA-JARVIS//Calendar//EN'
+DEFAULT_CALNAME = 'MANTA-JARVIS'
+DEFAULT_CALDESC = 'Your personal MANTA-JARVIS calendar'
+
+_UTC_ISO_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.\d+)?Z$')
+
+_TEXT_ESCAPES = str.maketrans({
+    '\\': '\\\\',
+    ';': '\\;',
+    ',': '\\,',
+    '\n': '\\n',
+    '\r': None,
+})
+
+# ============================================================================
+# Value Formatting
+# ============================================================================
+
+def escape_text(value):
+    """Escape a TEXT property value (RFC 5545 section 3.3.11)"""
+    if value is None:
+        return ''
+    return str(value).translate(_TEXT_ESCAPES)
+
+def fold_line(line):
+    """Fold a content line to at most 75 octets per physical line"""
+    if len(line) <= MAX_LINE_OCTETS and line.isascii():
+        return line
+    encoded = line.encode('utf-8')
+    if len(encoded) <= MAX_LINE_OCTETS:
+        return line
+
+    chunks = []
+    start, limit = 0, MAX_LINE_OCTETS
+    while start < len(encoded):
+        end = min(start + limit, len(encoded))
+        # Back up to the start of a UTF-8 sequence
+        while end < len(encoded) and (encoded[end] & 0xC0) == 0x80:
+            end -= 1
+        chunks.append(encoded[start:end].decode('utf-8'))
+        # Continuation lines begin with a space, which counts toward the limit
+        start, limit = end, MAX_LINE_OCTETS - 1
+    return (CRLF + ' ').join(chunks)
+
+def format_datetime_ics(value, default=None):
+    """Convert an ISO 8601 string or datetime to UTC iCalendar format (YYYYMMDDTHHMMSSZ)"""
+    if isinstance(value, str):
+        # Fast path for the frontend's toISOString() output, already in UTC
+        m = _UTC_ISO_RE.match(value)
+        if m:
+            return '{}{}{}T{}{}{}Z'.format(*m.groups())
+    dt = parse_event_time(value)
+    if dt is None:
+        if value:
+            logger.warning(f"Date format error for '{value}'")
+        dt = default or datetime.now(timezone.utc)
+    return f'{dt.year:04d}{dt.month:02d}{dt.day:02d}T{dt.hour:02d}{dt.minute:02d}{dt.second:02d}Z'
+
+def format_local_ics(dt, zone):
+    """Local wall time of `dt` in `zone` (YYYYMMDDTHHMMSS, no Z)"""
+    return dt.astimezone(zone).strftime('%Y%m%dT%H%M%S')
+
+# ============================================================================
+# Time Zones
+# ============================================================================
+
+_TZID_DTSTART_RE = re.compile(r'^DTSTART;TZID=([^:;\r\n]+):(\d{4})', re.MULTILINE)
+_WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+# Years of transitions listed for zones whose rules do not fit one RRULE
+EXPLICIT_TRANSITION_YEARS = 20
+
+
+def _format_offset(offset):
+    minutes = int(offset.total_seconds()) // 60
+    sign = '-' if minutes < 0 else '+'
+    return f'{sign}{abs(minutes) // 60:02d}{abs(minutes) % 60:02d}'
+
+
+def _offset(zone, instant):
+    return instant.astimezone(zone).utcoffset()
+
+
+@lru_cache(maxsize=256)
+def _transitions(zone, year):
+    """[(UTC instant, offset before, offset after)] of a zone's changes during `year`"""
+    found = []
+    t = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    day = timedelta(days=1)
+    while t < end:
+        before, after = _offset(zone, t), _offset(zone, t + day)
+        if before != after:
+            # First minute with the new offset
+            low, high = 0, 24 * 60
+            while high - low > 1:
+                mid = (low + high) // 2
+                if _offset(zone, t + timedelta(minutes=mid)) == before:
+                    low = mid
+                else:
+                    high = mid
+            found.append((t + timedelta(minutes=high), before, after))
+        t += day
+    return found
+
+
+def _yearly_rule(local):
+    """BYMONTH/BYDAY rule for a transition's local date ("2SU", or "-1SU" in the last week)"""
+    last = (datetime(local.year + local.month // 12, local.month % 12 + 1, 1) - timedelta(days=1)).day
+    ordinal = -1 if local.day > last - 7 else (local.day - 1) // 7 + 1
+    return f'FREQ=YEARLY;BYMONTH={local.month};BYDAY={ordinal}{_WEEKDAYS[local.weekday()]}'
+
+
+def _observance(zone, instant, before, after, rrule=None):
+    local_after = instant.astimezone(zone)
+    kind = 'DAYLIGHT' if local_after.dst() else 'STANDARD'
+    local = (instant + before).replace(tzinfo=None)
+    lines = [f'BEGIN:{kind}',
+             f'TZOFFSETFROM:{_format_offset(before)}',
+             f'TZOFFSETTO:{_format_offset(after)}',
+             f'TZNAME:{local_after.tzname()}',
+             f'DTSTART:{local:%Y%m%dT%H%M%S}']
+    if rrule:
+        lines.append(f'RRULE:{rrule}')
+    lines.append(f'END:{kind}')
+    return lines
+
+
+@lru_cache(maxsize=256)
+def vtimezone(tzid, year):
+    """VTIMEZONE component for an IANA zone, valid from the year before `year`.
+
+    Yearly transitions that follow a fixed "nth weekday of month" pattern
+    become one RRULE each; anything else is listed transition by transition.
+    """
+    zone = recurrence.event_zone({'tzid': tzid})
+    first = year - 1
+    lines = ['BEGIN:VTIMEZONE', f'TZID:{tzid}']
+    transitions = _transitions(zone, first)
+    rules = [_yearly_rule((instant + before).replace(tzinfo=None)) for instant, before, _ in transitions]
+    regular = bool(transitions) and all(
+        [_yearly_rule((i + b).replace(tzinfo=None)) for i, b, _ in _transitions(zone, y)] == rules
+        for y in range(first + 1, first + 4))
+    if regular:
+        for (instant, before, after), rrule in zip(transitions, rules):
+            lines += _observance(zone, instant, before, after, rrule)
+    else:
+        listed = [t for y in range(first, first + EXPLICIT_TRANSITION_YEARS) for t in _transitions(zone, y)]
+        if not listed:
+            # No changes nearby: one fixed offset
+            instant = datetime(first, 1, 1, tzinfo=timezone.utc)
+            offset = _offset(zone, instant)
+            listed = [(instant, offset, offset)]
+        for instant, before, after in listed:
+            lines += _observance(zone, instant, before, after)
+    lines.append('END:VTIMEZONE')
+    return CRLF.join(lines) + CRLF
+
+
+def timezone_components(vevents):
+    """VTIMEZONE blocks for every TZID used by DTSTART in the given VEVENT text"""
+    if 'TZID=' not in vevents:
+        return ''
+    years = {}
+    for tzid, year in _TZID_DTSTART_RE.findall(vevents):
+        years[tzid] = min(int(year), years.get(tzid, 9999))
+    return ''.join(vtimezone(tzid, year) for tzid, year in sorted(years.items()))
+
+# ============================================================================
+# Serialization
+# ============================================================================
+
+def calendar_header(calname=DEFAULT_CALNAME, caldesc=DEFAULT_CALDESC):
+    """VCALENDAR preamble, including the trailing CRLF"""
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        f'PRODID:{PRODID}',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        fold_line(f'X-WR-CALNAME:{escape_text(calname)}'),
+        'X-WR-TIMEZONE:UTC',
+        fold_line(f'X-WR-CALDESC:{escape_text(caldesc)}'),
+    ]
+    return CRLF.join(lines) + CRLF
+
+CALENDAR_FOOTER = 'END:VCALENDAR' + CRLF
+
+def serialize_event(event, out, now=None):
+    """Append one VEVENT (CRLF-terminated lines) to the list `out`.
+
+    Returns False (and appends nothing) for events that cannot be
+    represented, such as events without a start time.
+    """
+    summary = event.get('summary') or 'Untitled Event'
+    start = event.get('start')
+    if not start:
+        logger.warning(f"Skipping event without start time: {summary}")
+        return False
+
+    now = now or datetime.now(timezone.utc)
+    end = event.get('end') or start
+    zone = recurrence.event_zone(event)
+    start_dt, end_dt = parse_event_time(start), parse_event_time(end)
+    if zone is not None and start_dt is not None and end_dt is not None:
+        # Local time with its zone, so clients keep the wall-clock time over DST
+        tzid = event['tzid']  # an IANA name (event_zone loaded it): no characters to quote
+        dtstart = f'DTSTART;TZID={tzid}:{format_local_ics(start_dt, zone)}'
+        dtend = f'DTEND;TZID={tzid}:{format_local_ics(end_dt, zone)}'
+    else:
+        zone = None
+        dtstart = f'DTSTART:{format_datetime_ics(start, now)}'
+        dtend = f'DTEND:{format_datetime_ics(end, now)}'
+    # DTSTAMP must not change between polls, so never fall back to "now"
+    dtstamp = format_datetime_ics(event.get('created') or event.get('last_modified') or start, now)
+
+    # Build locally so a failure midway leaves `out` untouched
+    lines = []
+    add = lines.append
+    add('BEGIN:VEVENT' + CRLF)
+    add(fold_line(f'UID:{escape_text(stable_uid(event))}@manta-jarvis.local') + CRLF)
+    add(f'DTSTAMP:{dtstamp}' + CRLF)
+    add(dtstart + CRLF)
+    add(dtend + CRLF)
+
+    # Recurring events ship as one VEVENT; clients expand the RRULE
+    rrule = recurrence.normalize_rrule(event.get('rrule'))
+    if rrule:
+        add(fold_line(f'RRULE:{rrule}') + CRLF)
+        exdates = sorted(recurrence.parse_exdates(event.get('exdate')))
+        if exdates and zone is not None:
+            add(fold_line(f'EXDATE;TZID={tzid}:' + ','.join(format_local_ics(d, zone) for d in exdates)) + CRLF)
+        elif exdates:
+            add(fold_line('EXDATE:' + ','.join(d.strftime('%Y%m%dT%H%M%SZ') for d in exdates)) + CRLF)
+
+    add(fold_line(f'SUMMARY:{escape_text(summary)}') + CRLF)
+    add('STATUS:CONFIRMED' + CRLF)
+    add(f"SEQUENCE:{int(event.get('sequence') or 0)}" + CRLF)
+    if event.get('last_modified'):
+        add(f"LAST-MODIFIED:{format_datetime_ics(event['last_modified'], now)}" + CRLF)
+
+    description = event.get('description')
+    if description:
+        add(fold_line(f'DESCRIPTION:{escape_text(description)}') + CRLF)
+    location = event.get('location')
+    if location:
+        add(fold_line(f'LOCATION:{escape_text(location)}') + CRLF)
+
+    add('END:VEVENT' + CRLF)
+    out.extend(lines)
+    return True
+
+def event_to_ics(event, now=None):
+    """A single VEVENT block as a string ('' if the event is skipped)"""
+    out = []
+    serialize_event(event, out, now)
+    return ''.join(out)
+
+def render_fragments(events, now=None):
+    """[(start epoch seconds, uid, VEVENT text)] for a user's events, sorted by start.
+
+    Kept per user so combined feeds can be assembled by merging these
+    pieces instead of re-serializing every member's events.
+    """
+    now = now or datetime.now(timezone.utc)
+    fragments = []
+    for event in events:
+        start = parse_event_time(event.get('start'))
+        if start is None:
+            continue
+        out = []
+        try:
+            if serialize_event(event, out, now):
+                fragments.append((start.timestamp(), stable_uid(event), ''.join(out)))
+        except Exception as e:
+            logger.error(f"Error processing event: {e}")
+    fragments.sort(key=lambda fragment: fragment[:2])
+    return fragments
+
+def generate_ics_calendar(events, calname=DEFAULT_CALNAME, caldesc=DEFAULT_CALDESC):
+    """Generate iCalendar (.ics) text from a list of event dicts"""
+    now = datetime.now(timezone.utc)
+    body = []
+    for event in events:
+        try:
+            serialize_event(event, body, now)
+        except Exception as e:
+            logger.error(f"Error processing event: {e}")
+    body = ''.join(body)
+    return calendar_header(calname, caldesc) + timezone_components(body) + body + CALENDAR_FOOTER
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Interval Index
+- Per-user index of event time ranges for free/busy and conflict checks
+- Start-sorted arrays searched with bisect; events longer than
+  LONG_EVENT_SECONDS live in a small side list so the bisect window
+  stays tight
+- Recurring series are kept aside and expanded only inside the query window
+- Start-ordered pages (upcoming events) merge the sorted array with lazily
+  expanded series, so a page costs O(log n + k) plus one step per series
+- Updated incrementally from the full event list sent by /api/sync
+"""
+
+import heapq
+import itertools
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import timedelta
+
+import recurrence
+from event_time import event_bounds, to_epoch, from_epoch, format_event_time
+
+# Events at most this long are found via the start-sorted arrays; the
+# bisect lookback is the longest such event actually indexed
+LONG_EVENT_SECONDS = 24 * 60 * 60
+
+
+def event_key(event):
+    """Stable identity of an event within one user's list"""
+    if event.get('id'):
+        return str(event['id'])
+    return f"{event.get('summary', '')}|{event.get('start', '')}"
+
+
+def _signature(event):
+    """Fields that affect where an event sits in time"""
+    return (event.get('start'), event.get('end'), event.get('rrule'), str(event.get('exdate') or ''),
+            event.get('tzid'))
+
+
+class IntervalIndex:
+    """Overlap queries over one user's events in O(log n + k)"""
+
+    def __init__(self, events=()):
+        self._lock = threading.RLock()
+        self._starts = []      # sorted start epochs of short events
+        self._items = []       # (start, end, key), parallel to _starts
+        self._long = {}        # key -> (start, end) for long events
+        self._series = {}      # key -> recurring event dict
+        self._events = {}      # key -> event dict
+        self._signatures = {}  # key -> _signature(event)
+        self._max_short = 0    # longest duration in _items (upper bound)
+        self.update(events)
+
+    def __len__(self):
+        return len(self._events)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def add(self, event):
+        """Index one event (replacing any event with the same key)"""
+        key = event_key(event)
+        with self._lock:
+            if key in self._events:
+                self.remove(key)
+            self._events[key] = event
+            self._signatures[key] = _signature(event)
+
+            item = self._classify(key, event)
+            if item is not None:
+                pos = bisect_right(self._starts, item[0])
+                self._starts.insert(pos, item[0])
+                self._items.insert(pos, item)
+
+    def _classify(self, key, event):
+        """File recurring and long events aside; return the sorted-array item
+        for a short event, or None"""
+        if event.get('rrule') and recurrence.is_recurring(event):
+            self._series[key] = event
+            return None
+        start, end = event_bounds(event)
+        if start is None:
+            return None
+        start, end = to_epoch(start), to_epoch(end)
+        if end - start > LONG_EVENT_SECONDS:
+            self._long[key] = (start, end)
+            return None
+        self._max_short = max(self._max_short, end - start)
+        return (start, end, key)
+
+    def _bulk_load(self, events):
+        """Build an empty index in one sort instead of repeated inserts"""
+        items = []
+        for key, event in events.items():
+            self._events[key] = event
+            self._signatures[key] = _signature(event)
+            item = self._classify(key, event)
+            if item is not None:
+                items.append(item)
+        items.sort(key=lambda item: item[0])
+        self._items = items
+        self._starts = [item[0] for item in items]
+
+    def remove(self, key):
+        """Drop an event by key; unknown keys are ignored"""
+        with self._lock:
+            event = self._events.pop(key, None)
+            self._signatures.pop(key, None)
+            if event is None:
+                return
+            if self._series.pop(key, None) is not None or self._long.pop(key, None) is not None:
+                return
+            start = to_epoch(event.get('start'))
+            if start is None:
+                return
+            pos = bisect_left(self._starts, start)
+            while pos < len(self._starts) and self._starts[pos] == start:
+                if self._items[pos][2] == key:
+                    del self._starts[pos]
+                    del self._items[pos]
+                    return
+                pos += 1
+
+    def update(self, events):
+        """Bring the index in line with a full event list.
+
+        Only events whose timing changed are re-indexed. Returns the keys
+        of events that were added or moved.
+        """
+        with self._lock:
+            incoming = {event_key(e): e for e in events}
+            if not self._events:
+                self._bulk_load(incoming)
+                return list(incoming)
+
+            for key in [k for k in self._events if k not in incoming]:
+                self.remove(key)
+
+            changed = []
+            for key, event in incoming.items():
+                if self._signatures.get(key) == _signature(event):
+                    # Same timing: refresh the stored dict for summaries etc.
+                    self._events[key] = event
+                    if key in self._series:
+                        self._series[key] = event
+                    continue
+                self.add(event)
+                changed.append(key)
+            return changed
+
+    def get(self, key):
+        return self._events.get(key)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def overlapping(self, window_start, window_end, exclude=None):
+        """Events (or occurrences of recurring events) overlapping the window.
+
+        Returns a list of (start_epoch, end_epoch, event) sorted by start.
+        """
+        lo, hi = to_epoch(window_start), to_epoch(window_end)
+        results = []
+        with self._lock:
+            first = bisect_left(self._starts, lo - self._max_short)
+            last = bisect_left(self._starts, hi)
+            for start, end, key in self._items[first:last]:
+                if key != exclude and _overlaps(start, end, lo, hi):
+                    results.append((start, end, self._events[key]))
+
+            for key, (start, end) in self._long.items():
+                if key != exclude and _overlaps(start, end, lo, hi):
+                    results.append((start, end, self._events[key]))
+
+            series = [(k, e) for k, e in self._series.items() if k != exclude]
+
+        if series:
+            ws, we = from_epoch(lo), from_epoch(hi)
+            for key, event in series:
+                try:
+                    occurrences = recurrence.expand_event(event, ws, we)
+                except recurrence.RecurrenceError:
+                    continue
+                for occ in occurrences:
+                    results.append((to_epoch(occ['start']), to_epoch(occ['end']), occ))
+
+        results.sort(key=lambda item: item[0])
+        return results
+
+    def page(self, window_start, window_end, limit, after=None):
+        """Events starting in [window_start, window_end), recurring series
+        expanded, ordered by (start, key).
+
+        `after` is the (start_epoch, key) position of the last item already
+        seen. Returns ([(start_epoch, end_epoch, event), ...], position of
+        the last item if more follow, else None).
+        """
+        lo, hi = to_epoch(window_start), to_epoch(window_end)
+        after = tuple(after) if after else None
+        begin = max(lo, after[0]) if after else lo
+
+        def is_next(start, key):
+            return start >= begin and (after is None or (start, key) > after)
+
+        with self._lock:
+            # Short events: collect `limit` past the cursor, plus any ties
+            # with the last one so ordering by key stays exact across pages
+            short = []
+            pos = bisect_left(self._starts, begin)
+            while pos < len(self._items):
+                start, end, key = self._items[pos]
+                pos += 1
+                if start >= hi or (len(short) > limit and start != short[-1][0]):
+                    break
+                if is_next(start, key):
+                    short.append((start, key, end, self._events[key]))
+            short.sort(key=lambda item: (item[0], item[1]))
+
+            long = sorted((start, key, end, self._events[key])
+                          for key, (start, end) in self._long.items()
+                          if start < hi and is_next(start, key))
+            series = list(self._series.items())
+
+        def occurrences(key, event):
+            try:
+                for occ in recurrence.iter_occurrences(event, from_epoch(begin), from_epoch(hi)):
+                    start = to_epoch(occ['start'])
+                    if is_next(start, key):
+                        yield (start, key, to_epoch(occ['end']), occ)
+            except recurrence.RecurrenceError:
+                return
+
+        merged = heapq.merge(short, long, *(occurrences(k, e) for k, e in series),
+                             key=lambda item: (item[0], item[1]))
+        items = list(itertools.islice(merged, limit + 1))
+        more = len(items) > limit
+        items = items[:limit]
+        position = (items[-1][0], items[-1][1]) if more and items else None
+        return [(start, end, event) for start, key, end, event in items], position
+
+    def busy(self, window_start, window_end):
+        """Merged busy periods inside the window as (start_epoch, end_epoch)"""
+        lo, hi = to_epoch(window_start), to_epoch(window_end)
+        merged = []
+        for start, end, _ in self.overlapping(window_start, window_end):
+            start, end = max(start, lo), min(max(end, start), hi)
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        return [tuple(period) for period in merged]
+
+    def conflicts(self, event, horizon_days=90, limit=20):
+        """Events that overlap a candidate event (all its occurrences for
+        recurring candidates, up to `horizon_days` ahead)"""
+        start, end = event_bounds(event)
+        if start is None:
+            return []
+        key = event_key(event) if event.get('id') else None
+
+        if recurrence.is_recurring(event):
+            windows = [(o['start'], o['end']) for o in
+                       recurrence.expand_event(event, start, start + timedelta(days=horizon_days))]
+        else:
+            windows = [(start, end)]
+
+        found, seen = [], set()
+        for ws, we in windows:
+            if to_epoch(ws) == to_epoch(we):
+                continue
+            for _, _, other in self.overlapping(ws, we, exclude=key):
+                ident = (event_key(other), other.get('start'))
+                if ident not in seen:
+                    seen.add(ident)
+                    found.append(other)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+def _overlaps(start, end, lo, hi):
+    return start < hi and (end > lo or (start == end and start >= lo))
+
+
+def format_periods(periods):
+    """Busy periods as ISO strings for JSON responses"""
+    return [{'start': format_event_time(from_epoch(s)), 'end': format_event_time(from_epoch(e))}
+            for s, e in periods]
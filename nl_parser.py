@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Natural-Language Event Parser
+- Server-side port of parseEventCommand / parseDate / parseTime /
+  parseRecurrence from app.js, with the same results (including the
+  browser's Date arithmetic: setDate/setMonth overflow into the next month)
+- All patterns are compiled once; keyword lookups (trigger words, weekday
+  names, date/time keywords) come from a single pass of a keyword trie
+  over the lowercased text instead of one indexOf() per keyword
+- Times are interpreted in the caller's time zone and returned as UTC
+  timestamps in toISOString format, like the frontend stores them
+"""
+
+import re
+from datetime import datetime, timedelta, timezone
+
+from event_time import format_event_time
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+# Regexes use ASCII \b and \s semantics, like JavaScript
+_FLAGS = re.IGNORECASE | re.ASCII
+
+EVENT_TRIGGERS = ('create', 'schedule', 'add', 'make', 'set up', 'book', 'plan')
+EVENT_WORDS = ('event', 'meeting', 'appointment', 'reminder')
+DAYS_OF_WEEK = (
+    ('sunday', 0), ('sun', 0),
+    ('monday', 1), ('mon', 1),
+    ('tuesday', 2), ('tue', 2), ('tues', 2),
+    ('wednesday', 3), ('wed', 3),
+    ('thursday', 4), ('thu', 4), ('thur', 4), ('thurs', 4),
+    ('friday', 5), ('fri', 5),
+    ('saturday', 6), ('sat', 6),
+)
+DATE_TIME_KEYWORDS = ('tomorrow', 'today', 'next week', 'at ', 'on ', 'monday', 'tuesday',
+                      'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'the ', 'every ')
+FILLERS = ('please', 'can you', 'could you', 'a ', 'an ', 'the ', 'for me')
+
+_TOMORROW_RE = re.compile(r'\btomorrow\b', _FLAGS)
+_TODAY_RE = re.compile(r'\btoday\b', _FLAGS)
+_DAY_OF_MONTH_RE = re.compile(r'\b(?:the\s+)?(\d{1,2})(?:st|nd|rd|th)?\b', _FLAGS)
+_TIME_RE = re.compile(r'\bat\s+(\d{1,2})(?::(\d{2}))?\s*(am|pm)?', _FLAGS)
+_CALLED_RE = re.compile(
+    r'''(?:called|named|titled)\s+["']?([^"']+?)["']?(?:\s+(?:tomorrow|today|at|on|for|monday|tuesday|'''
+    r'''wednesday|thursday|friday|saturday|sunday|the)|$)''', _FLAGS)
+_QUOTED_RE = re.compile(r'''["']([^"']+)["']''')
+_FILLER_RES = [re.compile(rf'\b{re.escape(f)}\b', _FLAGS) for f in FILLERS]
+_SPACES_RE = re.compile(r'\s+')
+
+_RECURRENCE_RULES = [
+    (re.compile(r'\b(every\s+weekday|weekdays)\b', _FLAGS), 'FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR'),
+    (re.compile(r'\b(every\s+day|daily)\b', _FLAGS), 'FREQ=DAILY'),
+]
+_EVERY_DAY_RE = re.compile(r'\bevery\s+(sunday|monday|tuesday|wednesday|thursday|friday|saturday)\b', _FLAGS)
+_DAY_CODES = {'sunday': 'SU', 'monday': 'MO', 'tuesday': 'TU', 'wednesday': 'WE',
+              'thursday': 'TH', 'friday': 'FR', 'saturday': 'SA'}
+_LATER_RECURRENCE_RULES = [
+    (re.compile(r'\b(every\s+week|weekly)\b', _FLAGS), 'FREQ=WEEKLY'),
+    (re.compile(r'\b(every\s+month|monthly)\b', _FLAGS), 'FREQ=MONTHLY'),
+    (re.compile(r'\b(every\s+year|yearly|annually)\b', _FLAGS), 'FREQ=YEARLY'),
+]
+
+# ============================================================================
+# Keyword Trie
+# ============================================================================
+
+class KeywordTrie:
+    """Finds every occurrence of a fixed set of keywords in one pass.
+
+    The trie is compiled into a single regex (shared prefixes factored
+    out, greedy so the longest keyword at a position wins) scanned with a
+    lookahead, so overlapping matches are all seen. Shorter keywords at
+    the same position are prefixes of the longest one and are looked up
+    from a precomputed table.
+    """
+
+    def __init__(self, keywords=()):
+        self._root = {}
+        self._keywords = set()
+        self._pattern = None
+        for keyword in keywords:
+            self.add(keyword)
+
+    def add(self, keyword):
+        node = self._root
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[None] = keyword
+        self._keywords.add(keyword)
+        self._pattern = None
+
+    def _regex(self, node):
+        branches = [re.escape(ch) + self._regex(node[ch]) for ch in sorted(k for k in node if k is not None)]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional: continue to a longer keyword when the text allows it
+        return f'(?:{body})?' if None in node else body
+
+    def _compile(self):
+        self._pattern = re.compile(f'(?=({self._regex(self._root)}))')
+        self._prefixes = {kw: [p for p in self._keywords if kw.startswith(p)] for kw in self._keywords}
+
+    def positions(self, text):
+        """{keyword: [start offsets in ascending order]} for keywords present in text"""
+        if self._pattern is None:
+            self._compile()
+        found = {}
+        for match in self._pattern.finditer(text):
+            longest = match.group(1)
+            # A match can stop inside a keyword that is not in the set (e.g. "mond")
+            while longest and longest not in self._prefixes:
+                longest = longest[:-1]
+            for keyword in self._prefixes.get(longest, ()):
+                found.setdefault(keyword, []).append(match.start())
+        return found
+
+
+_TRIE = KeywordTrie(set(EVENT_TRIGGERS) | set(EVENT_WORDS) | {d for d, _ in DAYS_OF_WEEK}
+                    | set(DATE_TIME_KEYWORDS) | {'next month'})
+
+# ============================================================================
+# JavaScript Date Arithmetic
+# ============================================================================
+
+def _js_set_date(dt, day):
+    """Date.setDate(day): days past the month's end roll into the next month"""
+    return dt.replace(day=1) + timedelta(days=day - 1)
+
+
+def _js_add_months(dt, months):
+    """Date.setMonth(getMonth() + months), keeping the day and rolling over"""
+    month_index = dt.month - 1 + months
+    first = dt.replace(year=dt.year + month_index // 12, month=month_index % 12 + 1, day=1)
+    return first + timedelta(days=dt.day - 1)
+
+
+def _js_set_hours(dt, hours, minutes=0):
+    """Date.setHours(h, m, 0, 0): out-of-range hours roll into other days"""
+    midnight = dt.replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight + timedelta(hours=hours, minutes=minutes)
+
+
+def _js_weekday(dt):
+    """Date.getDay(): 0 = Sunday"""
+    return (dt.weekday() + 1) % 7
+
+# ============================================================================
+# Parsing
+# ============================================================================
+
+def _first_after(positions, start):
+    for pos in positions:
+        if pos >= start:
+            return pos
+    return -1
+
+
+def parse_date(text, now, found=None):
+    """Date the text refers to (local wall time, time of day from `now`), or None"""
+    lower = text.lower()
+    found = _TRIE.positions(lower) if found is None else found
+
+    if _TOMORROW_RE.search(text):
+        return now + timedelta(days=1)
+    if _TODAY_RE.search(text):
+        return now
+
+    for day, day_num in DAYS_OF_WEEK:
+        if day in found:
+            days_to_add = day_num - _js_weekday(now)
+            # If the day has passed this week, schedule for next week
+            if days_to_add <= 0:
+                days_to_add += 7
+            return now + timedelta(days=days_to_add)
+
+    match = _DAY_OF_MONTH_RE.search(text)
+    if match:
+        day = int(match.group(1))
+        if 1 <= day <= 31:
+            target = _js_set_date(now, day)
+            if target < now:
+                target = _js_add_months(target, 1)
+            return target
+
+    if 'next week' in found:
+        return now + timedelta(days=7)
+    if 'next month' in found:
+        return _js_add_months(now, 1)
+    return None
+
+
+def parse_time(text):
+    """(hours, minutes) for "at 3pm" / "at 15:00" / "at 3:30pm", or None"""
+    match = _TIME_RE.search(text)
+    if not match:
+        return None
+    hours = int(match.group(1))
+    minutes = int(match.group(2)) if match.group(2) else 0
+    meridiem = match.group(3).lower() if match.group(3) else None
+    if meridiem == 'pm' and hours < 12:
+        hours += 12
+    if meridiem == 'am' and hours == 12:
+        hours = 0
+    return hours, minutes
+
+
+def parse_recurrence(text):
+    """RRULE string for "every monday", "daily", ... or None"""
+    for pattern, rule in _RECURRENCE_RULES:
+        if pattern.search(text):
+            return rule
+    match = _EVERY_DAY_RE.search(text)
+    if match:
+        return f'FREQ=WEEKLY;BYDAY={_DAY_CODES[match.group(1).lower()]}'
+    for pattern, rule in _LATER_RECURRENCE_RULES:
+        if pattern.search(text):
+            return rule
+    return None
+
+
+def _extract_summary(text, lower, found):
+    match = _CALLED_RE.search(text)
+    if match:
+        return match.group(1).strip()
+
+    match = _QUOTED_RE.search(text)
+    if match:
+        return match.group(1).strip()
+
+    # Text between the first trigger / event word (in list order) and the
+    # nearest date or time keyword after it
+    title_start = -1
+    for trigger in EVENT_TRIGGERS + EVENT_WORDS:
+        if trigger in found:
+            title_start = found[trigger][0] + len(trigger)
+            break
+    if title_start == -1:
+        return None
+
+    title_end = len(text)
+    for keyword in DATE_TIME_KEYWORDS:
+        idx = _first_after(found.get(keyword, ()), title_start)
+        if idx > title_start and idx < title_end:
+            title_end = idx
+
+    extracted = text[title_start:title_end].strip()
+    for filler in _FILLER_RES:
+        extracted = filler.sub(' ', extracted)
+    extracted = _SPACES_RE.sub(' ', extracted).strip()
+    return extracted if len(extracted) > 2 else None
+
+
+def parse_event_command(text, now=None, tz=None):
+    """Event dict ({summary, start, end[, rrule]}) for a command, or None.
+
+    `now` is an aware datetime (default: current time); `tz` an IANA zone
+    name for the user's local time (default UTC).
+    """
+    zone = ZoneInfo(tz) if tz and ZoneInfo is not None else timezone.utc
+    now_aware = (now or datetime.now(timezone.utc)).astimezone(zone)
+    local_now = now_aware.replace(tzinfo=None)
+
+    lower = text.lower()
+    found = _TRIE.positions(lower)
+    has_trigger = any(t in found for t in EVENT_TRIGGERS)
+    has_event_word = any(w in found for w in EVENT_WORDS)
+    if not has_trigger and not has_event_word:
+        return None
+
+    summary = _extract_summary(text, lower, found)
+    if not summary or len(summary) < 2:
+        return None
+
+    start = parse_date(text, local_now, found)
+    if start is None:
+        # Default to 1 hour from now if no date specified
+        start = _js_set_hours(local_now, local_now.hour + 1)
+
+    time_of_day = parse_time(text)
+    if time_of_day:
+        start = _js_set_hours(start, *time_of_day)
+    elif start.date() == local_now.date():
+        start = _js_set_hours(start, local_now.hour + 1)
+    else:
+        start = _js_set_hours(start, 10)
+
+    start_utc = start.replace(tzinfo=zone).astimezone(timezone.utc)
+    event = {
+        'summary': summary,
+        'start': format_event_time(start_utc),
+        'end': format_event_time(start_utc + timedelta(hours=1)),
+    }
+    rrule = parse_recurrence(text)
+    if rrule:
+        event['rrule'] = rrule
+    return event
+
+
+def parse_lines(lines, now=None, tz=None):
+    """parse_event_command for many lines against the same `now`"""
+    now = now or datetime.now(timezone.utc)
+    return [parse_event_command(line, now, tz) if line and line.strip() else None for line in lines]
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Phrase Bank
+- Templates for the fixed sentences the assistant speaks (see speak() calls
+  in app.js), e.g. "Event {summary} has been added to your calendar."
+- The constant parts of every registered template are synthesized once
+  (warm()); a matching request only synthesizes its variable slots and
+  splices them in with short linear crossfades
+- Sentences without slots are served from cache entirely; slot audio is
+  kept in a small LRU, since the same event titles come up repeatedly
+- Templates can be added from PHRASE_TEMPLATES_FILE (one per line)
+"""
+
+import io
+import logging
+import os
+import re
+import string
+import threading
+import wave
+from collections import OrderedDict
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+PHRASE_TEMPLATES_FILE = os.environ.get('PHRASE_TEMPLATES_FILE', '')
+CROSSFADE_MS = float(os.environ.get('PHRASE_CROSSFADE_MS', 15))
+SLOT_CACHE_SIZE = int(os.environ.get('PHRASE_SLOT_CACHE_SIZE', 256))
+# Samples quieter than this (relative to full scale) count as edge silence
+SILENCE_THRESHOLD = 0.01
+
+# What app.js says most often
+DEFAULT_TEMPLATES = (
+    'Event {summary} has been added to your calendar.',
+    'Event {summary} deleted',
+    'Event renamed to {title}',
+    'Please login first',
+    'Failed to create event',
+    'Calendar link copied',
+    'Cancelled',
+    'You have no events to delete',
+    'You have no events to edit',
+    'Which event would you like to delete? Reply with the number.',
+    'Which event would you like to edit? Reply with the number.',
+    "I'm thinking about that",
+    "I couldn't find information about that.",
+)
+
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _normalize(text):
+    return _SPACE_RE.sub(' ', text).strip()
+
+# ============================================================================
+# Audio Helpers
+# ============================================================================
+
+def trim_silence(samples, threshold=SILENCE_THRESHOLD):
+    """Drop leading/trailing near-silence so spliced parts do not leave gaps"""
+    loud = np.flatnonzero(np.abs(samples) > threshold)
+    if not len(loud):
+        return samples[:0]
+    return samples[loud[0]:loud[-1] + 1]
+
+
+def crossfade_concat(parts, sample_rate, crossfade_ms=CROSSFADE_MS):
+    """Join waveforms, overlapping each boundary with a linear crossfade"""
+    parts = [p for p in parts if len(p)]
+    if not parts:
+        return np.zeros(0, dtype=np.float32)
+    fade = int(sample_rate * crossfade_ms / 1000)
+    out = parts[0].astype(np.float32)
+    for part in parts[1:]:
+        n = min(fade, len(out), len(part))
+        if n:
+            ramp = np.linspace(0.0, 1.0, n, dtype=np.float32)
+            overlap = out[-n:] * (1 - ramp) + part[:n] * ramp
+            out = np.concatenate((out[:-n], overlap, part[n:]))
+        else:
+            out = np.concatenate((out, part))
+    return out
+
+
+def wav_bytes(samples, sample_rate):
+    """16-bit mono WAV file contents for float samples in [-1, 1]"""
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype('<i2')
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+# ============================================================================
+# Templates
+# ============================================================================
+
+class Template:
+    """One sentence pattern: literal parts with {named} slots between them"""
+
+    __slots__ = ('text', 'literals', 'slots', 'pattern')
+
+    def __init__(self, text):
+        self.text = _normalize(text)
+        self.literals = []
+        self.slots = []
+        regex = []
+        for literal, field, _, _ in string.Formatter().parse(self.text):
+            self.literals.append(literal)
+            regex.append(re.escape(literal))
+            if field is not None:
+                if not field:
+                    raise ValueError(f'Template slots must be named: {text!r}')
+                self.slots.append(field)
+                regex.append('(.+?)')
+        self.pattern = re.compile(''.join(regex) + r'\Z', re.IGNORECASE)
+
+    def match(self, text):
+        """Slot values if `text` is an instance of this template, else None"""
+        m = self.pattern.match(text)
+        return list(m.groups()) if m else None
+
+    def pieces(self, values):
+        """Alternating ('literal', text) / ('slot', text) pieces, blanks skipped"""
+        out = []
+        for i, literal in enumerate(self.literals):
+            if literal.strip():
+                out.append(('literal', literal.strip()))
+            if i < len(values) and values[i].strip():
+                out.append(('slot', values[i].strip()))
+        return out
+
+
+class PhraseBank:
+    """Pre-synthesized template parts, spliced with freshly synthesized slots.
+
+    `synthesize(text)` must return float samples at `sample_rate`.
+    """
+
+    def __init__(self, synthesize, sample_rate, templates=DEFAULT_TEMPLATES,
+                 crossfade_ms=CROSSFADE_MS, slot_cache_size=SLOT_CACHE_SIZE):
+        self.synthesize = synthesize
+        self.sample_rate = sample_rate
+        self.crossfade_ms = crossfade_ms
+        self.slot_cache_size = slot_cache_size
+        self.templates = []
+        self._segments = {}             # literal text -> trimmed samples
+        self._slot_cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.ready = False
+        for template in templates:
+            self.register(template)
+
+    def register(self, text):
+        template = Template(text)
+        self.templates.append(template)
+        # Longest literal text first, so specific templates win over generic ones
+        self.templates.sort(key=lambda t: -sum(len(l) for l in t.literals))
+        return template
+
+    def load_file(self, path):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip() and not line.startswith('#'):
+                    self.register(line)
+
+    def _samples(self, text):
+        return trim_silence(np.asarray(self.synthesize(text), dtype=np.float32))
+
+    def warm(self):
+        """Synthesize the constant part of every template (call once at startup)"""
+        for template in list(self.templates):
+            for kind, text in template.pieces([]):
+                if text not in self._segments:
+                    self._segments[text] = self._samples(text)
+        self.ready = True
+        logger.info(f"🗣️ Phrase bank ready: {len(self.templates)} templates, "
+                    f"{len(self._segments)} segments")
+
+    def _slot(self, text):
+        key = text.lower()
+        with self._lock:
+            cached = self._slot_cache.get(key)
+            if cached is not None:
+                self._slot_cache.move_to_end(key)
+                return cached
+        samples = self._samples(text)
+        with self._lock:
+            self._slot_cache[key] = samples
+            while len(self._slot_cache) > self.slot_cache_size:
+                self._slot_cache.popitem(last=False)
+        return samples
+
+    def render(self, text, check=None):
+        """Spliced samples for `text`, or None if no template applies yet.
+
+        `check()` is called before each slot is synthesized, so a cancelled
+        request can stop (by raising) instead of finishing its slots.
+        """
+        if not self.ready:
+            return None
+        text = _normalize(text)
+        for template in self.templates:
+            values = template.match(text)
+            if values is None:
+                continue
+            parts = []
+            for kind, piece in template.pieces(values):
+                if kind == 'literal':
+                    segment = self._segments.get(piece)
+                    if segment is None:
+                        return None  # registered after warm()
+                    parts.append(segment)
+                else:
+                    if check is not None:
+                        check()
+                    parts.append(self._slot(piece))
+            return crossfade_concat(parts, self.sample_rate, self.crossfade_ms)
+        return None
+
+    def render_wav(self, text, check=None):
+        """WAV bytes for `text` via the phrase bank, or None"""
+        samples = self.render(text, check)
+        if samples is None:
+            return None
+        return wav_bytes(samples, self.sample_rate)
@@ -0,0 +1,469 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Recurrence Engine
+- RRULE / EXDATE support for stored events ("rrule" and "exdate" fields)
+- Windowed expansion for server-side queries ("what's on Thursday")
+- Recurring events stay a single stored record; the ICS feed carries the
+  RRULE so calendar clients expand it themselves
+
+Supported RRULE subset (RFC 5545): FREQ=DAILY|WEEKLY|MONTHLY|YEARLY,
+INTERVAL, COUNT, UNTIL, BYDAY (with ordinals for MONTHLY/YEARLY; counted
+across the year for YEARLY without BYMONTH), BYMONTHDAY and BYMONTH.
+Expansion happens in UTC, the same zone the feed publishes DTSTART in,
+unless the event has a "tzid" (an IANA zone, set by the ICS import): then
+the series keeps its wall-clock time across DST changes.
+"""
+
+import calendar
+from datetime import datetime, timedelta
+
+from event_time import UTC, parse_event_time, format_event_time, event_bounds
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:  # Python < 3.9
+    ZoneInfo = None
+
+FREQUENCIES = ('DAILY', 'WEEKLY', 'MONTHLY', 'YEARLY')
+WEEKDAYS = ('MO', 'TU', 'WE', 'TH', 'FR', 'SA', 'SU')
+
+# Guard against rules whose filters never match (e.g. BYMONTHDAY=31;BYMONTH=2)
+MAX_EMPTY_PERIODS = 2000
+
+
+class RecurrenceError(ValueError):
+    """Raised for RRULE strings outside the supported subset"""
+
+
+# ============================================================================
+# RRULE Parsing
+# ============================================================================
+
+def _parse_byday(value):
+    days = []
+    for item in value.split(','):
+        item = item.strip().upper()
+        code = item[-2:]
+        if code not in WEEKDAYS:
+            raise RecurrenceError(f'Invalid BYDAY value: {item}')
+        ordinal = item[:-2]
+        try:
+            n = int(ordinal) if ordinal else 0
+        except ValueError:
+            raise RecurrenceError(f'Invalid BYDAY ordinal: {item}')
+        if abs(n) > 53:
+            raise RecurrenceError(f'Invalid BYDAY ordinal: {item}')
+        days.append((n, WEEKDAYS.index(code)))
+    return days
+
+
+def _parse_int_list(value, name, low, high):
+    result = []
+    for item in value.split(','):
+        try:
+            n = int(item)
+        except ValueError:
+            raise RecurrenceError(f'Invalid {name} value: {item}')
+        if n == 0 or not low <= abs(n) <= high:
+            raise RecurrenceError(f'Invalid {name} value: {item}')
+        result.append(n)
+    return result
+
+
+def parse_rrule(text):
+    """Parse an RRULE value (with or without the "RRULE:" prefix) into a dict"""
+    if not text:
+        raise RecurrenceError('Empty RRULE')
+    text = str(text).strip()
+    if text.upper().startswith('RRULE:'):
+        text = text[6:]
+
+    rule = {'freq': None, 'interval': 1, 'count': None, 'until': None,
+            'byday': [], 'bymonthday': [], 'bymonth': []}
+    for part in text.split(';'):
+        if not part:
+            continue
+        name, sep, value = part.partition('=')
+        name = name.strip().upper()
+        value = value.strip()
+        if not sep or not value:
+            raise RecurrenceError(f'Malformed RRULE part: {part}')
+
+        if name == 'FREQ':
+            if value.upper() not in FREQUENCIES:
+                raise RecurrenceError(f'Unsupported FREQ: {value}')
+            rule['freq'] = value.upper()
+        elif name == 'INTERVAL':
+            rule['interval'] = _parse_int_list(value, 'INTERVAL', 1, 10000)[0]
+        elif name == 'COUNT':
+            rule['count'] = _parse_int_list(value, 'COUNT', 1, 100000)[0]
+        elif name == 'UNTIL':
+            until = parse_event_time(value)
+            if until is None:
+                raise RecurrenceError(f'Invalid UNTIL: {value}')
+            if len(value) == 8:
+                # Date-only UNTIL includes the whole day
+                until += timedelta(days=1, seconds=-1)
+            rule['until'] = until
+        elif name == 'BYDAY':
+            rule['byday'] = _parse_byday(value)
+        elif name == 'BYMONTHDAY':
+            rule['bymonthday'] = _parse_int_list(value, 'BYMONTHDAY', 1, 31)
+        elif name == 'BYMONTH':
+            rule['bymonth'] = [abs(n) for n in _parse_int_list(value, 'BYMONTH', 1, 12)]
+        elif name == 'WKST':
+            if value.upper() != 'MO':
+                raise RecurrenceError('Only WKST=MO is supported')
+        else:
+            raise RecurrenceError(f'Unsupported RRULE part: {name}')
+
+    if not rule['freq']:
+        raise RecurrenceError('RRULE requires FREQ')
+    if rule['count'] and rule['until']:
+        raise RecurrenceError('RRULE cannot have both COUNT and UNTIL')
+    if rule['freq'] in ('DAILY', 'WEEKLY') and any(n for n, _ in rule['byday']):
+        raise RecurrenceError('BYDAY ordinals require FREQ=MONTHLY or YEARLY')
+    return rule
+
+
+def format_rrule(rule):
+    """Serialize a parsed rule back to a canonical RRULE value"""
+    parts = [f"FREQ={rule['freq']}"]
+    if rule['interval'] != 1:
+        parts.append(f"INTERVAL={rule['interval']}")
+    if rule['count']:
+        parts.append(f"COUNT={rule['count']}")
+    if rule['until']:
+        parts.append('UNTIL=' + rule['until'].strftime('%Y%m%dT%H%M%SZ'))
+    if rule['byday']:
+        parts.append('BYDAY=' + ','.join(f'{n or ""}{WEEKDAYS[d]}' for n, d in rule['byday']))
+    if rule['bymonthday']:
+        parts.append('BYMONTHDAY=' + ','.join(str(n) for n in rule['bymonthday']))
+    if rule['bymonth']:
+        parts.append('BYMONTH=' + ','.join(str(n) for n in rule['bymonth']))
+    return ';'.join(parts)
+
+
+def normalize_rrule(text):
+    """Canonical RRULE string, or None if the rule is missing or invalid"""
+    if not text:
+        return None
+    try:
+        return format_rrule(parse_rrule(text))
+    except RecurrenceError:
+        return None
+
+
+def parse_exdates(values):
+    """Parse an event's "exdate" field (list or comma string) into a set of datetimes"""
+    if not values:
+        return set()
+    if isinstance(values, str):
+        values = values.split(',')
+    return {dt for dt in (parse_event_time(v) for v in values) if dt is not None}
+
+
+def event_zone(event):
+    """ZoneInfo for an event's "tzid", or None to expand in UTC"""
+    tzid = event.get('tzid')
+    if not tzid or ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(tzid)
+    except Exception:
+        return None
+
+
+def _to_wall(dt, zone):
+    """Wall-clock time of `dt` in `zone`, labelled UTC so the expansion can use it"""
+    return dt.astimezone(zone).replace(tzinfo=UTC)
+
+
+def _from_wall(dt, zone):
+    return dt.replace(tzinfo=zone).astimezone(UTC)
+
+
+def is_recurring(event):
+    """True if an event dict carries a valid RRULE"""
+    return normalize_rrule(event.get('rrule')) is not None
+
+
+# ============================================================================
+# Candidate Generation
+# ============================================================================
+
+def _with_time(day, dtstart):
+    return datetime(day.year, day.month, day.day, dtstart.hour, dtstart.minute,
+                    dtstart.second, dtstart.microsecond, tzinfo=UTC)
+
+
+def _month_days(year, month, rule, dtstart):
+    """Days of one month selected by BYMONTHDAY / BYDAY (or DTSTART's day)"""
+    last = calendar.monthrange(year, month)[1]
+    by_monthday = {d if d > 0 else last + d + 1 for d in rule['bymonthday']}
+    by_monthday = {d for d in by_monthday if 1 <= d <= last}
+
+    by_day = set()
+    for ordinal, weekday in rule['byday']:
+        first = (weekday - calendar.weekday(year, month, 1)) % 7 + 1
+        matches = list(range(first, last + 1, 7))
+        if ordinal == 0:
+            by_day.update(matches)
+        elif abs(ordinal) <= len(matches):
+            by_day.add(matches[ordinal - 1] if ordinal > 0 else matches[ordinal])
+
+    if rule['bymonthday'] and rule['byday']:
+        days = by_monthday & by_day
+    elif rule['bymonthday']:
+        days = by_monthday
+    elif rule['byday']:
+        days = by_day
+    else:
+        days = {dtstart.day} if dtstart.day <= last else set()
+    return [datetime(year, month, d) for d in sorted(days)]
+
+
+def _is_monthday(day, monthdays):
+    """True if `day` is one of the BYMONTHDAY values (negative counts from the end)"""
+    last = calendar.monthrange(day.year, day.month)[1]
+    return any(day.day == (d if d > 0 else last + d + 1) for d in monthdays)
+
+
+def _year_days(year, rule, dtstart):
+    """Days of one year for YEARLY rules without BYMONTH"""
+    if rule['byday']:
+        # BYDAY is year-scoped here: "20MO" is the 20th Monday of the year
+        first_day = datetime(year, 1, 1)
+        total = 366 if calendar.isleap(year) else 365
+        days = set()
+        for ordinal, weekday in rule['byday']:
+            first = (weekday - first_day.weekday()) % 7
+            matches = list(range(first, total, 7))
+            if ordinal == 0:
+                days.update(matches)
+            elif abs(ordinal) <= len(matches):
+                days.add(matches[ordinal - 1] if ordinal > 0 else matches[ordinal])
+        dates = [first_day + timedelta(days=d) for d in sorted(days)]
+        if rule['bymonthday']:
+            dates = [d for d in dates if _is_monthday(d, rule['bymonthday'])]
+        return dates
+    if rule['bymonthday']:
+        days = []
+        for month in range(1, 13):
+            days.extend(_month_days(year, month, rule, dtstart))
+        return days
+    return _month_days(year, dtstart.month, rule, dtstart)
+
+
+def _period_start(rule, dtstart, k):
+    """First instant of the k-th period after DTSTART's period"""
+    step = k * rule['interval']
+    freq = rule['freq']
+    if freq == 'DAILY':
+        day = dtstart.date() + timedelta(days=step)
+    elif freq == 'WEEKLY':
+        day = dtstart.date() - timedelta(days=dtstart.weekday()) + timedelta(weeks=step)
+    elif freq == 'MONTHLY':
+        months = dtstart.month - 1 + step
+        day = datetime(dtstart.year + months // 12, months % 12 + 1, 1).date()
+    else:
+        day = datetime(dtstart.year + step, 1, 1).date()
+    return datetime(day.year, day.month, day.day, tzinfo=UTC)
+
+
+def _period_candidates(rule, dtstart, period):
+    """Occurrence starts inside one period, sorted, before COUNT/UNTIL/EXDATE"""
+    freq = rule['freq']
+    if freq == 'DAILY':
+        days = [period]
+    elif freq == 'WEEKLY':
+        weekdays = sorted({d for _, d in rule['byday']}) or [dtstart.weekday()]
+        days = [period + timedelta(days=d) for d in weekdays]
+    elif freq == 'MONTHLY':
+        days = _month_days(period.year, period.month, rule, dtstart)
+    elif rule['bymonth']:
+        days = []
+        for month in sorted(rule['bymonth']):
+            days.extend(_month_days(period.year, month, rule, dtstart))
+    else:
+        days = _year_days(period.year, rule, dtstart)
+
+    candidates = []
+    for day in days:
+        if rule['bymonth'] and day.month not in rule['bymonth']:
+            continue
+        if freq == 'DAILY':
+            if rule['byday'] and day.weekday() not in {d for _, d in rule['byday']}:
+                continue
+            if rule['bymonthday'] and not _is_monthday(day, rule['bymonthday']):
+                continue
+        candidates.append(_with_time(day, dtstart))
+    return candidates
+
+
+def _skip_periods(rule, dtstart, not_before):
+    """Whole periods that can be skipped before `not_before` (no COUNT only)"""
+    if rule['count'] or not_before <= dtstart:
+        return 0
+    freq = rule['freq']
+    if freq == 'DAILY':
+        elapsed = (not_before - dtstart).days
+    elif freq == 'WEEKLY':
+        elapsed = (not_before - dtstart).days // 7
+    elif freq == 'MONTHLY':
+        elapsed = (not_before.year - dtstart.year) * 12 + not_before.month - dtstart.month
+    else:
+        elapsed = not_before.year - dtstart.year
+    return max(0, elapsed // rule['interval'] - 1)
+
+
+# ============================================================================
+# Expansion
+# ============================================================================
+
+def iter_occurrence_starts(dtstart, rule, exdates=(), not_before=None, before=None):
+    """Yield occurrence start datetimes in order.
+
+    DTSTART is always the first occurrence (RFC 5545). `not_before` lets the
+    generator jump ahead for unbounded rules; `before` stops iteration.
+    """
+    exdates = set(exdates)
+    count = 0
+    k = _skip_periods(rule, dtstart, not_before) if not_before else 0
+    empty = 0
+
+    if k == 0:
+        count = 1
+        if dtstart not in exdates:
+            if before is not None and dtstart >= before:
+                return
+            yield dtstart
+        if rule['count'] and count >= rule['count']:
+            return
+
+    while True:
+        period = _period_start(rule, dtstart, k)
+        k += 1
+        if before is not None and period >= before:
+            return
+        if rule['until'] and period > rule['until']:
+            return
+
+        produced = False
+        for occurrence in _period_candidates(rule, dtstart, period):
+            if occurrence <= dtstart:
+                continue
+            if rule['until'] and occurrence > rule['until']:
+                return
+            if before is not None and occurrence >= before:
+                return
+            produced = True
+            count += 1
+            if occurrence not in exdates:
+                yield occurrence
+            if rule['count'] and count >= rule['count']:
+                return
+
+        empty = 0 if produced else empty + 1
+        if empty > MAX_EMPTY_PERIODS:
+            return
+
+
+def iter_series_starts(event, dtstart, rule, exdates=(), not_before=None, before=None):
+    """iter_occurrence_starts in the event's own zone; yields UTC datetimes.
+
+    With a "tzid" the rule is expanded on wall-clock time, so a 09:00
+    weekly meeting stays at 09:00 local after a DST change. EXDATE and
+    UNTIL are moved onto the same wall-clock grid. The window bounds get
+    a day of slack, since callers filter occurrences by real time anyway.
+    """
+    zone = event_zone(event)
+    if zone is None:
+        yield from iter_occurrence_starts(dtstart, rule, exdates, not_before, before)
+        return
+    if rule['until']:
+        rule = dict(rule, until=_to_wall(rule['until'], zone))
+    slack = timedelta(days=1)
+    for wall in iter_occurrence_starts(
+            _to_wall(dtstart, zone), rule, {_to_wall(d, zone) for d in exdates},
+            not_before=_to_wall(not_before, zone) - slack if not_before else None,
+            before=_to_wall(before, zone) + slack if before else None):
+        yield _from_wall(wall, zone)
+
+
+def overlaps(start, end, window_start, window_end):
+    """True if [start, end) overlaps the window; zero-length events count at their start"""
+    return start < window_end and (end > window_start or start >= window_start)
+
+
+def iter_occurrences(event, window_start, window_end):
+    """Lazily yield the occurrences of one event overlapping [window_start, window_end).
+
+    Non-recurring events yield themselves when they overlap the window.
+    Each occurrence is a copy of the event with shifted start/end plus
+    "recurrence_id" (the original occurrence start) for recurring series.
+    """
+    start, end = event_bounds(event)
+    if start is None:
+        return
+    duration = end - start
+
+    rrule = normalize_rrule(event.get('rrule'))
+    if not rrule:
+        if overlaps(start, end, window_start, window_end):
+            yield event
+        return
+
+    rule = parse_rrule(rrule)
+    exdates = parse_exdates(event.get('exdate'))
+    for occ_start in iter_series_starts(event, start, rule, exdates,
+                                        not_before=window_start - duration,
+                                        before=window_end):
+        occ_end = occ_start + duration
+        if not overlaps(occ_start, occ_end, window_start, window_end):
+            continue
+        occurrence = {k: v for k, v in event.items() if k not in ('rrule', 'exdate')}
+        occurrence['start'] = format_event_time(occ_start)
+        occurrence['end'] = format_event_time(occ_end)
+        occurrence['recurrence_id'] = format_event_time(occ_start)
+        occurrence['series_id'] = event.get('id')
+        yield occurrence
+
+
+def expand_event(event, window_start, window_end):
+    """Occurrences of one event overlapping [window_start, window_end), as a list"""
+    return list(iter_occurrences(event, window_start, window_end))
+
+
+def expand_events(events, window_start, window_end):
+    """All occurrences of `events` overlapping the window, sorted by start"""
+    window_start = parse_event_time(window_start)
+    window_end = parse_event_time(window_end)
+    occurrences = []
+    for event in events:
+        try:
+            occurrences.extend(expand_event(event, window_start, window_end))
+        except RecurrenceError:
+            continue
+    occurrences.sort(key=lambda e: parse_event_time(e.get('start')))
+    return occurrences
+
+
+def series_end(event):
+    """End of the last occurrence of an event, or None if it never ends"""
+    start, end = event_bounds(event)
+    if start is None:
+        return None
+    rrule = normalize_rrule(event.get('rrule'))
+    if not rrule:
+        return end
+    rule = parse_rrule(rrule)
+    duration = end - start
+    if rule['until']:
+        return rule['until'] + duration
+    if rule['count']:
+        last = start
+        for last in iter_series_starts(event, start, rule):
+            pass
+        return last + duration
+    return None
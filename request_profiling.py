@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Request Profiling
+- Opt-in per-request profiling for any of the Flask apps: a random sample
+  of requests (PROFILE_SAMPLE_RATE) and/or requests carrying
+  "X-Profile: <PROFILE_TOKEN>"
+- PROFILER=cprofile writes .pstats files (snakeviz, gprof2dot, pstats);
+  PROFILER=sampling writes collapsed stacks (.folded) for flamegraph.pl
+  or speedscope
+- SERVER_TIMING=true adds a Server-Timing header with per-phase durations
+  (storage, render, tts, ...) recorded through phase()
+- Nothing is registered on the app when both are off, and phase() hands
+  back a shared no-op context manager, so disabled means no overhead
+"""
+
+import contextlib
+import cProfile
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))
+PROFILE_TOKEN = os.environ.get('PROFILE_TOKEN', '')
+PROFILER = os.environ.get('PROFILER', 'cprofile').lower()
+PROFILE_DIR = os.environ.get('PROFILE_DIR', 'profiles')
+PROFILE_INTERVAL = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() == 'true'
+
+PROFILE_HEADER = 'X-Profile'
+
+_NULL_PHASE = contextlib.nullcontext()
+
+# cProfile allows one active profiler per process on newer Pythons
+_profile_lock = threading.Lock()
+
+# ============================================================================
+# Server-Timing Phases
+# ============================================================================
+
+class _Phase:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        from flask import g, has_request_context
+        if has_request_context():
+            timings = g.setdefault('server_timing', {})
+            timings[self.name] = timings.get(self.name, 0.0) + time.perf_counter() - self.started
+        return False
+
+
+def phase(name):
+    """Time a block as one Server-Timing phase; repeated phases add up"""
+    if not SERVER_TIMING:
+        return _NULL_PHASE
+    return _Phase(name)
+
+
+def format_server_timing(timings, total=None):
+    parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in timings.items()]
+    if total is not None:
+        parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+# ============================================================================
+# Profilers
+# ============================================================================
+
+class _CProfileSession:
+    extension = '.pstats'
+
+    def __init__(self, thread_id):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def write(self, path):
+        self._profile.dump_stats(path)
+
+
+class _SamplingSession:
+    """Samples one thread's Python stack every PROFILE_INTERVAL seconds"""
+
+    extension = '.folded'
+
+    def __init__(self, thread_id):
+        self.thread_id = thread_id
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(PROFILE_INTERVAL):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+
+PROFILERS = {'cprofile': _CProfileSession, 'sampling': _SamplingSession}
+
+# ============================================================================
+# Flask Integration
+# ============================================================================
+
+def _wants_profile(req):
+    if PROFILE_TOKEN and req.headers.get(PROFILE_HEADER) == PROFILE_TOKEN:
+        return True
+    return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+
+def _finish_profile(g, endpoint):
+    session = g.pop('profile_session', None)
+    if session is None:
+        return None
+    try:
+        session.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        label = re.sub(r'[^A-Za-z0-9_.-]', '_', endpoint or 'request')
+        stamp = time.strftime('%Y%m%dT%H%M%S')
+        path = os.path.join(PROFILE_DIR, f'{stamp}-{os.getpid()}-{label}{session.extension}')
+        session.write(path)
+        logger.info(f"🔬 Wrote request profile {path}")
+        return path
+    except Exception as e:
+        logger.error(f"Writing request profile failed: {e}")
+        return None
+    finally:
+        if isinstance(session, _CProfileSession):
+            _profile_lock.release()
+
+
+def init_profiling(app):
+    """Attach profiling / Server-Timing hooks to a Flask app if either is enabled"""
+    profiling = bool(PROFILE_TOKEN) or PROFILE_SAMPLE_RATE > 0
+    if not profiling and not SERVER_TIMING:
+        return app
+
+    from flask import g, request
+
+    session_cls = PROFILERS.get(PROFILER, _CProfileSession)
+
+    @app.before_request
+    def _start_request_profile():
+        g.request_started = time.perf_counter()
+        if not profiling or not _wants_profile(request):
+            return
+        if session_cls is _CProfileSession and not _profile_lock.acquire(blocking=False):
+            return  # another request is being profiled
+        session = session_cls(threading.get_ident())
+        g.profile_session = session
+        session.start()
+
+    @app.after_request
+    def _finish_request_profile(response):
+        path = _finish_profile(g, request.endpoint)
+        if path:
+            response.headers['X-Profile-Output'] = os.path.basename(path)
+        if SERVER_TIMING:
+            total = time.perf_counter() - g.get('request_started', time.perf_counter())
+            response.headers['Server-Timing'] = format_server_timing(g.get('server_timing', {}), total)
+        return response
+
+    @app.teardown_request
+    def _abandon_request_profile(exc):
+        # Unhandled exceptions skip after_request; never leave a profiler running
+        _finish_profile(g, request.endpoint)
+
+    logger.info(f"🔬 Request profiling: {PROFILER if profiling else 'off'}, "
+                f"Server-Timing: {'on' if SERVER_TIMING else 'off'}")
+    return app
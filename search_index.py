@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Event Search
+- Per-user inverted index over summary, description and location
+- Exact, prefix and fuzzy (small edit distance) term matching
+- Updated incrementally from the full event list sent by /api/sync
+"""
+
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from interval_index import event_key
+
+SEARCH_FIELDS = {'summary': 3.0, 'location': 2.0, 'description': 1.0}
+
+# Matching a query term exactly beats a prefix, which beats a typo
+EXACT_WEIGHT = 1.0
+PREFIX_WEIGHT = 0.7
+FUZZY_WEIGHT = 0.5
+
+# Words that carry no meaning in "delete the dentist appointment" style queries
+STOP_WORDS = frozenset({
+    'a', 'an', 'the', 'my', 'me', 'for', 'to', 'of', 'on', 'at', 'in', 'with',
+    'and', 'or', 'please', 'event', 'events',
+})
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    """Lowercase, accent-folded word tokens"""
+    if not text:
+        return []
+    folded = unicodedata.normalize('NFKD', str(text).lower())
+    folded = ''.join(c for c in folded if not unicodedata.combining(c))
+    return _TOKEN_RE.findall(folded)
+
+
+def query_terms(text):
+    """Search terms of a query with stop words removed (unless nothing is left)"""
+    tokens = tokenize(text)
+    terms = [t for t in tokens if t not in STOP_WORDS]
+    return terms or tokens
+
+
+def within_distance(a, b, max_distance):
+    """True if the edit distance (with transpositions) between a and b is small"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = cur[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if prev2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+            row_min = min(row_min, cur[j])
+        if row_min > max_distance:
+            return False
+        prev2, prev = prev, cur
+    return prev[-1] <= max_distance
+
+
+def max_typos(term):
+    """Allowed edit distance for a query term of this length"""
+    if len(term) < 4:
+        return 0
+    return 1 if len(term) < 8 else 2
+
+
+class SearchIndex:
+    """Inverted index of one user's events"""
+
+    def __init__(self, events=()):
+        self._lock = threading.RLock()
+        self._postings = {}    # term -> {key: weight}
+        self._vocabulary = []  # sorted terms, for prefix and fuzzy lookups
+        self._dirty_vocab = False
+        self._events = {}      # key -> event dict
+        self._terms = {}       # key -> {term: weight}
+        self._texts = {}       # key -> indexed text fields
+        self.update(events)
+
+    def __len__(self):
+        return len(self._events)
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    def add(self, event):
+        """Index one event (replacing any event with the same key)"""
+        key = event_key(event)
+        with self._lock:
+            if key in self._events:
+                self.remove(key)
+            weights = {}
+            for field, weight in SEARCH_FIELDS.items():
+                for term in tokenize(event.get(field)):
+                    weights[term] = max(weights.get(term, 0.0), weight)
+            for term, weight in weights.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    self._dirty_vocab = True
+                postings[key] = weight
+            self._events[key] = event
+            self._terms[key] = weights
+            self._texts[key] = _text_of(event)
+
+    def remove(self, key):
+        """Drop an event by key; unknown keys are ignored"""
+        with self._lock:
+            if self._events.pop(key, None) is None:
+                return
+            self._texts.pop(key, None)
+            for term in self._terms.pop(key, {}):
+                postings = self._postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(key, None)
+                if not postings:
+                    del self._postings[term]
+                    self._dirty_vocab = True
+
+    def update(self, events):
+        """Bring the index in line with a full event list, re-indexing only
+        events whose text changed"""
+        with self._lock:
+            incoming = {event_key(e): e for e in events}
+            for key in [k for k in self._events if k not in incoming]:
+                self.remove(key)
+            for key, event in incoming.items():
+                if self._texts.get(key) == _text_of(event):
+                    self._events[key] = event
+                else:
+                    self.add(event)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _vocab(self):
+        if self._dirty_vocab:
+            self._vocabulary = sorted(self._postings)
+            self._dirty_vocab = False
+        return self._vocabulary
+
+    def _expand(self, term, prefix, fuzzy):
+        """Index terms matching a query term, with their match weight"""
+        matches = {}
+        if term in self._postings:
+            matches[term] = EXACT_WEIGHT
+        vocab = self._vocab()
+        if prefix:
+            pos = bisect_left(vocab, term)
+            while pos < len(vocab) and vocab[pos].startswith(term):
+                matches.setdefault(vocab[pos], PREFIX_WEIGHT)
+                pos += 1
+        typos = max_typos(term) if fuzzy else 0
+        if typos and not matches:
+            for candidate in vocab:
+                if within_distance(term, candidate, typos):
+                    matches.setdefault(candidate, FUZZY_WEIGHT)
+        return matches
+
+    def search(self, query, limit=10, prefix=True, fuzzy=True):
+        """Events matching a free-text query, best first.
+
+        Events matching more query terms rank first, then by weighted score.
+        The final query term is always prefix-matched so partial input works.
+        Returns a list of (score, event).
+        """
+        terms = query_terms(query)
+        if not terms:
+            return []
+
+        scores, covered = {}, {}
+        with self._lock:
+            for i, term in enumerate(terms):
+                use_prefix = prefix or i == len(terms) - 1
+                best = {}
+                for matched, match_weight in self._expand(term, use_prefix, fuzzy).items():
+                    for key, field_weight in self._postings[matched].items():
+                        score = match_weight * field_weight
+                        if score > best.get(key, 0.0):
+                            best[key] = score
+                for key, score in best.items():
+                    scores[key] = scores.get(key, 0.0) + score
+                    covered[key] = covered.get(key, 0) + 1
+
+            ranked = sorted(scores, key=lambda k: (-covered[k], -scores[k], k))
+            return [(round(scores[k], 3), self._events[k]) for k in ranked[:limit]]
+
+
+def _text_of(event):
+    return tuple(event.get(field) or '' for field in SEARCH_FIELDS)
@@ -13,6 +13,8 @@ import json
 import os
 import base64
 
+from ics_serializer import generate_ics_calendar
+
 app = Flask(__name__)
 CORS(app)
 
@@ -68,80 +70,6 @@ def save_user_events(username_b64, events):
         print(f'❌ Error saving events: {e}')
         return False
 
-def format_datetime_ics(iso_str):
-    """Convert ISO 8601 datetime to iCalendar format (YYYYMMDDTHHMMSSZ)"""
-    try:
-        # Handle different ISO formats
-        dt_str = iso_str.replace('Z', '+00:00')
-        dt = datetime.fromisoformat(dt_str)
-        # Convert to UTC and format
-        return dt.strftime('%Y%m%dT%H%M%SZ')
-    except Exception as e:
-        print(f'⚠️ Date format error for "{iso_str}": {e}')
-        # Fallback to current time
-        return datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
-
-def generate_ics_calendar(events):
-    """Generate iCalendar (.ics) format from events list"""
-    lines = [
-        'BEGIN:VCALENDAR',
-        'VERSION:2.0',
-        'PRODID:-//MANTA-JARVIS//Calendar//EN',
-        'CALSCALE:GREGORIAN',
-        'METHOD:PUBLISH',
-        'X-WR-CALNAME:MANTA-JARVIS',
-        'X-WR-TIMEZONE:UTC',
-        'X-WR-CALDESC:Your personal MANTA-JARVIS calendar'
-    ]
-    
-    for event in events:
-        try:
-            event_id = event.get('id', str(hash(event.get('summary', ''))))
-            summary = event.get('summary', 'Untitled Event')
-            start = event.get('start')
-            end = event.get('end')
-            description = event.get('description', '')
-            location = event.get('location', '')
-            created = event.get('created', datetime.utcnow().isoformat())
-            
-            if not start:
-                print(f'⚠️ Skipping event without start time: {summary}')
-                continue
-            
-            # Format dates
-            dtstart = format_datetime_ics(start)
-            dtend = format_datetime_ics(end if end else start)
-            dtstamp = format_datetime_ics(created)
-            
-            lines.extend([
-                'BEGIN:VEVENT',
-                f'UID:{event_id}@manta-jarvis.local',
-                f'DTSTAMP:{dtstamp}',
-                f'DTSTART:{dtstart}',
-                f'DTEND:{dtend}',
-                f'SUMMARY:{summary}',
-                'STATUS:CONFIRMED',
-                'SEQUENCE:0'
-            ])
-            
-            if description:
-                lines.append(f'DESCRIPTION:{description}')
-            if location:
-                lines.append(f'LOCATION:{location}')
-            
-            lines.append('END:VEVENT')
-            
-            print(f'✅ Added event to calendar: {summary} ({dtstart})')
-            
-        except Exception as e:
-            print(f'❌ Error processing event: {e}')
-            continue
-    
-    lines.append('END:VCALENDAR')
-    
-    # Use \r\n line endings as per iCalendar spec
-    return '\r\n'.join(lines) + '\r\n'
-
 # ============================================================================
 # API Endpoints
 # ============================================================================
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Server
+- One app factory for every backend role: calendar sync (/api/*), ICS
+  feeds (/calendar/*) and TTS (/synthesize) are components mounted as
+  blueprints, chosen with SERVER_COMPONENTS (default: calendar,feeds;
+  tts is opt-in, since it needs Coqui TTS and the Google client libraries,
+  which requirements.txt does not install)
+- Components share the process: one event storage layer (event_storage),
+  one set of caches keyed by its data versions, one admission-control
+  store and one set of request hooks (CORS, compression, profiling)
+- A per-role deployment runs the same code with fewer components, e.g.
+  SERVER_COMPONENTS=feeds for a feed-only instance
+
+Run: gunicorn --worker-class gthread --threads 64 'server:create_app()'
+ or: python server.py
+"""
+
+from flask import Flask, jsonify
+from flask_cors import CORS
+import importlib
+import logging
+import os
+
+import admission_control
+import data_layout
+import event_codec
+import event_storage
+import http_compression
+import request_profiling
+
+PORT = int(os.environ.get("PORT", 5000))
+DEBUG = os.environ.get("DEBUG", "False").lower() == "true"
+SERVER_COMPONENTS = os.environ.get("SERVER_COMPONENTS", "calendar,feeds")
+
+logging.basicConfig(
+    level=logging.INFO if not DEBUG else logging.DEBUG,
+    format='[%(levelname)s] %(asctime)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Component name -> module that registers it when imported
+COMPONENT_MODULES = {
+    'calendar': 'calendar_server',
+    'feeds': 'calendar_server',
+    'tts': 'tts_server',
+}
+
+# ============================================================================
+# Components
+# ============================================================================
+
+class Component:
+    """A mountable part of the server.
+
+    `route_limits` and `exempt` use the blueprint's own endpoint names (as
+    in admission_control.init_admission). `health()` returns a dict merged
+    into /health; `index` is a view for / (the first mounted one wins).
+    """
+
+    def __init__(self, name, blueprint, route_limits=None, exempt=(), health=None, index=None):
+        self.name = name
+        self.blueprint = blueprint
+        self.route_limits = route_limits or {}
+        self.exempt = set(exempt)
+        self.health = health
+        self.index = index
+
+    def endpoint(self, view_name):
+        return f'{self.blueprint.name}.{view_name}'
+
+
+_components = {}
+
+def register(component):
+    """Make a component available to create_app (called by its module on import)"""
+    _components[component.name] = component
+    return component
+
+def get_component(name):
+    if name not in _components:
+        if name not in COMPONENT_MODULES:
+            raise ValueError(f"Unknown server component '{name}' "
+                             f"(expected some of {', '.join(COMPONENT_MODULES)})")
+        importlib.import_module(COMPONENT_MODULES[name])
+    return _components[name]
+
+def parse_components(spec):
+    """Component names from "calendar,feeds" / a list; "all" means every component"""
+    if isinstance(spec, str):
+        spec = [part.strip().lower() for part in spec.split(',') if part.strip()]
+    if 'all' in spec:
+        return list(COMPONENT_MODULES)
+    return list(dict.fromkeys(spec))
+
+# ============================================================================
+# App Factory
+# ============================================================================
+
+def create_app(components=None):
+    """Build a Flask app serving the given components (default SERVER_COMPONENTS)"""
+    names = parse_components(SERVER_COMPONENTS if components is None else components)
+    if not names:
+        raise ValueError('No server components selected')
+    mounted = [get_component(name) for name in names]
+
+    app = Flask(__name__)
+    app.config['SERVER_COMPONENTS'] = names
+    CORS(app)
+    http_compression.init_compression(app)
+    request_profiling.init_profiling(app)
+
+    # One set of admission hooks for all components, over one shared store
+    route_limits, exempt = {}, set()
+    for component in mounted:
+        for view_name, limits in component.route_limits.items():
+            route_limits[component.endpoint(view_name)] = limits
+        exempt.update(component.endpoint(view_name) for view_name in component.exempt)
+    admission_control.init_admission(app, admission_control.get_store(), route_limits, exempt)
+
+    for component in mounted:
+        app.register_blueprint(component.blueprint)
+
+    index = next((c.index for c in mounted if c.index), None)
+    if index:
+        app.add_url_rule('/', 'index', index)
+
+    def health():
+        """Health check endpoint"""
+        result = {'status': 'ok', 'components': names}
+        for component in mounted:
+            if component.health:
+                result.update(component.health())
+        return jsonify(result)
+
+    app.add_url_rule('/health', 'health', health)
+    app.add_url_rule('/healthz', 'healthz', lambda: ('OK', 200))
+
+    # Users still in app.py's or the TTS server's old stores
+    event_storage.start_legacy_import()
+
+    logger.info(f"🧩 Components: {', '.join(names)}")
+    return app
+
+# ============================================================================
+# Main Entry Point
+# ============================================================================
+
+def run(components=None):
+    app = create_app(components)
+    logger.info('=' * 70)
+    logger.info('🤖 MANTA-JARVIS SERVER')
+    logger.info('=' * 70)
+    logger.info(f"🧩 Components: {', '.join(app.config['SERVER_COMPONENTS'])}")
+    logger.info(f'📁 Data directory: {os.path.abspath(event_storage.DATA_DIR)}')
+    logger.info(f'🗂️  Data layout: {data_layout.LAYOUT}')
+    logger.info(f'🗜️  Event codec: {event_codec.describe()}')
+    bus = event_storage.invalidation_bus
+    logger.info(f"📣 Cache invalidation: {bus.describe() if bus else 'stat'}")
+    logger.info(f'🌐 Server URL: http://localhost:{PORT}')
+    logger.info(f'🔧 Debug mode: {DEBUG}')
+    logger.info('=' * 70)
+    app.run(host='0.0.0.0', port=PORT, debug=DEBUG)
+
+
+if __name__ == '__main__':
+    # Go through the importable module, so components register with its registry
+    import server
+    server.run()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Shared Calendars
+- Named groups of users (family, team) with one combined .ics feed
+- Group definitions are small JSON files under DATA_DIR/.groups, so every
+  worker sees the same membership
+- Combined feeds are a k-way merge (heapq.merge) of each member's
+  start-sorted VEVENT fragments; an event that is identical in several
+  members' calendars (the same imported invite) appears once, while
+  different events that happen to share an id (frontend ids are
+  millisecond timestamps) are all kept under distinct UIDs
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import secrets
+from datetime import datetime, timezone
+from operator import itemgetter
+
+from ics_serializer import CALENDAR_FOOTER, CRLF, calendar_header, escape_text, fold_line, timezone_components
+
+logger = logging.getLogger(__name__)
+
+MAX_GROUP_MEMBERS = int(os.environ.get('MAX_GROUP_MEMBERS', 50))
+GROUPS_DIRNAME = '.groups'
+
+_GROUP_ID_RE = re.compile(r'[A-Za-z0-9_-]{8,64}\Z')
+
+
+class GroupError(ValueError):
+    """Invalid group definition"""
+
+# ============================================================================
+# Group Definitions
+# ============================================================================
+
+class GroupStore:
+    """Create, read and update group definitions stored one file per group"""
+
+    def __init__(self, data_dir):
+        self.directory = os.path.join(data_dir, GROUPS_DIRNAME)
+
+    def _path(self, group_id):
+        if not group_id or not _GROUP_ID_RE.match(group_id):
+            return None
+        return os.path.join(self.directory, f'{group_id}.json')
+
+    @staticmethod
+    def _clean(name, members):
+        if not isinstance(members, list) or not members:
+            raise GroupError('members must be a non-empty list of username_b64 values')
+        if not all(isinstance(m, str) and m for m in members):
+            raise GroupError('members must be username_b64 strings')
+        members = list(dict.fromkeys(members))  # drop repeats, keep order
+        if len(members) > MAX_GROUP_MEMBERS:
+            raise GroupError(f'a group may have at most {MAX_GROUP_MEMBERS} members')
+        name = str(name or '').strip() or 'Shared calendar'
+        return name, members
+
+    def _write(self, group):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(group['id'])
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(group, f)
+        os.replace(tmp_path, path)
+
+    def get(self, group_id):
+        path = self._path(group_id)
+        if not path:
+            return None
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def create(self, name, members):
+        name, members = self._clean(name, members)
+        group = {
+            'id': secrets.token_urlsafe(12),
+            'name': name,
+            'members': members,
+            'created': datetime.now(timezone.utc).isoformat(),
+        }
+        self._write(group)
+        logger.info(f"👥 Created group '{name}' with {len(members)} members")
+        return group
+
+    def update(self, group_id, name=None, members=None):
+        group = self.get(group_id)
+        if group is None:
+            return None
+        group['name'], group['members'] = self._clean(
+            group['name'] if name is None else name,
+            group['members'] if members is None else members)
+        self._write(group)
+        return group
+
+    def delete(self, group_id):
+        path = self._path(group_id)
+        if not path:
+            return False
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+# ============================================================================
+# Merged Feeds
+# ============================================================================
+
+def _uid_line(uid):
+    # As written by ics_serializer.serialize_event
+    return fold_line(f'UID:{escape_text(uid)}@manta-jarvis.local') + CRLF
+
+
+def _tag(fragments, member):
+    for start, uid, text in fragments:
+        yield start, uid, text, member
+
+
+def merge_fragments(member_fragments):
+    """Yield VEVENT texts from several start-sorted fragment lists in start order.
+
+    Each list holds (start, uid, text) tuples as produced by
+    ics_serializer.render_fragments. Fragments that are exact duplicates
+    (same UID and same text) are emitted once; a different event reusing
+    an emitted UID gets the member's position appended to its UID, since
+    calendar clients would otherwise collapse the two.
+    """
+    tagged = [_tag(fragments, member) for member, fragments in enumerate(member_fragments)]
+    seen = {}   # uid -> texts emitted under it
+    for _, uid, text, member in heapq.merge(*tagged, key=itemgetter(0)):
+        texts = seen.setdefault(uid, set())
+        if text in texts:
+            continue
+        emitted = bool(texts)
+        texts.add(text)
+        if emitted:
+            text = text.replace(_uid_line(uid), _uid_line(f'{uid}-m{member}'), 1)
+        yield text
+
+
+def render_group_calendar(name, member_fragments):
+    """(ICS text, event count) for a group's combined feed"""
+    vevents = list(merge_fragments(member_fragments))
+    body = ''.join(vevents)
+    header = calendar_header(name, f'{name} - shared MANTA-JARVIS calendar')
+    return header + timezone_components(body) + body + CALENDAR_FOOTER, len(vevents)
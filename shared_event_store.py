@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Shared Event Store
+- Replaces the single user_events.json ({user: [events]}) read by
+  tts_server.get_user_events with one shard file per user
+- mtime-invalidated in-memory cache, so a feed request costs one stat()
+  plus, on change, one read of that user's shard
+- One-shot migration splits the legacy file into shards
+- event_storage imports the shards into the shared DATA_DIR store and
+  retires them (users() / retire())
+
+Usage: python shared_event_store.py migrate [legacy_path] [shard_dir]
+"""
+
+import base64
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+
+import event_codec
+
+LEGACY_PATH = os.environ.get('USER_EVENTS_FILE', 'user_events.json')
+SHARD_DIR = os.environ.get('USER_EVENTS_SHARD_DIR', 'user_events_shards')
+CACHE_SIZE = int(os.environ.get('USER_EVENTS_CACHE_SIZE', 1024))
+
+
+def shard_name(user_key):
+    """Filesystem-safe, reversible shard file stem for a user key (e.g. an email)"""
+    return base64.urlsafe_b64encode(str(user_key).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+class SharedEventStore:
+    """Per-user access to events that used to live in one shared JSON file"""
+
+    def __init__(self, legacy_path=LEGACY_PATH, shard_dir=SHARD_DIR, cache_size=CACHE_SIZE):
+        self.legacy_path = legacy_path
+        self.shard_dir = shard_dir
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # user_key -> (stat token, events)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+
+    def needs_migration(self):
+        return os.path.exists(self.legacy_path)
+
+    def migrate(self):
+        """Split the legacy shared file into per-user shards.
+
+        The legacy file is renamed to <name>.migrated afterwards, so the
+        full parse happens once. Safe to call from several workers at once:
+        the losers of the rename race simply find nothing left to do.
+        Returns the number of users migrated.
+        """
+        if not self.needs_migration():
+            return 0
+        try:
+            with open(self.legacy_path, 'rb') as f:
+                data = event_codec.loads(f.read())
+        except FileNotFoundError:
+            return 0
+
+        os.makedirs(self.shard_dir, exist_ok=True)
+        for user_key, events in data.items():
+            self.put(user_key, events)
+
+        try:
+            os.replace(self.legacy_path, self.legacy_path + '.migrated')
+        except FileNotFoundError:
+            pass
+        return len(data)
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    def has_data(self):
+        return self.needs_migration() or bool(self.users())
+
+    def users(self):
+        """User keys that have a shard"""
+        if not os.path.isdir(self.shard_dir):
+            return []
+        keys = set()
+        extensions = (event_codec.file_extension(),) + event_codec.KNOWN_EXTENSIONS
+        for name in os.listdir(self.shard_dir):
+            extension = next((e for e in extensions if name.endswith(e)), None)
+            if extension:
+                stem = name[:-len(extension)]
+                padded = stem + '=' * (-len(stem) % 4)
+                keys.add(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        return sorted(keys)
+
+    def retire(self, user_key):
+        """Rename a user's shard to <name>.migrated once its events live elsewhere"""
+        path = self._find_shard(user_key)
+        if path is not None:
+            try:
+                os.replace(path, path + '.migrated')
+            except FileNotFoundError:
+                pass  # retired by another process meanwhile
+        with self._lock:
+            self._cache.pop(user_key, None)
+
+    def shard_path(self, user_key):
+        return os.path.join(self.shard_dir, shard_name(user_key) + event_codec.file_extension())
+
+    def _find_shard(self, user_key):
+        stem = os.path.join(self.shard_dir, shard_name(user_key))
+        preferred = event_codec.file_extension()
+        for extension in (preferred,) + event_codec.KNOWN_EXTENSIONS:
+            if os.path.exists(stem + extension):
+                return stem + extension
+        return None
+
+    def get(self, user_key):
+        """Events for one user ([] if none); served from cache while the shard is unchanged"""
+        if self.needs_migration():
+            self.migrate()
+
+        path = self._find_shard(user_key)
+        if path is None:
+            return []
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return []
+        token = (path, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            cached = self._cache.get(user_key)
+            if cached and cached[0] == token:
+                self._cache.move_to_end(user_key)
+                return cached[1]
+
+        with open(path, 'rb') as f:
+            events = event_codec.loads(f.read()).get('events', [])
+
+        with self._lock:
+            self._cache[user_key] = (token, events)
+            self._cache.move_to_end(user_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return events
+
+    def put(self, user_key, events):
+        """Write one user's shard atomically"""
+        os.makedirs(self.shard_dir, exist_ok=True)
+        path = self.shard_path(user_key)
+        # A temp file of our own, so workers migrating at once never share one
+        fd, tmp_path = tempfile.mkstemp(dir=self.shard_dir, prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(event_codec.dumps({'user': user_key, 'events': events}))
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        with self._lock:
+            self._cache.pop(user_key, None)
+        return True
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2 or sys.argv[1] != 'migrate':
+        print(__doc__.strip())
+        sys.exit(1)
+    store = SharedEventStore(*sys.argv[2:4])
+    migrated = store.migrate()
+    print(f'Migrated {migrated} users from {store.legacy_path} into {store.shard_dir}/')
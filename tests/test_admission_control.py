@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from admission_control import (ConcurrencyLimiter, MemoryStore, Overloaded, RateLimited,
+                               RateLimiter, SQLiteStore, parse_rate)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryStore()
+    return SQLiteStore(str(tmp_path / 'admission.sqlite'))
+
+
+def test_parse_rate():
+    assert parse_rate('30/minute') == (30, 0.5)
+    assert parse_rate('2/s') == (2, 2)
+    assert parse_rate('off') is None
+    assert parse_rate('0/hour') is None
+    with pytest.raises(ValueError):
+        parse_rate('5/fortnight')
+
+
+def test_token_bucket_refills_evenly(store):
+    rate = parse_rate('3/minute')  # one token every 20 seconds
+    now = 1000.0
+    assert [store.take('ip:1', rate, now) for _ in range(3)] == [0, 0, 0]
+    assert store.take('ip:1', rate, now) == pytest.approx(20)
+    # Other keys have buckets of their own
+    assert store.take('ip:2', rate, now) == 0
+
+    assert store.take('ip:1', rate, now + 10) == pytest.approx(10)
+    assert store.take('ip:1', rate, now + 20) == 0
+    assert store.take('ip:1', rate, now + 20) > 0
+
+    # A long pause refills to capacity, no further
+    later = now + 3600
+    assert [store.take('ip:1', rate, later) for _ in range(3)] == [0, 0, 0]
+    assert store.take('ip:1', rate, later) > 0
+
+
+def test_rate_limiter_reports_retry_after(store):
+    limiter = RateLimiter(store)
+    rate = parse_rate('1/minute')
+    limiter.check('feed:abc', rate)
+    with pytest.raises(RateLimited) as e:
+        limiter.check('feed:abc', rate)
+    assert e.value.status == 429
+    assert 59 <= e.value.retry_after <= 60
+    limiter.check('feed:abc', None)
+
+
+def test_concurrency_lease_expires(store):
+    now = 1000.0
+    assert store.try_acquire('tts', 'crashed', 1, 30, now)
+    assert not store.try_acquire('tts', 'next', 1, 30, now + 29)
+    assert store.count('tts', now + 29) == 1
+    # The holder never released; its lease runs out
+    assert store.try_acquire('tts', 'next', 1, 30, now + 31)
+    assert store.count('tts', now + 31) == 1
+
+    store.release('tts', 'next')
+    assert store.count('tts', now + 31) == 0
+
+
+def test_limiter_slot_frees_after_lease(store):
+    limiter = ConcurrencyLimiter(store, 'tts', limit=1, lease=0.2)
+    limiter.acquire()  # never released
+    with pytest.raises(Overloaded):
+        limiter.acquire()
+    time.sleep(0.3)
+    with limiter.slot():
+        assert limiter.stats()['running'] == 1
+    assert limiter.stats()['running'] == 0
+
+
+def test_queue_timeout(store):
+    limiter = ConcurrencyLimiter(store, 'tts', limit=1, max_queue=1, queue_timeout=0.3)
+    holder = limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(Overloaded) as e:
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.3
+    assert e.value.status == 503 and e.value.retry_after == 1
+    assert limiter.stats()['queued'] == 0
+    limiter.release(holder)
+
+
+def test_queued_caller_gets_released_slot(store):
+    limiter = ConcurrencyLimiter(store, 'tts', limit=1, max_queue=1, queue_timeout=5)
+    holder = limiter.acquire()
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('holder', limiter.acquire()))
+    thread.start()
+    deadline = time.monotonic() + 5
+    while limiter.stats()['queued'] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    # The queue holds one waiter; the next caller is turned away at once
+    started = time.monotonic()
+    with pytest.raises(Overloaded, match='queue is full'):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.2
+
+    limiter.release(holder)
+    thread.join(5)
+    assert result['holder'] != holder
+    assert limiter.stats() == {'running': 1, 'queued': 0, 'limit': 1}
+
+
+def test_without_queue_rejects_immediately(store):
+    limiter = ConcurrencyLimiter(store, 'tts', limit=1)
+    limiter.acquire()
+    started = time.monotonic()
+    with pytest.raises(Overloaded):
+        limiter.acquire()
+    assert time.monotonic() - started < 0.2
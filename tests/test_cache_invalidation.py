@@ -0,0 +1,79 @@
+import multiprocessing
+import time
+
+import cache_invalidation
+from cache_invalidation import FileWatchBus, LocalBus, LocalChannel
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_file_bus_bump_reaches_a_second_instance(tmp_path):
+    log = str(tmp_path / '.invalidation.log')
+    writer = FileWatchBus(log, poll_interval=0.01)
+    reader = FileWatchBus(log, poll_interval=0.01)
+    heard = []
+    reader.subscribe(heard.append)
+    try:
+        writer.publish('alice')
+        assert writer.version('alice') == 1
+        wait_for(lambda: reader.version('alice') == 1)
+        assert heard == ['alice']
+        assert reader.version('bob') == 0
+        # A bus ignores its own lines when it reads them back
+        time.sleep(0.05)
+        assert writer.version('alice') == 1
+    finally:
+        writer.close()
+        reader.close()
+
+
+def _publish(log, key):
+    bus = FileWatchBus(log, poll_interval=0.01)
+    bus.publish(key)
+    bus.close()
+
+
+def test_file_bus_bump_from_another_process(tmp_path):
+    log = str(tmp_path / '.invalidation.log')
+    reader = FileWatchBus(log, poll_interval=0.01)
+    try:
+        process = multiprocessing.Process(target=_publish, args=(log, 'alice'))
+        process.start()
+        process.join(10)
+        wait_for(lambda: reader.version('alice') == 1)
+    finally:
+        reader.close()
+
+
+def test_file_bus_survives_log_rotation(tmp_path):
+    log = str(tmp_path / '.invalidation.log')
+    writer = FileWatchBus(log, poll_interval=0.01, max_bytes=200)
+    reader = FileWatchBus(log, poll_interval=0.01)
+    try:
+        # Each line is ~60 bytes, so the log rotates every few publishes
+        for n in range(1, 21):
+            writer.publish('alice')
+            wait_for(lambda: reader.version('alice') == n)
+        assert (tmp_path / '.invalidation.log.1').exists()
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_local_channel_connects_buses():
+    channel = LocalChannel()
+    first, second = LocalBus(channel), LocalBus(channel)
+    first.publish('alice')
+    assert (first.version('alice'), second.version('alice')) == (1, 1)
+    second.close()
+    first.publish('alice')
+    assert (first.version('alice'), second.version('alice')) == (2, 1)
+
+
+def test_stat_backend_has_no_bus(tmp_path):
+    assert cache_invalidation.create_bus('stat', str(tmp_path)) is None
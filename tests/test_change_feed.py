@@ -0,0 +1,138 @@
+import threading
+
+import pytest
+
+from change_feed import ChangeFeed
+from event_versioning import match_key
+
+UPCOMING = '2099-03-01T09:00:00.000Z'
+
+
+def event(uid, summary, start='2025-03-01T09:00:00.000Z'):
+    return {'id': uid, 'uid': uid, 'summary': summary, 'start': start, 'end': start}
+
+
+def subscribed(events, **kwargs):
+    feed = ChangeFeed(**kwargs)
+    token = feed.subscribe('alice', lambda: events)
+    return feed, token
+
+
+def test_resume_from_last_event_id_replays_only_later_changes():
+    feed, hello = subscribed([event('a', 'Standup'), event('b', 'Review')])
+    first = feed.update('alice', [event('a', 'Standup moved'), event('b', 'Review')])
+    second = feed.update('alice', [event('a', 'Standup moved')])
+    third = feed.update('alice', [event('a', 'Standup moved'), event('c', 'Lunch')])
+
+    # A client that saw the first change reconnects with it as Last-Event-ID
+    changes, latest = feed.changes_since('alice', first)
+    assert latest == third
+    assert [(version, [e['id'] for e in up], dl) for version, up, dl in changes] == [
+        (second, [], ['b']),
+        (third, ['c'], []),
+    ]
+
+    changes, _ = feed.changes_since('alice', hello)
+    assert [version for version, _, _ in changes] == [first, second, third]
+    assert feed.changes_since('alice', third) == ([], third)
+
+
+def test_unchanged_list_is_not_a_change():
+    events = [event('a', 'Standup')]
+    feed, hello = subscribed(events)
+    assert feed.update('alice', [dict(e) for e in events]) is None
+    assert feed.changes_since('alice', hello) == ([], hello)
+
+
+def test_unresumable_tokens_get_a_reset():
+    feed, hello = subscribed([], history=2)
+    tokens = [feed.update('alice', [event(str(n), 'Event')]) for n in range(4)]
+    latest = tokens[-1]
+
+    # Fell out of the history window
+    assert feed.changes_since('alice', hello) == (None, latest)
+    assert [v for v, _, _ in feed.changes_since('alice', tokens[1])[0]] == tokens[2:]
+    # Issued by another process (or before a restart)
+    other = ChangeFeed()
+    assert feed.changes_since('alice', other.epoch + ':1') == (None, latest)
+    # From the future, or not a token at all
+    assert feed.changes_since('alice', feed.epoch + ':99') == (None, latest)
+    assert feed.changes_since('alice', 'garbage') == (None, latest)
+
+
+def test_wait_wakes_on_change_after_resume_token():
+    feed, hello = subscribed([event('a', 'Standup')])
+    result = {}
+
+    def waiter():
+        result['value'] = feed.wait('alice', hello, timeout=5)
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    token = feed.update('alice', [event('a', 'Standup moved')])
+    thread.join(5)
+    changes, latest = result['value']
+    assert latest == token
+    assert [(v, [e['summary'] for e in up]) for v, up, _ in changes] == [(token, ['Standup moved'])]
+
+    assert feed.wait('alice', token, timeout=0.05) == ([], token)
+
+
+def test_retired_events_are_not_reported_as_deleted():
+    old, new, gone = event('a', 'Old'), event('b', 'New'), event('c', 'Gone')
+    feed, _ = subscribed([old, new, gone])
+    archived = {match_key(old)}
+    token = feed.update('alice', [new], is_retired=archived.__contains__)
+    changes, _ = feed.changes_since('alice', feed.epoch + ':0')
+    assert changes == [(token, [], ['c'])]
+
+
+def test_log_lingers_for_reconnects_then_expires():
+    feed, hello = subscribed([event('a', 'Standup')], linger=60)
+    feed.unsubscribe('alice')
+    assert feed.is_tracked('alice')
+    token = feed.update('alice', [event('a', 'Standup moved')])
+    assert feed.subscribe('alice', lambda: []) == token
+    assert [v for v, _, _ in feed.changes_since('alice', hello)[0]] == [token]
+
+    feed.linger = -1
+    feed.unsubscribe('alice')
+    assert not feed.is_tracked('alice')
+    assert feed.changes_since('alice', token) == (None, None)
+
+
+@pytest.fixture(scope='module')
+def client(tmp_path_factory):
+    # calendar_server reads DATA_DIR when first imported
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv('DATA_DIR', str(tmp_path_factory.mktemp('data')))
+        import calendar_server
+    return calendar_server.app.test_client()
+
+
+def test_long_poll_resumes_from_last_event_id_header(client):
+    user = 'YWxpY2U='
+    # Upcoming events, so none is moved to the archive on sync
+    standup, review = event('a', 'Standup', UPCOMING), event('b', 'Review', UPCOMING)
+    sync = lambda events: client.post('/api/sync', json={'username_b64': user, 'events': events})
+    sync([standup])
+    hello = client.get(f'/api/changes?username_b64={user}&wait=0').get_json()['version']
+
+    sync([standup, review])
+    sync([review])
+
+    body = client.get(f'/api/changes?username_b64={user}&wait=0',
+                      headers={'Last-Event-ID': hello}).get_json()
+    assert not body['reset']
+    assert [([e['id'] for e in c['upserted']], c['deleted']) for c in body['changes']] == [
+        (['b'], []),
+        ([], ['a']),
+    ]
+    resumed = body['changes'][0]['version']
+    body = client.get(f'/api/changes?username_b64={user}&wait=0',
+                      headers={'Last-Event-ID': resumed}).get_json()
+    assert [c['deleted'] for c in body['changes']] == [['a']]
+
+    body = client.get(f'/api/changes?username_b64={user}&wait=0',
+                      headers={'Last-Event-ID': 'stale:1'}).get_json()
+    assert body['reset'] and body['changes'] == []
@@ -0,0 +1,69 @@
+import io
+
+import ics_import
+import recurrence
+
+# Weekly 09:00 New York meeting across the 2025-03-09 DST change, with the
+# 2025-03-15 instance moved to 11:00
+DST_SERIES = b"""BEGIN:VCALENDAR\r
+BEGIN:VEVENT\r
+UID:standup\r
+DTSTART;TZID=America/New_York:20250301T090000\r
+DTEND;TZID=America/New_York:20250301T093000\r
+RRULE:FREQ=WEEKLY\r
+SUMMARY:Standup\r
+END:VEVENT\r
+BEGIN:VEVENT\r
+UID:standup\r
+RECURRENCE-ID;TZID=America/New_York:20250315T090000\r
+DTSTART;TZID=America/New_York:20250315T110000\r
+DTEND;TZID=America/New_York:20250315T113000\r
+SUMMARY:Standup (moved)\r
+END:VEVENT\r
+END:VCALENDAR\r
+"""
+
+
+def import_events(data):
+    stored = []
+    for _ in ics_import.merge_import(io.BytesIO(data), [], stored.append):
+        pass
+    return stored[-1]
+
+
+def test_tzid_series_keeps_local_time_across_dst():
+    events = import_events(DST_SERIES)
+    master = next(e for e in events if e.get('rrule'))
+    assert master['tzid'] == 'America/New_York'
+
+    occurrences = recurrence.expand_events(events, '2025-03-01T00:00:00Z', '2025-03-30T00:00:00Z')
+    assert [(e['start'], e['summary']) for e in occurrences] == [
+        ('2025-03-01T14:00:00.000Z', 'Standup'),
+        ('2025-03-08T14:00:00.000Z', 'Standup'),
+        ('2025-03-15T15:00:00.000Z', 'Standup (moved)'),
+        ('2025-03-22T13:00:00.000Z', 'Standup'),
+        ('2025-03-29T13:00:00.000Z', 'Standup'),
+    ]
+
+
+def test_tzid_until_is_compared_in_local_time():
+    data = DST_SERIES.replace(b'RRULE:FREQ=WEEKLY', b'RRULE:FREQ=WEEKLY;UNTIL=20250322T130000Z')
+    occurrences = recurrence.expand_events(import_events(data), '2025-03-01T00:00:00Z', '2025-04-30T00:00:00Z')
+    assert occurrences[-1]['start'] == '2025-03-22T13:00:00.000Z'
+
+
+def test_utc_series_has_no_tzid():
+    data = DST_SERIES.replace(b';TZID=America/New_York:20250301T090000', b':20250301T140000Z')
+    master = next(e for e in import_events(data) if e.get('rrule'))
+    assert 'tzid' not in master
+
+
+def test_import_stores_once_with_progress_per_batch():
+    body = b''.join(b'BEGIN:VEVENT\r\nUID:e%d\r\nDTSTART:20250101T100000Z\r\nSUMMARY:E%d\r\nEND:VEVENT\r\n' % (i, i)
+                    for i in range(25))
+    stored = []
+    progress = list(ics_import.merge_import(io.BytesIO(b'BEGIN:VCALENDAR\r\n' + body + b'END:VCALENDAR\r\n'),
+                                            [], stored.append, batch_size=10))
+    assert [p['done'] for p in progress] == [False, False, True]
+    assert [len(events) for events in stored] == [25]
+    assert progress[-1]['added'] == 25
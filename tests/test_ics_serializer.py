@@ -0,0 +1,73 @@
+import io
+from datetime import datetime
+
+import pytest
+
+import ics_import
+import recurrence
+import shared_calendars
+from ics_serializer import generate_ics_calendar, render_fragments
+
+# Weekly 09:00 New York meeting across the 2025-03-09 DST change, with the
+# 2025-03-15 instance excluded (as stored after an import)
+SERIES = {
+    'id': 'standup', 'uid': 'standup', 'summary': 'Standup',
+    'start': '2025-03-01T14:00:00.000Z', 'end': '2025-03-01T14:30:00.000Z',
+    'rrule': 'FREQ=WEEKLY', 'tzid': 'America/New_York',
+    'exdate': ['2025-03-15T13:00:00.000Z'],
+}
+WINDOW = ('2025-02-25T00:00:00Z', '2025-04-01T00:00:00Z')
+
+
+def starts(events):
+    return [e['start'] for e in recurrence.expand_events(events, *WINDOW)]
+
+
+def reimport(ics):
+    stored = []
+    for _ in ics_import.merge_import(io.BytesIO(ics.encode('utf-8')), [], stored.append):
+        pass
+    return stored[-1]
+
+
+def test_tzid_series_is_published_in_local_time():
+    ics = generate_ics_calendar([SERIES])
+    assert 'DTSTART;TZID=America/New_York:20250301T090000' in ics
+    assert 'DTEND;TZID=America/New_York:20250301T093000' in ics
+    assert 'EXDATE;TZID=America/New_York:20250315T090000' in ics
+    assert ics.count('BEGIN:VTIMEZONE') == 1
+    assert ics.index('BEGIN:VTIMEZONE') < ics.index('BEGIN:VEVENT')
+
+
+def test_tzid_series_round_trips_across_dst():
+    expected = starts([SERIES])
+    assert expected == ['2025-03-01T14:00:00.000Z', '2025-03-08T14:00:00.000Z',
+                        '2025-03-22T13:00:00.000Z', '2025-03-29T13:00:00.000Z']
+    assert starts(reimport(generate_ics_calendar([SERIES]))) == expected
+
+
+def test_vtimezone_matches_the_tz_database():
+    tz = pytest.importorskip('dateutil.tz')
+    zone = recurrence.event_zone(SERIES)
+    vtimezone = tz.tzical(io.StringIO(generate_ics_calendar([SERIES]))).get('America/New_York')
+    for month in range(1, 13):
+        for year in (2025, 2031):
+            local = datetime(year, month, 15, 12)
+            assert vtimezone.utcoffset(local) == local.replace(tzinfo=zone).utcoffset()
+
+
+def test_group_feed_carries_vtimezone():
+    utc_event = {'id': 'lunch', 'summary': 'Lunch', 'start': '2025-03-03T17:00:00.000Z',
+                 'end': '2025-03-03T18:00:00.000Z'}
+    text, count = shared_calendars.render_group_calendar(
+        'Team', [render_fragments([SERIES]), render_fragments([utc_event])])
+    assert count == 2
+    assert text.count('BEGIN:VTIMEZONE') == 1
+    assert 'DTSTART:20250303T170000Z' in text
+
+
+def test_utc_events_have_no_vtimezone():
+    event = dict(SERIES, tzid=None)
+    ics = generate_ics_calendar([event])
+    assert 'BEGIN:VTIMEZONE' not in ics
+    assert 'DTSTART:20250301T140000Z' in ics
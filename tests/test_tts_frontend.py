@@ -0,0 +1,21 @@
+import pytest
+
+from tts_frontend import normalize_text
+
+
+@pytest.mark.parametrize('text, spoken', [
+    ('Price 3.50', 'Price 3.50'),
+    ('Upgrade to v2.0 today', 'Upgrade to v2.0 today'),
+    ('1,000 people', '1,000 people'),
+    ('In 2026', 'In twenty twenty six'),
+    ('Built in 1905', 'Built in nineteen oh five'),
+    ('Back in 2005', 'Back in two thousand five'),
+    ('Flight to St. Louis', 'Flight to Saint Louis'),
+    ('Meet on Main St. at noon', 'Meet on Main Street at noon'),
+    ('Meeting on Mon.', 'Meeting on Monday.'),
+    ('Standup at 3 p.m.', 'Standup at three P M.'),
+    ('Dr. Smith on Fri. the 3rd at 3:30 PM', 'Doctor Smith on Friday the third at three thirty P M'),
+    ('42% of 7 teams & guests', 'forty two percent of seven teams and guests'),
+])
+def test_normalize_text(text, spoken):
+    assert normalize_text(text) == spoken
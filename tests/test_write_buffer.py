@@ -0,0 +1,94 @@
+import threading
+import time
+
+from write_buffer import WriteBuffer
+
+
+class Recorder:
+    """flush_fn that records writes and can be told to fail"""
+
+    def __init__(self, fail=0, delay=0.0):
+        self.writes = []
+        self.fail = fail
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, key, value):
+        if self.delay:
+            time.sleep(self.delay)
+        with self.lock:
+            if self.fail:
+                self.fail -= 1
+                return False
+            self.writes.append((key, value))
+        return True
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.01)
+
+
+def test_burst_is_coalesced_into_one_write():
+    recorder = Recorder()
+    buffer = WriteBuffer(recorder, window=0.2)
+    for i in range(10):
+        assert buffer.put('alice', i)
+    assert buffer.get('alice') == 9
+    assert buffer.coalesced == 9
+
+    wait_for(lambda: not buffer.has_pending('alice'))
+    assert recorder.writes == [('alice', 9)]
+    buffer.close()
+
+
+def test_window_zero_writes_through():
+    recorder = Recorder()
+    buffer = WriteBuffer(recorder, window=0)
+    assert buffer.put('alice', 1)
+    assert recorder.writes == [('alice', 1)]
+    assert not buffer.has_pending('alice')
+
+
+def test_failed_write_stays_pending_and_is_retried():
+    recorder = Recorder(fail=1)
+    buffer = WriteBuffer(recorder, window=0.05)
+    buffer.put('alice', 'v1')
+
+    assert not buffer.flush('alice')
+    assert buffer.get('alice') == 'v1'
+    # The background thread retries once the retry window passes
+    wait_for(lambda: recorder.writes == [('alice', 'v1')])
+    assert not buffer.has_pending('alice')
+    buffer.close()
+
+
+def test_close_flushes_pending_writes():
+    recorder = Recorder()
+    buffer = WriteBuffer(recorder, window=60)
+    buffer.put('alice', 1)
+    buffer.put('bob', 2)
+    buffer.close()
+
+    assert sorted(recorder.writes) == [('alice', 1), ('bob', 2)]
+    # Closed buffers write through
+    assert buffer.put('carol', 3)
+    assert recorder.writes[-1] == ('carol', 3)
+
+
+def test_concurrent_flushes_leave_the_newest_value_last():
+    recorder = Recorder(delay=0.05)
+    buffer = WriteBuffer(recorder, window=60)
+    buffer.put('alice', 'old')
+    first = threading.Thread(target=buffer.flush, args=('alice',))
+    first.start()
+    time.sleep(0.01)
+    buffer.put('alice', 'new')
+    buffer.flush('alice')  # waits for the in-flight write, then writes 'new'
+    first.join()
+
+    assert recorder.writes[-1] == ('alice', 'new')
+    assert not buffer.has_pending('alice')
+    buffer.close()
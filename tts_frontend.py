@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS TTS Front-End
+- Text normalization for what the assistant says: clock times ("3:30 PM"
+  -> "three thirty P M"), ordinals, plain numbers, years ("2026" ->
+  "twenty twenty six"), weekday / month abbreviations and a few symbols,
+  memoized per token; decimals, versions ("v2.0") and other mixed tokens
+  are left for the model to read
+- Phoneme cache installed into the Coqui tokenizer's phonemizer: phrases
+  and single words already seen skip the espeak call, so repeated event
+  titles and weekday names cost nothing even inside new sentences
+- Both caches are bounded LRUs (TTS_NORMALIZE_CACHE_SIZE,
+  TTS_PHONEME_CACHE_SIZE)
+"""
+
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+TTS_NORMALIZE_CACHE_SIZE = int(os.environ.get('TTS_NORMALIZE_CACHE_SIZE', 4096))
+TTS_PHONEME_CACHE_SIZE = int(os.environ.get('TTS_PHONEME_CACHE_SIZE', 20000))
+
+_ONES = ('zero one two three four five six seven eight nine ten eleven twelve thirteen '
+         'fourteen fifteen sixteen seventeen eighteen nineteen').split()
+_TENS = 'twenty thirty forty fifty sixty seventy eighty ninety'.split()
+_ORDINAL_WORDS = {
+    'one': 'first', 'two': 'second', 'three': 'third', 'five': 'fifth',
+    'eight': 'eighth', 'nine': 'ninth', 'twelve': 'twelfth',
+}
+_ABBREVIATIONS = {
+    'mon': 'Monday', 'tue': 'Tuesday', 'tues': 'Tuesday', 'wed': 'Wednesday',
+    'thu': 'Thursday', 'thur': 'Thursday', 'thurs': 'Thursday', 'fri': 'Friday',
+    'sat': 'Saturday', 'sun': 'Sunday',
+    'jan': 'January', 'feb': 'February', 'mar': 'March', 'apr': 'April',
+    'jun': 'June', 'jul': 'July', 'aug': 'August', 'sep': 'September',
+    'sept': 'September', 'oct': 'October', 'nov': 'November', 'dec': 'December',
+    'mr': 'Mister', 'mrs': 'Missus', 'dr': 'Doctor', 'st': 'Street',
+}
+# Also ordinary words, so only expanded when written with a period ("Sat.")
+_AMBIGUOUS = {'sun', 'sat', 'mar', 'mr', 'mrs', 'dr', 'st'}
+_SYMBOLS = {'&': 'and', '%': 'percent', '@': 'at', '+': 'plus', '#': 'number'}
+
+_TIME_RE = re.compile(r'\b(\d{1,2}):(\d{2})(?:\s*([ap])\.?\s?m\b\.?)?|\b(\d{1,2})\s*([ap])\.?\s?m\b\.?',
+                      re.IGNORECASE)
+_TOKEN_RE = re.compile(r"\d+(?:[.,]\d+)+"                        # 3.50, 1,000, 2.0.1
+                       r"|\d+(?:st|nd|rd|th)?(?![A-Za-z\d])"       # 42, 3rd
+                       r"|[A-Za-z]+\d[A-Za-z\d]*(?:\.\d+)*"         # v2.0, mp3
+                       r"|\d+[A-Za-z][A-Za-z\d]*"                  # 4x, 3d
+                       r"|[A-Za-z]+\.?|[&%@+#]|[^\sA-Za-z\d]+|\s+")
+# "St." before a name is Saint ("St. Louis"); elsewhere it is Street
+_SAINT_RE = re.compile(r'\bSt\.(?=\s+[A-Z])')
+_ORDINAL_RE = re.compile(r'(\d+)(st|nd|rd|th)\Z', re.IGNORECASE)
+
+# ============================================================================
+# Numbers
+# ============================================================================
+
+def number_to_words(n):
+    """English words for 0 <= n < 1,000,000 (digits are read out beyond that)"""
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens - 2] + (f' {_ONES[ones]}' if ones else '')
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return f'{_ONES[hundreds]} hundred' + (f' {number_to_words(rest)}' if rest else '')
+    if n < 1_000_000:
+        thousands, rest = divmod(n, 1000)
+        return f'{number_to_words(thousands)} thousand' + (f' {number_to_words(rest)}' if rest else '')
+    return ' '.join(_ONES[int(d)] for d in str(n))
+
+
+def year_words(n):
+    """How a year is read: 1905 -> "nineteen oh five", 2026 -> "twenty twenty six" """
+    if 2000 <= n < 2010:
+        return number_to_words(n)
+    century, rest = divmod(n, 100)
+    if rest == 0:
+        return f'{number_to_words(century)} hundred'
+    return f"{number_to_words(century)} {'oh ' if rest < 10 else ''}{number_to_words(rest)}"
+
+
+def ordinal_words(n):
+    words = number_to_words(n).split(' ')
+    last = words[-1]
+    if last in _ORDINAL_WORDS:
+        words[-1] = _ORDINAL_WORDS[last]
+    elif last.endswith('y'):
+        words[-1] = last[:-1] + 'ieth'
+    else:
+        words[-1] = last + 'th'
+    return ' '.join(words)
+
+# ============================================================================
+# Normalization
+# ============================================================================
+
+def _time_words(match):
+    hour, minute, meridiem = match.group(1), match.group(2), match.group(3)
+    if hour is None:
+        hour, minute, meridiem = match.group(4), '00', match.group(5)
+    hour, minute = int(hour), int(minute)
+    if hour > 23 or minute > 59:
+        return match.group(0)
+    spoken = number_to_words(hour)
+    if minute == 0:
+        spoken += '' if meridiem else " o'clock"
+    elif minute < 10:
+        spoken += f' oh {number_to_words(minute)}'
+    else:
+        spoken += f' {number_to_words(minute)}'
+    if meridiem:
+        spoken += f' {meridiem.upper()} M'
+    return spoken
+
+
+@lru_cache(maxsize=TTS_NORMALIZE_CACHE_SIZE)
+def _normalize_token(token):
+    if token.isdigit():
+        if len(token) == 4 and 1100 <= int(token) < 2100:
+            return year_words(int(token))
+        return number_to_words(int(token)) if len(token) <= 6 else ' '.join(_ONES[int(d)] for d in token)
+    ordinal = _ORDINAL_RE.match(token)
+    if ordinal:
+        return ordinal_words(int(ordinal.group(1)))
+    if token in _SYMBOLS:
+        return f' {_SYMBOLS[token]} '
+    word = token.rstrip('.').lower()
+    if word in _ABBREVIATIONS:
+        if token.endswith('.'):
+            return _ABBREVIATIONS[word] + ' '
+        if token[0].isupper() and word not in _AMBIGUOUS:
+            return _ABBREVIATIONS[word]
+    return token
+
+
+@lru_cache(maxsize=TTS_NORMALIZE_CACHE_SIZE)
+def normalize_text(text):
+    """Spoken-form text for the model (times, numbers, abbreviations expanded)"""
+    text = text.strip()
+    expanded = _TIME_RE.sub(_time_words, _SAINT_RE.sub('Saint', text))
+    spoken = re.sub(r' {2,}', ' ', ''.join(_normalize_token(t) for t in _TOKEN_RE.findall(expanded))).strip()
+    # An expanded "Mon." or "p.m." at the end still ends the sentence
+    if text.endswith('.') and not spoken.endswith(('.', '!', '?')):
+        spoken += '.'
+    return spoken
+
+# ============================================================================
+# Phoneme Cache
+# ============================================================================
+
+class PhonemeCache:
+    """Word- and phrase-level LRU in front of a Coqui phonemizer's _phonemize()"""
+
+    def __init__(self, size=TTS_PHONEME_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()   # (text, separator) -> phonemes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key):
+        value = self._entries.get(key)
+        if value is not None:
+            self._entries.move_to_end(key)
+        return value
+
+    def _put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def phonemize(self, phonemize, text, separator):
+        """Cached `phonemize(text, separator)` (the phonemizer's own method)"""
+        words = text.split()
+        with self._lock:
+            cached = self._get((text, separator))
+            if cached is None and words:
+                parts = [self._get((w.lower(), separator)) for w in words]
+                if all(p is not None for p in parts):
+                    cached = ' '.join(parts)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        # One espeak call for the whole phrase; its words seed the word cache
+        phonemes = phonemize(text, separator)
+        out_words = phonemes.split()
+        with self._lock:
+            self._put((text, separator), phonemes)
+            if len(out_words) == len(words):
+                for word, phones in zip(words, out_words):
+                    self._put((word.lower(), separator), phones)
+        return phonemes
+
+    def install(self, tts):
+        """Wrap the phonemizer of a loaded Coqui TTS object; returns True if installed"""
+        tokenizer = getattr(getattr(getattr(tts, 'synthesizer', None), 'tts_model', None), 'tokenizer', None)
+        phonemizer = getattr(tokenizer, 'phonemizer', None)
+        if phonemizer is None or not getattr(tokenizer, 'use_phonemes', False):
+            return False
+        original = phonemizer._phonemize
+        phonemizer._phonemize = lambda text, separator: self.phonemize(original, text, separator)
+        logger.info(f"🔤 Phoneme cache installed ({type(phonemizer).__name__}, {self.size} entries)")
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
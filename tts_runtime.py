@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS TTS Runtime
+- CPU-oriented loading of the Coqui model for instances without a GPU
+- TTS_THREADS intra-op threads per worker (default: cores divided by
+  WEB_CONCURRENCY, so gunicorn workers do not oversubscribe the CPU)
+- Inference under torch.inference_mode() (TTS_INFERENCE_MODE)
+- Optional dynamic int8 quantization of Linear / LSTM / GRU layers in the
+  acoustic model and vocoder (TTS_QUANTIZE=int8)
+- Model presets trading quality for speed (TTS_PRESET), an explicit
+  TTS_MODEL, and an optional TTS_VOCODER override
+
+See benchmarks/bench_tts.py for real-time factor, memory and quality
+numbers per configuration.
+"""
+
+import contextlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# name -> (model, vocoder override or None for the model's default)
+PRESETS = {
+    'quality': ('tts_models/en/ljspeech/tacotron2-DDC', None),
+    'balanced': ('tts_models/en/ljspeech/glow-tts', None),
+    'fast': ('tts_models/en/ljspeech/speedy-speech', None),
+    'fastest': ('tts_models/en/ljspeech/tacotron2-DDC', 'vocoder_models/en/ljspeech/multiband-melgan'),
+}
+DEFAULT_PRESET = 'quality'
+
+TTS_PRESET = os.environ.get('TTS_PRESET', DEFAULT_PRESET).lower()
+TTS_MODEL = os.environ.get('TTS_MODEL', '')
+TTS_VOCODER = os.environ.get('TTS_VOCODER', '')
+TTS_QUANTIZE = os.environ.get('TTS_QUANTIZE', 'off').lower()
+TTS_INFERENCE_MODE = os.environ.get('TTS_INFERENCE_MODE', 'true').lower() == 'true'
+
+
+def default_threads():
+    workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+TTS_THREADS = int(os.environ.get('TTS_THREADS', 0)) or default_threads()
+
+# ============================================================================
+# Torch Settings
+# ============================================================================
+
+def configure_torch(threads=TTS_THREADS):
+    """Pin torch's thread pools for this worker (once, before the first inference)"""
+    import torch
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already set; only allowed before any parallel work starts
+    return threads
+
+
+def inference(enabled=TTS_INFERENCE_MODE):
+    """Context manager for running inference (no autograd bookkeeping)"""
+    if not enabled:
+        return contextlib.nullcontext()
+    import torch
+    return torch.inference_mode()
+
+
+def quantize_module(module):
+    """Dynamic int8 quantization of a module's Linear and recurrent layers"""
+    import torch
+    from torch import nn
+    return torch.quantization.quantize_dynamic(
+        module, {nn.Linear, nn.LSTM, nn.GRU, nn.LSTMCell, nn.GRUCell}, dtype=torch.qint8)
+
+
+def quantize_synthesizer(synthesizer):
+    """Quantize the acoustic model and vocoder of a Coqui Synthesizer in place"""
+    synthesizer.tts_model = quantize_module(synthesizer.tts_model)
+    if getattr(synthesizer, 'vocoder_model', None) is not None:
+        synthesizer.vocoder_model = quantize_module(synthesizer.vocoder_model)
+    return synthesizer
+
+# ============================================================================
+# Loading
+# ============================================================================
+
+def resolve(preset=TTS_PRESET, model=TTS_MODEL, vocoder=TTS_VOCODER):
+    """(model name, vocoder name or None) for the configured preset / overrides"""
+    if preset not in PRESETS:
+        logger.warning(f"Unknown TTS_PRESET '{preset}', using '{DEFAULT_PRESET}'")
+        preset = DEFAULT_PRESET
+    preset_model, preset_vocoder = PRESETS[preset]
+    return model or preset_model, vocoder or preset_vocoder
+
+
+def _with_vocoder(tts, model_name, vocoder_name):
+    """Rebuild the synthesizer of a loaded TTS object around another vocoder"""
+    from TTS.utils.manage import ModelManager
+    from TTS.utils.synthesizer import Synthesizer
+
+    manager = ModelManager()
+    model_path, config_path, _ = manager.download_model(model_name)
+    vocoder_path, vocoder_config_path, _ = manager.download_model(vocoder_name)
+    tts.synthesizer = Synthesizer(
+        tts_checkpoint=model_path,
+        tts_config_path=config_path,
+        vocoder_checkpoint=vocoder_path,
+        vocoder_config=vocoder_config_path,
+        use_cuda=False,
+    )
+    return tts
+
+
+def load_tts(preset=TTS_PRESET, model=TTS_MODEL, vocoder=TTS_VOCODER,
+             quantize=TTS_QUANTIZE, threads=TTS_THREADS):
+    """Load a Coqui TTS object configured for CPU inference"""
+    from TTS.api import TTS  # type: ignore
+
+    configure_torch(threads)
+    model_name, vocoder_name = resolve(preset, model, vocoder)
+    tts = TTS(model_name, progress_bar=False, gpu=False)
+    if vocoder_name:
+        try:
+            tts = _with_vocoder(tts, model_name, vocoder_name)
+        except Exception as e:
+            logger.warning(f"Vocoder {vocoder_name} unavailable ({e}); keeping the model default")
+    if quantize == 'int8':
+        quantize_synthesizer(tts.synthesizer)
+    logger.info(f"🔊 TTS runtime: {model_name}, vocoder {vocoder_name or 'default'}, "
+                f"{threads} threads, quantize {quantize}, inference_mode {TTS_INFERENCE_MODE}")
+    return tts
+
+
+def describe():
+    model_name, vocoder_name = resolve()
+    return {
+        'preset': TTS_PRESET,
+        'model': model_name,
+        'vocoder': vocoder_name,
+        'threads': TTS_THREADS,
+        'quantize': TTS_QUANTIZE,
+        'inference_mode': TTS_INFERENCE_MODE,
+    }
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS TTS Scheduler
+- Priority queue in front of speech synthesis: short interactive
+  confirmations run before long summaries (then earliest deadline first)
+- Every job carries a deadline; one that cannot start in time is dropped
+  instead of producing audio nobody is waiting for
+- A newer job from the same session supersedes the older ones, and jobs
+  can be cancelled explicitly or when the client disconnects; running
+  jobs notice cancellation between sentences (Job.check())
+- TTS_WORKERS threads per process run jobs; each run still takes a
+  cross-worker slot from admission_control when one is configured. The
+  workers of one process share its model, whose calls are serialized
+  (tts_server.run_model)
+"""
+
+import contextlib
+import heapq
+import itertools
+import logging
+import os
+import select
+import socket
+import threading
+import time
+
+from admission_control import Overloaded
+
+logger = logging.getLogger(__name__)
+
+TTS_WORKERS = int(os.environ.get('TTS_WORKERS', 1))
+TTS_DEFAULT_DEADLINE = float(os.environ.get('TTS_DEFAULT_DEADLINE', 15))
+TTS_SCHEDULER_QUEUE = int(os.environ.get('TTS_SCHEDULER_QUEUE', 32))
+# Texts up to this many characters count as interactive confirmations
+INTERACTIVE_MAX_CHARS = 80
+
+PRIORITIES = {'interactive': 0, 'normal': 1, 'bulk': 2}
+
+
+class Cancelled(Exception):
+    """The job was cancelled or superseded while it ran"""
+
+
+def classify(text):
+    """Default priority for a text: short confirmations are interactive"""
+    return 'interactive' if len(text) <= INTERACTIVE_MAX_CHARS else 'normal'
+
+
+class Job:
+    __slots__ = ('fn', 'priority', 'deadline', 'session', 'seq', 'state', 'reason',
+                 'result', 'error', '_cancel', '_done')
+
+    def __init__(self, fn, priority, deadline, session, seq):
+        self.fn = fn
+        self.priority = priority
+        self.deadline = deadline
+        self.session = session
+        self.seq = seq
+        self.state = 'queued'      # queued | running | done | failed | cancelled | expired
+        self.reason = None
+        self.result = None
+        self.error = None
+        self._cancel = threading.Event()
+        self._done = threading.Event()
+
+    def __lt__(self, other):
+        return (self.priority, self.deadline, self.seq) < (other.priority, other.deadline, other.seq)
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def cancel(self, reason='cancelled'):
+        if not self._done.is_set() and not self._cancel.is_set():
+            self.reason = reason
+            self._cancel.set()
+
+    def check(self):
+        """Raise Cancelled if the job should stop (call between units of work)"""
+        if self._cancel.is_set():
+            raise Cancelled(self.reason or 'cancelled')
+
+    def finish(self, state, result=None, error=None):
+        self.state = state
+        self.result = result
+        self.error = error
+        self._done.set()
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+
+class TtsScheduler:
+    """Runs synthesis jobs by priority with deadlines and cancellation"""
+
+    def __init__(self, workers=TTS_WORKERS, max_queue=TTS_SCHEDULER_QUEUE, run_context=None):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.run_context = run_context or contextlib.nullcontext
+        self._heap = []
+        self._sessions = {}        # session -> jobs not yet finished
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self.counts = {'done': 0, 'failed': 0, 'cancelled': 0, 'expired': 0}
+
+    def _start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f'tts-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    # ------------------------------------------------------------------
+    # Submitting and cancelling
+    # ------------------------------------------------------------------
+
+    def submit(self, fn, priority='normal', deadline=None, session=None):
+        """Queue `fn(job)`; returns the Job. Raises Overloaded if the queue is full.
+
+        `deadline` is seconds from now (TTS_DEFAULT_DEADLINE by default).
+        A session's earlier jobs are superseded by this one.
+        """
+        rank = PRIORITIES.get(priority, PRIORITIES['normal'])
+        deadline = time.monotonic() + (deadline if deadline is not None else TTS_DEFAULT_DEADLINE)
+        with self._cond:
+            self._start()
+            if session:
+                for older in self._sessions.get(session, ()):
+                    older.cancel('superseded')
+            live = sum(1 for job in self._heap if not job.cancelled)
+            if live >= self.max_queue:
+                raise Overloaded('Speech queue is full', 1)
+            job = Job(fn, rank, deadline, session, next(self._seq))
+            heapq.heappush(self._heap, job)
+            if session:
+                self._sessions.setdefault(session, []).append(job)
+            self._cond.notify()
+        return job
+
+    def cancel_session(self, session, reason='cancelled'):
+        """Cancel every unfinished job of a session; returns how many"""
+        with self._cond:
+            jobs = list(self._sessions.get(session, ()))
+        for job in jobs:
+            job.cancel(reason)
+        return len(jobs)
+
+    # ------------------------------------------------------------------
+    # Workers
+    # ------------------------------------------------------------------
+
+    def _next_job(self):
+        with self._cond:
+            while not self._heap:
+                self._cond.wait()
+            return heapq.heappop(self._heap)
+
+    def _finish(self, job, state, result=None, error=None):
+        job.finish(state, result, error)
+        with self._cond:
+            self.counts[state] += 1
+            if job.session:
+                jobs = self._sessions.get(job.session, [])
+                if job in jobs:
+                    jobs.remove(job)
+                if not jobs:
+                    self._sessions.pop(job.session, None)
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            try:
+                if job.cancelled:
+                    self._finish(job, 'cancelled')
+                    continue
+                if time.monotonic() > job.deadline:
+                    self._finish(job, 'expired')
+                    continue
+                with self.run_context():
+                    # Waiting for a slot can take a while; re-check before working
+                    if time.monotonic() > job.deadline:
+                        self._finish(job, 'expired')
+                        continue
+                    job.check()
+                    job.state = 'running'
+                    result = job.fn(job)
+                self._finish(job, 'done', result)
+            except Cancelled:
+                self._finish(job, 'cancelled')
+            except Exception as e:
+                logger.error(f"TTS job failed: {e}")
+                self._finish(job, 'failed', error=e)
+
+    def stats(self):
+        with self._cond:
+            return {'queued': sum(1 for job in self._heap if not job.cancelled),
+                    'workers': self.workers, **self.counts}
+
+# ============================================================================
+# Client Disconnects
+# ============================================================================
+
+def client_disconnected(environ):
+    """True if the client behind a WSGI request has closed its connection.
+
+    Uses the socket gunicorn exposes in the environ; other servers never
+    report a disconnect.
+    """
+    sock = environ.get('gunicorn.socket')
+    if sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        if not readable:
+            return False
+        return sock.recv(1, socket.MSG_PEEK) == b''
+    except (OSError, ValueError):
+        return True
@@ -1,18 +1,27 @@
-from flask import Response
-from ics import Calendar, Event
-import json
-
 #!/usr/bin/env python3
 """
 MANTA-JARVIS Flask Backend
 Handles TTS synthesis, Google OAuth, and Calendar event creation
+- The "tts" server component (see server.py); calendar feeds are served
+  by the feeds component from the shared event storage
+- `gunicorn tts_server:app` still serves this component on its own
 """
 
-from flask import Flask, request, send_file, jsonify
-from flask_cors import CORS
+from flask import Blueprint, request, send_file, jsonify
 from io import BytesIO
+import importlib
 import os
 import datetime
+import re
+import threading
+
+import admission_control
+import phrase_bank
+import server
+import tts_frontend
+import tts_runtime
+import tts_scheduler
+from request_profiling import phase
 
 # Google Calendar API
 from google_auth_oauthlib.flow import Flow
@@ -20,9 +29,11 @@ from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 
-# Coqui TTS
+# Coqui TTS (the model itself is loaded by tts_runtime.load_tts)
 try:
-    from TTS.api import TTS  # type: ignore
+    # Availability check only: a broken install should fail here, not on first use
+    importlib.import_module('TTS.api')
+    import numpy  # installed with Coqui TTS
     COQUI_AVAILABLE = True
 except Exception as e:
     print(f'⚠️  Coqui TTS import failed: {e}')
@@ -33,8 +44,7 @@ except Exception as e:
 # Flask App Configuration
 # ============================================================================
 
-app = Flask(__name__)
-CORS(app)  # Enable CORS for frontend requests
+bp = Blueprint('tts', __name__)
 
 # Environment configuration
 SCOPES = ['https://www.googleapis.com/auth/calendar.events']
@@ -42,8 +52,31 @@ SERVER_TOKEN = os.environ.get('TTS_TOKEN', '')  # Optional authentication token
 CREDENTIALS_FILE = 'credentials.json'
 TOKEN_FILE = 'user_token.json'
 
+# Synthesis is the expensive path: cap it per IP and across all workers
+RATE_LIMIT_TTS = os.environ.get('RATE_LIMIT_TTS', '20/minute')
+TTS_MAX_CONCURRENCY = int(os.environ.get('TTS_MAX_CONCURRENCY', 2))
+TTS_MAX_QUEUE = int(os.environ.get('TTS_MAX_QUEUE', 8))
+TTS_QUEUE_TIMEOUT = float(os.environ.get('TTS_QUEUE_TIMEOUT', 10))
+
+_admission_store = admission_control.get_store()
+tts_slots = (admission_control.ConcurrencyLimiter(
+    _admission_store, 'tts', TTS_MAX_CONCURRENCY, TTS_MAX_QUEUE, TTS_QUEUE_TIMEOUT)
+    if _admission_store else None)
+
 # Global TTS model instance
 _tts_model = None
+_tts_load_lock = threading.Lock()
+
+# The Coqui model is not thread-safe: the phrase bank warm-up and the
+# scheduler workers take turns on it, one tts() call at a time
+_tts_model_lock = threading.Lock()
+
+# Repeated words skip espeak once seen (see tts_frontend.py)
+phoneme_cache = tts_frontend.PhonemeCache()
+
+# Pre-synthesized template phrases (see phrase_bank.py); built in the background
+PHRASE_BANK = os.environ.get('PHRASE_BANK', 'true').lower() == 'true'
+_phrase_bank = None
 
 # ============================================================================
 # TTS Synthesizer
@@ -52,20 +85,96 @@ _tts_model = None
 def get_tts():
     """Initialize and return TTS model (singleton pattern)"""
     global _tts_model
-    if _tts_model is None:
-        if not COQUI_AVAILABLE:
-            raise RuntimeError('Coqui TTS not available in this environment')
-        
-        model_name = os.environ.get('TTS_MODEL', 'tts_models/en/ljspeech/tacotron2-DDC')
-        print(f'🔊 Loading TTS model: {model_name}')
-        _tts_model = TTS(model_name)
-        print('✓ TTS model loaded successfully')
-    
+    with _tts_load_lock:
+        if _tts_model is None:
+            if not COQUI_AVAILABLE:
+                raise RuntimeError('Coqui TTS not available in this environment')
+
+            # CPU settings, preset / model / vocoder and quantization: see tts_runtime.py
+            print(f'🔊 Loading TTS model: {tts_runtime.describe()}')
+            model = tts_runtime.load_tts()
+            phoneme_cache.install(model)
+            _tts_model = model
+            print('✓ TTS model loaded successfully')
+
     return _tts_model
 
 
-@app.route('/synthesize', methods=['POST'])
+def run_model(tts, text):
+    """Float samples for `text` (already normalized), serialized on the model"""
+    with _tts_model_lock, tts_runtime.inference():
+        return tts.tts(text=text)
+
+
+def warm_phrase_bank():
+    """Load the model and pre-synthesize the constant parts of known phrases"""
+    global _phrase_bank
+    try:
+        tts = get_tts()
+        def synthesize(text):
+            return run_model(tts, tts_frontend.normalize_text(text))
+
+        bank = phrase_bank.PhraseBank(synthesize, tts.synthesizer.output_sample_rate)
+        if phrase_bank.PHRASE_TEMPLATES_FILE:
+            bank.load_file(phrase_bank.PHRASE_TEMPLATES_FILE)
+        bank.warm()
+        _phrase_bank = bank
+        print(f'✓ Phrase bank ready ({len(bank.templates)} templates)')
+    except Exception as e:
+        print(f'⚠️  Phrase bank unavailable: {e}')
+
+
+if PHRASE_BANK and COQUI_AVAILABLE and phrase_bank.NUMPY_AVAILABLE:
+    threading.Thread(target=warm_phrase_bank, name='phrase-bank', daemon=True).start()
+
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?;])\s+')
+
+
+def synthesize_wav(text, job):
+    """WAV bytes for `text`; stops between sentences if the job is cancelled"""
+    # Templated sentences only need their variable part synthesized
+    if _phrase_bank is not None:
+        job.check()
+        spliced = _phrase_bank.render_wav(text, job.check)
+        if spliced is not None:
+            print(f'🎤 Spliced from phrase bank: "{text[:50]}..."')
+            return spliced
+
+    tts = get_tts()
+    print(f'🎤 Synthesizing: "{text[:50]}..."')
+    parts = []
+    for sentence in _SENTENCE_END_RE.split(text.strip()):
+        job.check()
+        if sentence:
+            spoken = tts_frontend.normalize_text(sentence)
+            parts.append(numpy.asarray(run_model(tts, spoken), dtype=numpy.float32))
+    rate = tts.synthesizer.output_sample_rate
+    return phrase_bank.wav_bytes(phrase_bank.crossfade_concat(parts, rate), rate)
+
+
+# Orders synthesis by priority and deadline; each run takes a cross-worker slot
+scheduler = tts_scheduler.TtsScheduler(
+    run_context=(lambda: tts_slots.slot()) if tts_slots else None)
+
+
+@bp.route('/synthesize', methods=['POST'])
 def synthesize_audio():
+    """
+    Synthesize speech for a text
+
+    Request body:
+    {
+        "subject_request": "...",
+        "text": "Event Dentist has been added to your calendar.",
+        "priority": "interactive" | "normal" | "bulk",   (optional; by length)
+        "deadline_ms": 5000,                              (optional)
+        "session": "tab-or-user id"                       (optional)
+    }
+
+    A newer request with the same session cancels this one (409). A
+    request that cannot start before its deadline gets 504.
+    """
     data = request.get_json(force=True)
     subject = data.get('subject_request')  # Optional: used for calendar logic
     text = data.get('text')  # This is the actual speech input
@@ -79,44 +188,61 @@ def synthesize_audio():
     # Optional parameters
     speaker = data.get('speaker')
     speed = data.get('rate', 1.0)
+    priority = data.get('priority') or tts_scheduler.classify(text)
+    session = data.get('session') or request.headers.get('X-TTS-Session')
+    deadline = data.get('deadline_ms')
 
     try:
-        tts = get_tts()
-
-        # Generate audio file
-        out_path = 'temp_out.wav'
-        print(f'🎤 Synthesizing: "{text[:50]}..."')
-        tts.tts_to_file(text=text, file_path=out_path)
-
-        # Load into memory and return
-        bio = BytesIO()
-        with open(out_path, 'rb') as f:
-            bio.write(f.read())
-        bio.seek(0)
-
-        # Clean up temp file
-        if os.path.exists(out_path):
-            os.remove(out_path)
+        deadline = float(deadline) / 1000 if deadline is not None else None
+        job = scheduler.submit(lambda job: synthesize_wav(text, job), priority, deadline, session)
+
+        # Wait for the audio, giving up on it if the client goes away
+        with phase('tts'):
+            while not job.wait(0.25):
+                if tts_scheduler.client_disconnected(request.environ):
+                    job.cancel('client disconnected')
+                    print('🔌 Client disconnected, TTS job cancelled')
+                    return '', 499
+
+        if job.state == 'cancelled':
+            return jsonify({'error': f'Speech request {job.reason}'}), 409
+        if job.state == 'expired':
+            return jsonify({'error': 'Speech request missed its deadline'}), 504
+        if job.state == 'failed':
+            raise job.error
 
         print('✓ Audio synthesized successfully')
         return send_file(
-            bio,
+            BytesIO(job.result),
             mimetype='audio/wav',
             as_attachment=False,
             download_name='speech.wav'
         )
 
+    except admission_control.Rejected as e:
+        print(f'🚦 TTS busy: {e}')
+        return admission_control.rejection_response(e)
     except Exception as e:
         print(f'❌ TTS synthesis failed: {e}')
         return jsonify({'error': str(e)}), 500
 
 
+@bp.route('/synthesize/cancel', methods=['POST'])
+def cancel_synthesis():
+    """Drop a session's pending speech (e.g. when the user mutes TTS)"""
+    data = request.get_json(force=True)
+    session = data.get('session') or request.headers.get('X-TTS-Session')
+    if not session:
+        return jsonify({'error': 'Missing session'}), 400
+    return jsonify({'cancelled': scheduler.cancel_session(session)}), 200
+
+
 
 # ============================================================================
 # Google OAuth & Authentication
 # ============================================================================
 
-@app.route('/oauth2callback')
+@bp.route('/oauth2callback')
 def oauth2callback():
     try:
         flow = Flow.from_client_secrets_file(
@@ -170,7 +296,7 @@ def get_calendar_credentials(email):
     return None
 
 
-@app.route('/update_event', methods=['POST'])
+@bp.route('/update_event', methods=['POST'])
 def update_event():
     """
     Update an existing calendar event.
@@ -236,11 +362,24 @@ def update_event():
         print(f'❌ Failed to update event: {e}')
         return jsonify({'error': str(e)}), 500
 
+# ============================================================================
+# Calendar Feed
+# ============================================================================
+
+@bp.route('/whoami', methods=['GET'])
+def whoami():
+    """Get current authenticated user email"""
+    email = request.args.get('email')
+    creds = get_calendar_credentials(email)
+    if creds:
+        return jsonify({'email': email}), 200
+    return jsonify({'error': 'No credentials found'}), 404
+
+
 # ============================================================================
 # Health Check & Info Routes
 # ============================================================================
 
-@app.route('/')
 def index():
     """Serve the main application page"""
     return '''
@@ -289,54 +428,47 @@ def index():
     )
 
 
-@app.route('/health')
 def health_check():
-    """Health check endpoint"""
-    return jsonify({
-        'status': 'ok',
+    """TTS part of /health"""
+    return {
         'tts_available': COQUI_AVAILABLE,
+        'tts_slots': tts_slots.stats() if tts_slots else None,
+        'tts_queue': scheduler.stats(),
+        'phoneme_cache': phoneme_cache.stats(),
+        'phrase_bank': _phrase_bank is not None,
+        'tts_runtime': tts_runtime.describe(),
         'authenticated': os.path.exists(TOKEN_FILE)
-    })
+    }
 
 
 # ============================================================================
 # Error Handlers
 # ============================================================================
 
-@app.errorhandler(404)
+@bp.app_errorhandler(404)
 def not_found(e):
     return jsonify({'error': 'Endpoint not found'}), 404
 
 
-@app.errorhandler(500)
+@bp.app_errorhandler(500)
 def internal_error(e):
     return jsonify({'error': 'Internal server error'}), 500
 
-# Existing imports and routes
-from flask import Flask, request, jsonify, Response
-from ics import Calendar, Event  # ✅ Add this if you're using ics.py
-
-app = Flask(__name__)
-
-# ... your existing routes like /, /signin, /oauth2callback, etc.
-
-# ✅ Add this new route BELOW your other routes
-@app.route('/calendar/<user_email>.ics')
-def calendar_feed(user_email):
-    events = get_user_events(user_email)  # You’ll define this function
-    cal = Calendar()
+# ============================================================================
+# Component
+# ============================================================================
 
-    for e in events:
-        event = Event()
-        event.name = e['title']
-        event.begin = e['start']
-        event.end = e['end']
-        event.description = e.get('description', '')
-        event.location = e.get('location', '')
-        cal.events.add(event)
+server.register(server.Component('tts', bp, route_limits={
+    'synthesize_audio': [('tts', admission_control.parse_rate(RATE_LIMIT_TTS), admission_control.client_ip)],
+}, health=health_check, index=index))
 
-    return Response(str(cal), mimetype='text/calendar')
 
+def __getattr__(name):
+    # `gunicorn tts_server:app`: the TTS component alone, built on first use
+    if name == 'app':
+        globals()['app'] = server.create_app(['tts'])
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ============================================================================
 # Main Entry Point
@@ -354,70 +486,7 @@ if __name__ == '__main__':
     print('Press Ctrl+C to stop')
     print('=' * 60)
     
-    app.run(
-        host='127.0.0.1',
-        port=8080,
-        debug=True
-    )
-@app.route('/whoami', methods=['GET'])
-def whoami():
-    email = request.args.get('email')
-    creds = get_calendar_credentials(email)
-    if creds:
-        return jsonify({'email': email}), 200
-    return jsonify({'error': 'No credentials found'}), 404
-
-def get_user_events(user_email):
-    """Retrieve user events from storage"""
-    try:
-        with open('user_events.json', 'r') as f:
-            data = json.load(f)
-        return data.get(user_email, [])
-    except FileNotFoundError:
-        return []
-
-
-@app.route('/whoami', methods=['GET'])
-def whoami():
-    """Get current authenticated user email"""
-    email = request.args.get('email')
-    creds = get_calendar_credentials(email)
-    if creds:
-        return jsonify({'email': email}), 200
-    return jsonify({'error': 'No credentials found'}), 404
-
-
-@app.route('/calendar/<user_email>.ics')
-def calendar_feed(user_email):
-    """Generate iCalendar feed for user events"""
-    events = get_user_events(user_email)
-    cal = Calendar()
-
-    for e in events:
-        event = Event()
-        event.name = e['title']
-        event.begin = e['start']
-        event.end = e['end']
-        event.description = e.get('description', '')
-        event.location = e.get('location', '')
-        cal.events.add(event)
-
-    return Response(str(cal), mimetype='text/calendar')
-
-
-if __name__ == '__main__':
-    print('=' * 60)
-    print('🤖 MANTA-JARVIS Backend Server')
-    print('=' * 60)
-    print(f'TTS Available: {COQUI_AVAILABLE}')
-    print(f'Credentials File: {os.path.exists(CREDENTIALS_FILE)}')
-    print(f'User Token: {os.path.exists(TOKEN_FILE)}')
-    print('=' * 60)
-    print('Starting server on http://127.0.0.1:8080')
-    print('Press Ctrl+C to stop')
-    print('=' * 60)
-    
-    app.run(
+    server.create_app(['tts']).run(
         host='127.0.0.1',
         port=8080,
         debug=True
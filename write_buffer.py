@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+MANTA-JARVIS Write Buffer
+- Holds the newest event list per user and coalesces bursts of /api/sync
+  calls into one durable write per coalescing window
+- Reads go through the buffer first, so they always see the newest state
+- Pending writes are flushed by a background thread, on demand, and at exit
+"""
+
+import atexit
+import itertools
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBuffer:
+    """Coalesces per-user writes that arrive within `window` seconds.
+
+    `flush_fn(key, value)` performs the actual (durable) write and returns
+    True on success. A window of 0 disables buffering: put() writes through.
+    """
+
+    def __init__(self, flush_fn, window=0.5, name='write-buffer'):
+        self.flush_fn = flush_fn
+        self.window = window
+        self.name = name
+        self._pending = {}   # key -> (value, sequence, deadline)
+        self._flushing = set()  # keys being written right now (one writer per key)
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        self._sequence = itertools.count(1)
+        self.writes = 0      # completed flushes
+        self.coalesced = 0   # puts absorbed by an already pending write
+        atexit.register(self.close)
+
+    @property
+    def enabled(self):
+        return self.window > 0 and not self._closed
+
+    def put(self, key, value):
+        """Record the newest value for a key; returns True if accepted"""
+        if not self.enabled:
+            return self._write(key, value)
+
+        with self._cond:
+            previous = self._pending.get(key)
+            # The deadline is fixed by the first pending put, so a steady
+            # stream of edits still reaches disk at least once per window
+            deadline = previous[2] if previous else time.monotonic() + self.window
+            if previous:
+                self.coalesced += 1
+            self._pending[key] = (value, next(self._sequence), deadline)
+            self._ensure_thread()
+            self._cond.notify()
+        return True
+
+    def get(self, key):
+        """Pending value for a key, or None if nothing is buffered"""
+        entry = self._pending.get(key)
+        return entry[0] if entry else None
+
+    def pending_version(self, key):
+        """Sequence number of the pending value, or None if nothing is buffered"""
+        entry = self._pending.get(key)
+        return entry[1] if entry else None
+
+    def has_pending(self, key):
+        return key in self._pending
+
+    def flush(self, key=None):
+        """Write pending values now (one key, or all); returns True if all succeeded.
+
+        Waits for a write of the same key already in progress, so a value
+        put before the call is on disk when it returns.
+        """
+        with self._cond:
+            keys = [key] if key is not None else list(self._pending)
+        ok = True
+        for k in keys:
+            ok = self._flush_key(k) and ok
+        return ok
+
+    def close(self):
+        """Flush everything and stop the background thread"""
+        if self._closed:
+            return
+        self.flush()
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------
+
+    def _write(self, key, value):
+        try:
+            ok = bool(self.flush_fn(key, value))
+        except Exception as e:
+            logger.error(f"{self.name}: write for {key} failed: {e}")
+            ok = False
+        if ok:
+            self.writes += 1
+        return ok
+
+    def _flush_key(self, key):
+        with self._cond:
+            # Serialize writes per key: an older value finishing after a
+            # newer one would otherwise overwrite it on disk
+            while key in self._flushing:
+                self._cond.wait()
+            entry = self._pending.get(key)
+            if entry is None:
+                return True
+            self._flushing.add(key)
+        value, sequence, _ = entry
+        try:
+            ok = self._write(key, value)
+        finally:
+            with self._cond:
+                self._flushing.discard(key)
+                self._cond.notify_all()
+        with self._cond:
+            current = self._pending.get(key)
+            if current is not None and current[1] == sequence:
+                if ok:
+                    del self._pending[key]
+                else:
+                    # Retry after another window instead of spinning
+                    self._pending[key] = (value, sequence, time.monotonic() + max(self.window, 1.0))
+        return ok
+
+    def _ensure_thread(self):
+        # Started lazily so gunicorn workers each get their own flusher after fork
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                now = time.monotonic()
+                waiting = {k: d for k, (_, _, d) in self._pending.items() if k not in self._flushing}
+                due = [k for k, deadline in waiting.items() if deadline <= now]
+                if not due:
+                    if waiting:
+                        next_deadline = min(waiting.values())
+                        self._cond.wait(max(0.0, next_deadline - now))
+                    else:
+                        self._cond.wait()
+                    continue
+            for key in due:
+                self._flush_key(key)